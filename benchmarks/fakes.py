@@ -0,0 +1,360 @@
+"""
+ローカルで動作するNCBI E-utilities / OpenAI Chat Completions の代替サーバー
+
+ベンチマーク・負荷試験・テストで外部サービスに依存せず、
+レイテンシや429エラーを再現可能な形で注入するために使用する。
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+FIRST_PMID = 30000000
+
+_MESH = [
+    ("Humans", "D006801"), ("COVID-19", "D000086382"), ("Diabetes Mellitus, Type 2", "D003924"),
+    ("Hypertension", "D006973"), ("Neoplasms", "D009369"), ("Treatment Outcome", "D016896"),
+    ("Randomized Controlled Trials as Topic", "D016032"), ("Risk Factors", "D012307"),
+    ("Middle Aged", "D008875"), ("Aged", "D000368"), ("Female", "D005260"), ("Male", "D008297"),
+]
+_JOURNALS = [
+    ("The Lancet", "Lancet"), ("The New England journal of medicine", "N Engl J Med"),
+    ("JAMA", "JAMA"), ("Nature medicine", "Nat Med"), ("BMJ (Clinical research ed.)", "BMJ"),
+]
+_PUB_TYPES = ["Journal Article", "Randomized Controlled Trial", "Meta-Analysis", "Systematic Review", "Review"]
+_SECTIONS = ["BACKGROUND", "METHODS", "RESULTS", "CONCLUSIONS"]
+_WORDS = (
+    "patients treatment outcome cohort randomized trial efficacy safety mortality risk "
+    "analysis clinical therapy placebo intervention follow-up significant reduction "
+    "increase association confidence interval hazard ratio primary endpoint"
+).split()
+
+
+def synthetic_article_xml(pmid: int) -> str:
+    """PMIDから決定的に生成する、実データに近い構造のPubmedArticle要素"""
+    rng = random.Random(pmid)
+    journal, abbrev = _JOURNALS[pmid % len(_JOURNALS)]
+    year = 2000 + pmid % 25
+    authors = "".join(
+        f"<Author><LastName>Author{pmid % 97}{i}</LastName><ForeName>Test</ForeName>"
+        f"<AffiliationInfo><Affiliation>Department {i}, University {pmid % 13}</Affiliation></AffiliationInfo></Author>"
+        for i in range(rng.randint(3, 8))
+    )
+    abstract = "".join(
+        f'<AbstractText Label="{label}">{" ".join(rng.choice(_WORDS) for _ in range(rng.randint(40, 80)))}.</AbstractText>'
+        for label in _SECTIONS
+    )
+    mesh = "".join(
+        f'<MeshHeading><DescriptorName UI="{ui}">{escape(name)}</DescriptorName>'
+        f"<QualifierName>therapy</QualifierName></MeshHeading>"
+        for name, ui in rng.sample(_MESH, rng.randint(4, 10))
+    )
+    keywords = "".join(f"<Keyword>{rng.choice(_WORDS)}</Keyword>" for _ in range(5))
+    pub_types = "".join(f"<PublicationType>{pt}</PublicationType>" for pt in rng.sample(_PUB_TYPES, 2))
+    return (
+        "<PubmedArticle><MedlineCitation>"
+        f"<PMID>{pmid}</PMID>"
+        "<Article>"
+        f"<Journal><JournalIssue><PubDate><Year>{year}</Year><Month>Mar</Month><Day>{pmid % 28 + 1}</Day></PubDate></JournalIssue>"
+        f"<Title>{escape(journal)}</Title><ISOAbbreviation>{escape(abbrev)}</ISOAbbreviation></Journal>"
+        f"<ArticleTitle>Synthetic study {pmid} of {rng.choice(_WORDS)} and {rng.choice(_WORDS)}</ArticleTitle>"
+        f"<Abstract>{abstract}</Abstract>"
+        f"<AuthorList>{authors}</AuthorList>"
+        f"<Language>{'eng' if pmid % 10 else 'jpn'}</Language>"
+        f"<PublicationTypeList>{pub_types}</PublicationTypeList>"
+        "</Article>"
+        f"<MeshHeadingList>{mesh}</MeshHeadingList>"
+        f"<KeywordList>{keywords}</KeywordList>"
+        "</MedlineCitation>"
+        f'<PubmedData><ArticleIdList><ArticleId IdType="pubmed">{pmid}</ArticleId>'
+        f'<ArticleId IdType="doi">10.1000/synthetic.{pmid}</ArticleId></ArticleIdList></PubmedData>'
+        "</PubmedArticle>"
+    )
+
+
+def synthetic_mesh_records(count: int, seed: int = 0) -> list[tuple[str, str, list[str], list[str]]]:
+    """
+    MeSH記述子の代替データ（UI, 記述子名, ツリー番号, エントリー用語）
+
+    実際のMeSH（約3万記述子・約30万用語、ツリーの深さ最大13）に近い規模・形状の木を決定的に生成する。
+    """
+    rng = random.Random(seed)
+    records: list[tuple[str, str, list[str], list[str]]] = []
+    children: dict[str, int] = {}
+    parents = [f"{category}{i:02d}" for category in "ABCDEFGN" for i in range(1, 4)]
+    for i in range(count):
+        parent = rng.choice(parents)
+        children[parent] = children.get(parent, 0) + 1
+        tree = f"{parent}.{children[parent]:03d}"
+        if tree.count(".") < 12:
+            parents.append(tree)
+        name = " ".join(rng.choice(_WORDS).capitalize() for _ in range(rng.randint(1, 3))) + f" {i}"
+        terms = [f"{name} {rng.choice(_WORDS)}" for _ in range(rng.randint(2, 15))]
+        records.append((f"D{i:06d}", name, [tree], terms))
+    return records
+
+
+def efetch_xml(pmids: list[int], recordings_dir: Path | None = None) -> bytes:
+    """efetchレスポンス（記録済みXMLがあればそれを、なければ合成XMLを使用）"""
+    parts = []
+    for pmid in pmids:
+        recorded = recordings_dir / "efetch" / f"{pmid}.xml" if recordings_dir else None
+        if recorded is not None and recorded.exists():
+            parts.append(recorded.read_text(encoding="utf-8"))
+        else:
+            parts.append(synthetic_article_xml(pmid))
+    return ('<?xml version="1.0" ?>\n<PubmedArticleSet>' + "".join(parts) + "</PubmedArticleSet>").encode("utf-8")
+
+
+class _FakeServer:
+    """バックグラウンドスレッドで動作するHTTPサーバーの基底クラス"""
+
+    def __init__(self, latency_seconds: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self.request_counts: dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _record(self, endpoint: str) -> bool:
+        """リクエストを記録し、429を注入する場合はTrueを返す"""
+        with self._lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+            inject_error = self._rng.random() < self.error_rate
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return inject_error
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        raise NotImplementedError
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server._handle(self, "GET")
+
+            def do_POST(self):
+                server._handle(self, "POST")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    @staticmethod
+    def _respond(handler: BaseHTTPRequestHandler, status: int, body: bytes, content_type: str, headers: dict | None = None):
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    @staticmethod
+    def _read_body(handler: BaseHTTPRequestHandler) -> bytes:
+        length = int(handler.headers.get("Content-Length") or 0)
+        return handler.rfile.read(length) if length else b""
+
+
+class FakeEutilsServer(_FakeServer):
+    """
+    NCBI E-utilities（esearch / efetch / elink / epost）の代替サーバー
+
+    esearchは FIRST_PMID から連番のPMIDを total_count 件返す。
+    efetchは recordings_dir/efetch/<pmid>.xml があればそれを、なければ合成XMLを返す。
+    """
+
+    def __init__(
+        self,
+        total_count: int = 10000,
+        citations_per_article: int = 5,
+        recordings_dir: str | Path | None = None,
+        **kwargs
+    ):
+        self.total_count = total_count
+        self.citations_per_article = citations_per_article
+        self.recordings_dir = Path(recordings_dir) if recordings_dir else None
+        self._posted: dict[str, list[int]] = {}
+        super().__init__(**kwargs)
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        parsed = urlparse(handler.path)
+        params = self._params(parse_qs(parsed.query))
+        if method == "POST":
+            params.update(self._params(parse_qs(self._read_body(handler).decode())))
+        endpoint = parsed.path.rsplit("/", 1)[-1].removesuffix(".fcgi")
+
+        if self._record(endpoint):
+            self._respond(handler, 429, b'{"error":"API rate limit exceeded"}', "application/json", {"Retry-After": "1"})
+            return
+
+        if endpoint == "esearch":
+            body, content_type = self._esearch(params), "text/xml"
+        elif endpoint == "efetch":
+            body, content_type = efetch_xml(self._efetch_ids(params), self.recordings_dir), "text/xml"
+        elif endpoint == "elink":
+            body, content_type = self._elink(params), "application/json"
+        elif endpoint == "epost":
+            body, content_type = self._epost(params), "text/xml"
+        else:
+            self._respond(handler, 404, b"not found", "text/plain")
+            return
+        self._respond(handler, 200, body, content_type)
+
+    @staticmethod
+    def _params(query: dict[str, list[str]]) -> dict[str, str]:
+        # 繰り返し指定された id（elinkで論文ごとのリンクセットを求める形式）はカンマ区切りにまとめる
+        return {key: ",".join(values) if key == "id" else values[-1] for key, values in query.items()}
+
+    def _esearch(self, params: dict) -> bytes:
+        retstart = int(params.get("retstart", 0))
+        retmax = int(params.get("retmax", 20))
+        ids = range(FIRST_PMID + retstart, FIRST_PMID + min(retstart + retmax, self.total_count))
+        id_list = "".join(f"<Id>{pmid}</Id>" for pmid in ids)
+        return (
+            '<?xml version="1.0" ?>\n<eSearchResult>'
+            f"<Count>{self.total_count}</Count><RetMax>{len(ids)}</RetMax><RetStart>{retstart}</RetStart>"
+            f"<QueryKey>1</QueryKey><WebEnv>FAKE_WEBENV</WebEnv><IdList>{id_list}</IdList>"
+            "</eSearchResult>"
+        ).encode()
+
+    def _efetch_ids(self, params: dict) -> list[int]:
+        if params.get("id"):
+            return [int(pmid) for pmid in re.split(r"[,\s]+", params["id"]) if pmid]
+        retstart = int(params.get("retstart", 0))
+        retmax = int(params.get("retmax", 20))
+        posted = self._posted.get(params.get("WebEnv", ""))
+        if posted is not None:
+            return posted[retstart:retstart + retmax]
+        return list(range(FIRST_PMID + retstart, FIRST_PMID + min(retstart + retmax, self.total_count)))
+
+    def cited_by(self, pmid: int) -> list[int]:
+        """PMIDを引用する論文（後続の pmid % (citations_per_article + 1) 件）"""
+        return [pmid + offset + 1 for offset in range(pmid % (self.citations_per_article + 1))]
+
+    def references(self, pmid: int) -> list[int]:
+        """PMIDが引用する論文（cited_by の逆）"""
+        return [
+            cited for cited in range(pmid - self.citations_per_article, pmid)
+            if cited > 0 and pmid in self.cited_by(cited)
+        ]
+
+    def _elink(self, params: dict) -> bytes:
+        ids = [int(pmid) for pmid in re.split(r"[,\s]+", params.get("id", "")) if pmid]
+        linkname = params.get("linkname", "pubmed_pubmed_citedin")
+        links = self.references if linkname == "pubmed_pubmed_refs" else self.cited_by
+        linksets = [
+            {
+                "dbfrom": "pubmed",
+                "ids": [str(pmid)],
+                "linksetdbs": [{"dbto": "pubmed", "linkname": linkname, "links": [str(link) for link in links(pmid)]}]
+            }
+            for pmid in ids
+        ]
+        return json.dumps({"header": {"type": "elink"}, "linksets": linksets}).encode()
+
+    def _epost(self, params: dict) -> bytes:
+        webenv = f"FAKE_POST_{len(self._posted)}"
+        self._posted[webenv] = [int(pmid) for pmid in re.split(r"[,\s]+", params.get("id", "")) if pmid]
+        return f'<?xml version="1.0" ?>\n<ePostResult><QueryKey>1</QueryKey><WebEnv>{webenv}</WebEnv></ePostResult>'.encode()
+
+
+class FakeChatCompletionsServer(_FakeServer):
+    """OpenAI Chat Completions API（/v1/chat/completions）の代替サーバー"""
+
+    def __init__(self, completion_tokens: int = 80, **kwargs):
+        self.completion_tokens = completion_tokens
+        super().__init__(**kwargs)
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/v1"
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        request = json.loads(self._read_body(handler) or b"{}")
+        if self._record("chat.completions"):
+            self._respond(handler, 429, b'{"error":{"message":"Rate limit reached"}}', "application/json", {"Retry-After": "1"})
+            return
+
+        prompt = " ".join(message.get("content", "") for message in request.get("messages", []))
+        body = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"Fake completion ({len(prompt)} chars)."},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": self.completion_tokens,
+                "total_tokens": len(prompt) // 4 + self.completion_tokens,
+            },
+        }
+        self._respond(handler, 200, json.dumps(body).encode(), "application/json")
+
+
+def record_efetch(pmids: list[str], recordings_dir: str | Path, api_key: str | None = None) -> int:
+    """実際のNCBIからefetch結果を取得し、PMIDごとのXMLとして保存"""
+    import xml.etree.ElementTree as ET
+    import requests
+
+    params = {"db": "pubmed", "id": ",".join(pmids), "retmode": "xml"}
+    if api_key:
+        params["api_key"] = api_key
+    response = requests.post("https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi", data=params, timeout=60)
+    response.raise_for_status()
+
+    out_dir = Path(recordings_dir) / "efetch"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    recorded = 0
+    for article in ET.fromstring(response.content).findall("PubmedArticle"):
+        pmid = article.find(".//PMID").text
+        (out_dir / f"{pmid}.xml").write_text(ET.tostring(article, encoding="unicode"), encoding="utf-8")
+        recorded += 1
+    return recorded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record efetch XML for the fake E-utilities server")
+    parser.add_argument("pmids", nargs="+")
+    parser.add_argument("--out", default="benchmarks/recordings")
+    parser.add_argument("--api-key")
+    args = parser.parse_args()
+    print(f"Recorded {record_efetch(args.pmids, args.out, args.api_key)} articles into {args.out}")
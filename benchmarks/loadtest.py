@@ -0,0 +1,247 @@
+"""
+FastAPIエンドポイントの負荷試験
+
+デフォルトではアプリをプロセス内（ASGI）で起動し、上流サービスはローカルの代替サーバーを使用する。
+--url を指定すると起動済みのサーバーに対して実行する（上流の設定は起動側で行う）。
+
+    python -m benchmarks.loadtest --concurrency 16 --duration 30 --mix search=3,generate=1
+    python -m benchmarks.loadtest --url http://localhost:8000 --token <Firebase ID token>
+
+プロセス内モードではイベントループの遅延も計測し、ハンドラがループをブロックしていないかを確認する。
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fakes import FakeEutilsServer, FakeChatCompletionsServer
+
+SEARCH_BODY = {"keywords": "COVID-19 treatment", "humans_only": True}
+
+@dataclass
+class Sample:
+    kind: str
+    latency: float
+    ok: bool
+
+@dataclass
+class LoadTestReport:
+    duration: float
+    samples: list[Sample] = field(default_factory=list)
+    loop_lags: list[float] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        kinds = sorted({sample.kind for sample in self.samples})
+        summary = {
+            "duration_seconds": self.duration,
+            "overall": _summarize(self.samples, self.duration),
+            "by_kind": {kind: _summarize([s for s in self.samples if s.kind == kind], self.duration) for kind in kinds},
+        }
+        if self.loop_lags:
+            lags = sorted(self.loop_lags)
+            summary["event_loop_lag"] = {
+                "p50_ms": percentile(lags, 50) * 1000,
+                "p99_ms": percentile(lags, 99) * 1000,
+                "max_ms": lags[-1] * 1000,
+            }
+        return summary
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """ソート済みの値のパーセンタイル（線形補間）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def _summarize(samples: list[Sample], duration: float) -> dict:
+    latencies = sorted(sample.latency for sample in samples)
+    errors = sum(1 for sample in samples if not sample.ok)
+    return {
+        "requests": len(samples),
+        "throughput_rps": len(samples) / duration if duration else 0.0,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+def parse_mix(mix: str) -> dict[str, float]:
+    """'search=3,generate=1' 形式のリクエスト比率をパース"""
+    weights = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in ("search", "generate"):
+            raise ValueError(f"Unknown request kind: {kind}")
+        weights[kind] = float(weight or 1)
+    return weights
+
+async def _monitor_loop(report: LoadTestReport, stop: asyncio.Event, interval: float = 0.01):
+    """一定間隔でスリープし、予定時刻からの遅れ（イベントループのブロック時間）を記録"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        report.loop_lags.append(max(0.0, loop.time() - expected))
+
+class LoadGenerator:
+    def __init__(self, client: httpx.AsyncClient, weights: dict[str, float], max_results: int, headers: dict, seed: int = 0):
+        self.client = client
+        self.weights = weights
+        self.max_results = max_results
+        self.headers = headers
+        self._rng = random.Random(seed)
+        self._handle: str | None = None
+
+    async def prepare(self):
+        """記事生成リクエスト用に結果セットのハンドルを取得"""
+        if "generate" in self.weights:
+            response = await self._search()
+            response.raise_for_status()
+            self._handle = response.headers.get("x-result-set-handle")
+
+    async def _search(self) -> httpx.Response:
+        return await self.client.post("/api/pubmed-search", json={**SEARCH_BODY, "max_results": self.max_results})
+
+    async def _generate(self) -> httpx.Response:
+        return await self.client.post("/api/generate-article", json={"handle": self._handle}, headers=self.headers)
+
+    async def worker(self, report: LoadTestReport, deadline: float):
+        kinds, weights = zip(*self.weights.items())
+        while time.perf_counter() < deadline:
+            kind = self._rng.choices(kinds, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await (self._search() if kind == "search" else self._generate())
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            report.samples.append(Sample(kind, time.perf_counter() - start, ok))
+
+async def run_load(client: httpx.AsyncClient, args, headers: dict, monitor_loop: bool) -> LoadTestReport:
+    generator = LoadGenerator(client, parse_mix(args.mix), args.max_results, headers, args.seed)
+    await generator.prepare()
+
+    report = LoadTestReport(duration=args.duration)
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_loop(report, stop)) if monitor_loop else None
+    deadline = time.perf_counter() + args.duration
+    started = time.perf_counter()
+    await asyncio.gather(*(generator.worker(report, deadline) for _ in range(args.concurrency)))
+    report.duration = time.perf_counter() - started
+    stop.set()
+    if monitor:
+        await monitor
+    return report
+
+async def run_in_process(args) -> LoadTestReport:
+    """代替サーバーを起動し、アプリをプロセス内で負荷試験"""
+    from openai import OpenAI
+    from src import llm
+    from src.app import app
+    from src.auth import get_current_user
+    from src.database import get_db, get_async_db
+    from src.models import User
+    from src.pubmed import get_pubmed_settings
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlmodel import Session, SQLModel, create_engine
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    eutils = FakeEutilsServer(
+        latency_seconds=args.eutils_latency, error_rate=args.eutils_error_rate, seed=args.seed
+    ).start()
+    chat = FakeChatCompletionsServer(latency_seconds=args.llm_latency).start()
+    get_pubmed_settings().base_url = eutils.url
+    original_client = llm.client
+    llm.client = OpenAI(api_key="loadtest", base_url=chat.base_url)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "loadtest.db"
+        engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as db:
+            db.add(User(username="loadtest", firebase_uid="loadtest"))
+            db.commit()
+
+        def _get_db():
+            with Session(engine) as session:
+                yield session
+
+        async def _get_async_db():
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                yield session
+
+        app.dependency_overrides[get_db] = _get_db
+        app.dependency_overrides[get_async_db] = _get_async_db
+        app.dependency_overrides[get_current_user] = lambda: "loadtest"
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+                return await run_load(client, args, {}, monitor_loop=True)
+        finally:
+            app.dependency_overrides.clear()
+            llm.client = original_client
+            get_pubmed_settings.cache_clear()
+            eutils.stop()
+            chat.stop()
+            engine.dispose()
+            await async_engine.dispose()
+
+async def run_against_url(args) -> LoadTestReport:
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        return await run_load(client, args, headers, monitor_loop=False)
+
+def print_report(summary: dict):
+    print(f"{'kind':<10}{'requests':>10}{'rps':>10}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for kind, stats in [*summary["by_kind"].items(), ("overall", summary["overall"])]:
+        print(
+            f"{kind:<10}{stats['requests']:>10}{stats['throughput_rps']:>10.1f}{stats['error_rate']:>9.1%}"
+            f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+        )
+    lag = summary.get("event_loop_lag")
+    if lag:
+        print(f"event loop lag: p50 {lag['p50_ms']:.1f} ms  p99 {lag['p99_ms']:.1f} ms  max {lag['max_ms']:.1f} ms")
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="起動済みサーバーのURL（省略時はプロセス内で実行）")
+    parser.add_argument("--token", help="--url 指定時に使用するFirebase IDトークン")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mix", default="search=3,generate=1")
+    parser.add_argument("--max-results", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--eutils-latency", type=float, default=0.05)
+    parser.add_argument("--eutils-error-rate", type=float, default=0.0, help="E-utilities代替サーバーが429を返す割合")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--max-loop-lag-ms", type=float, default=100.0, help="イベントループ遅延の許容上限（超えた場合は終了コード1）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="結果をJSONで保存")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_against_url(args) if args.url else run_in_process(args))
+    summary = report.summary()
+    print_report(summary)
+    if args.output:
+        args.output.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+    lag = summary.get("event_loop_lag")
+    if lag and lag["max_ms"] > args.max_loop_lag_ms:
+        print(f"Event loop was blocked for up to {lag['max_ms']:.1f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
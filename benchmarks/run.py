@@ -0,0 +1,368 @@
+"""
+ホットパスのベンチマーク
+
+ローカルの代替サーバー（benchmarks.fakes）に対して実行し、結果をJSONで出力する。
+--baseline を指定すると前回の結果と比較し、中央値が閾値を超えて悪化した場合は終了コード1を返す。
+
+    python -m benchmarks.run --output benchmarks/latest.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --max-regression 0.2
+
+benchmarks/baseline.json はリポジトリで管理する基準値（既定の引数・合成データで計測）。
+所要時間は実行環境に依存するため、別のマシンで比較する場合は変更前のコミットで
+--output benchmarks/baseline.json を実行して基準値を作り直してから比較する。
+ホットパスを意図的に変更した場合は、同じ手順で baseline.json を更新してコミットする。
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import Future
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from openai import OpenAI
+from sqlmodel import Session, SQLModel, create_engine
+
+from benchmarks.fakes import FakeEutilsServer, FakeChatCompletionsServer, efetch_xml, synthetic_mesh_records, FIRST_PMID
+from src import llm
+from src.corpus import ColumnarCorpus, LANGUAGE_BITS, PUBLICATION_TYPE_BITS, _Dictionary
+from src.mesh import MeshIndex
+from src.papers import build_corpus, upsert_papers
+from src.prefetch import SearchResultCache, canonical_query
+from src.pubmed import PubMedAdvancedSearch, _parse_efetch_xml
+from src.responses import FastJSONResponse
+from src.schemas import SearchCriteria, PublicationType, Language, SearchField, SortBy, ArticleResponse
+from src.services import ArticleGenerator
+from src.workers import shutdown_process_pool
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    repeats: int
+    items_per_op: int
+    median_seconds: float
+    p95_seconds: float
+    min_seconds: float
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items_per_op / self.median_seconds if self.median_seconds else 0.0
+
+def measure(name: str, func: Callable[[], object], repeats: int, items_per_op: int = 1, warmup: int = 1) -> BenchmarkResult:
+    """funcを繰り返し実行して所要時間の分布を計測"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return BenchmarkResult(
+        name=name,
+        repeats=repeats,
+        items_per_op=items_per_op,
+        median_seconds=statistics.median(timings),
+        p95_seconds=timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        min_seconds=timings[0],
+    )
+
+def _complex_criteria(max_results: int = 100) -> SearchCriteria:
+    return SearchCriteria(
+        keywords="COVID-19 treatment",
+        search_fields=[SearchField.TITLE, SearchField.ABSTRACT],
+        exclude_keywords=["preprint", "protocol"],
+        mesh_terms=["COVID-19", "Antiviral Agents"],
+        publication_types=[PublicationType.META_ANALYSIS, PublicationType.RANDOMIZED_CONTROLLED_TRIAL],
+        authors=["Smith J", "Tanaka H"],
+        journals=["Lancet", "N Engl J Med", "JAMA"],
+        languages=[Language.ENGLISH, Language.JAPANESE],
+        start_year=2020,
+        humans_only=True,
+        max_results=max_results,
+        sort_by=SortBy.DATE,
+    )
+
+def bench_build_search_query(args, servers) -> BenchmarkResult:
+    searcher = PubMedAdvancedSearch()
+    criteria = _complex_criteria()
+    iterations = 1000
+    return measure(
+        "build_search_query",
+        lambda: [searcher._build_search_query(criteria) for _ in range(iterations)],
+        args.repeats,
+        items_per_op=iterations,
+    )
+
+def bench_parse_articles(args, servers) -> BenchmarkResult:
+    searcher = PubMedAdvancedSearch()
+    batch = 200
+    content = efetch_xml(list(range(FIRST_PMID, FIRST_PMID + batch)), args.recordings)
+    return measure("parse_articles", lambda: searcher._parse_articles(content), args.repeats, items_per_op=batch)
+
+def bench_parse_articles_parallel(args, servers) -> BenchmarkResult:
+    """複数バッチを同時にパース（プロセスプールのワーカー数に応じてスケールする）"""
+    searcher = PubMedAdvancedSearch()
+    batch, batches = 200, 8
+    contents = [
+        efetch_xml(list(range(FIRST_PMID + i * batch, FIRST_PMID + (i + 1) * batch)), args.recordings)
+        for i in range(batches)
+    ]
+
+    def parse_all():
+        parsed = [searcher._parse_articles_async(content) for content in contents]
+        return [searcher._collect_parsed(p) if isinstance(p, Future) else p for p in parsed]
+
+    return measure("parse_articles_parallel", parse_all, max(1, args.repeats // 5), items_per_op=batch * batches)
+
+def bench_search_papers(args, servers) -> BenchmarkResult:
+    criteria = _complex_criteria(max_results=args.search_results)
+    return measure(
+        "search_papers",
+        lambda: PubMedAdvancedSearch(api_key="benchmark", base_url=f"{servers['eutils'].url}").search_papers(criteria),
+        max(1, args.repeats // 5),
+        items_per_op=args.search_results,
+    )
+
+def bench_prefetched_search(args, servers) -> BenchmarkResult:
+    """事前取得済みの検索（検索条件の正規化とキャッシュの参照）"""
+    criteria = _complex_criteria(max_results=args.search_results)
+    cache = SearchResultCache(maxsize=10, ttl=3600)
+    cache.put(canonical_query(criteria)[0], PubMedAdvancedSearch()._parse_articles(
+        efetch_xml(list(range(FIRST_PMID, FIRST_PMID + args.search_results)), args.recordings)
+    ))
+    return measure(
+        "prefetched_search",
+        lambda: cache.get(canonical_query(criteria)[0]),
+        args.repeats,
+        items_per_op=args.search_results,
+    )
+
+def bench_generate_article(args, servers) -> BenchmarkResult:
+    articles = PubMedAdvancedSearch()._parse_articles(
+        efetch_xml(list(range(FIRST_PMID, FIRST_PMID + args.generate_articles)), args.recordings)
+    )
+    generator = ArticleGenerator(llm_client=llm.get_client())
+    return measure(
+        "generate_article",
+        lambda: generator.generate_article(articles),
+        max(1, args.repeats // 5),
+        items_per_op=len(articles),
+    )
+
+def bench_serialize_results(args, servers) -> BenchmarkResult:
+    articles = PubMedAdvancedSearch()._parse_articles(
+        efetch_xml(list(range(FIRST_PMID, FIRST_PMID + 500)), args.recordings)
+    )
+    return measure("serialize_results", lambda: FastJSONResponse(articles), args.repeats, items_per_op=len(articles))
+
+def bench_save_results(args, servers) -> BenchmarkResult:
+    articles = PubMedAdvancedSearch()._parse_articles(
+        efetch_xml(list(range(FIRST_PMID, FIRST_PMID + 500)), args.recordings)
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "results.jsonl.gz"
+        return measure(
+            "save_results",
+            lambda: PubMedAdvancedSearch().save_results(articles, path),
+            max(1, args.repeats // 5),
+            items_per_op=len(articles),
+        )
+
+def bench_mesh_autocomplete(args, servers) -> BenchmarkResult:
+    """メモリマップしたMeSHインデックスでのオートコンプリートと下位記述子の展開"""
+    with tempfile.TemporaryDirectory() as tmp:
+        MeshIndex.from_records(synthetic_mesh_records(30000)).save(tmp)
+        index = MeshIndex.load(tmp)
+        prefixes = ["p", "pat", "treatment", "risk 1", "D0001", "zzz"]
+        descriptors = [index.lookup(term) for term in ("D000010", "D000500", "D020000")]
+        return measure(
+            "mesh_autocomplete",
+            lambda: ([index.autocomplete(prefix) for prefix in prefixes], [index.subtree(d) for d in descriptors]),
+            args.repeats,
+            items_per_op=len(prefixes) + len(descriptors),
+        )
+
+def _synthetic_corpus(size: int, seed: int = 0) -> ColumnarCorpus:
+    """
+    ローカルコーパスの代替データ（カラムを直接生成）
+
+    論文あたり平均12件のMeSH（ヒト研究が約7割）、約1万誌・約3万記述子と実際のPubMedに近い分布にする。
+    """
+    rng = np.random.default_rng(seed)
+    journals = _Dictionary([f"Journal {i}" for i in range(10000)])
+    mesh = _Dictionary(["Humans"] + [f"Term {i}" for i in range(1, 30000)])
+    mesh_ui = [f"D{i:06d}" for i in range(30000)]
+    mesh_counts = rng.poisson(11, size)
+    mesh_codes = rng.zipf(1.3, int(mesh_counts.sum())) % 30000
+    # ヒト研究のMeSH（コード0）を約7割の論文の先頭に付与
+    humans = rng.random(size) < 0.7
+    mesh_codes[np.concatenate([[0], np.cumsum(mesh_counts)[:-1]])[humans & (mesh_counts > 0)]] = 0
+    pub_types = np.array(list(PUBLICATION_TYPE_BITS.values()), dtype="uint16")
+    journal_codes = (rng.zipf(1.2, size) % 10000).astype("int32")
+    columns = {
+        "pmid": np.arange(FIRST_PMID, FIRST_PMID + size, dtype="int64"),
+        "year": rng.integers(1990, 2025, size).astype("int16"),
+        "journal": journal_codes,
+        "journal_abbrev": np.full(size, -1, dtype="int32"),
+        "pub_types": pub_types[rng.integers(0, len(pub_types), size)] | PUBLICATION_TYPE_BITS["Journal Article"],
+        "languages": np.where(rng.random(size) < 0.9, LANGUAGE_BITS["eng"], LANGUAGE_BITS["jpn"]).astype("uint16"),
+        "mesh_indptr": np.concatenate([[0], np.cumsum(mesh_counts)]).astype("int64"),
+        "mesh_codes": mesh_codes.astype("int32"),
+    }
+    return ColumnarCorpus(columns, journals, mesh, mesh_ui)
+
+def bench_corpus_search(args, servers) -> BenchmarkResult:
+    """ローカルコーパス（--corpus-size 件）での条件絞り込み（出版タイプ・言語・年・ジャーナル・MeSH）"""
+    corpus = _synthetic_corpus(args.corpus_size)
+    criteria = [
+        SearchCriteria(keywords="", publication_types=[PublicationType.META_ANALYSIS], start_year=2020, max_results=1000),
+        SearchCriteria(keywords="", languages=[Language.JAPANESE], humans_only=True, max_results=1000),
+        SearchCriteria(keywords="", journals=["Journal 1", "Journal 2"], mesh_terms=["Term 5", "D000100"], max_results=1000),
+    ]
+    return measure(
+        "corpus_search",
+        lambda: [corpus.search(c) for c in criteria],
+        args.repeats,
+        items_per_op=len(corpus) * len(criteria),
+    )
+
+def bench_build_corpus(args, servers) -> BenchmarkResult:
+    """保存済みの論文テーブルからのコーパス構築"""
+    count = 2000
+    articles = PubMedAdvancedSearch()._parse_articles(
+        efetch_xml(list(range(FIRST_PMID, FIRST_PMID + count)), args.recordings)
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/papers.db")
+        SQLModel.metadata.create_all(engine)
+        try:
+            with Session(engine) as db:
+                upsert_papers(db, articles)
+                db.commit()
+                return measure("build_corpus", lambda: build_corpus(db), max(1, args.repeats // 5), items_per_op=count)
+        finally:
+            engine.dispose()
+
+def _retained_bytes(build: Callable[[], object]) -> int:
+    """buildの戻り値が保持しているメモリ量（tracemallocで計測）"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        value = build()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del value
+    return retained
+
+def measure_article_memory(args) -> dict:
+    """パース済み論文1件あたりのメモリ量（内部表現とpydanticモデルの比較）"""
+    count = 1000
+    content = efetch_xml(list(range(FIRST_PMID, FIRST_PMID + count)), args.recordings)
+    # プロセス間通信のバッファを含めないよう、このプロセス内でパースする
+    parse = lambda: _parse_efetch_xml(content)[0]
+    parse()   # intern・日付キャッシュのウォームアップ
+    records = _retained_bytes(parse)
+    models = _retained_bytes(lambda: [ArticleResponse(**r.to_dict()) for r in parse()])
+    return {
+        "articles": count,
+        "record_bytes_per_article": records / count,
+        "pydantic_bytes_per_article": models / count,
+    }
+
+BENCHMARKS: dict[str, Callable] = {
+    "build_search_query": bench_build_search_query,
+    "parse_articles": bench_parse_articles,
+    "parse_articles_parallel": bench_parse_articles_parallel,
+    "search_papers": bench_search_papers,
+    "prefetched_search": bench_prefetched_search,
+    "generate_article": bench_generate_article,
+    "serialize_results": bench_serialize_results,
+    "save_results": bench_save_results,
+    "mesh_autocomplete": bench_mesh_autocomplete,
+    "corpus_search": bench_corpus_search,
+    "build_corpus": bench_build_corpus,
+}
+
+def compare(results: list[BenchmarkResult], baseline: dict, max_regression: float) -> list[str]:
+    """ベースラインに対して中央値が max_regression を超えて悪化したベンチマークを列挙"""
+    regressions = []
+    for result in results:
+        previous = baseline.get("results", {}).get(result.name)
+        if not previous:
+            continue
+        ratio = result.median_seconds / previous["median_seconds"] - 1
+        if ratio > max_regression:
+            regressions.append(
+                f"{result.name}: median {previous['median_seconds']:.6f}s -> {result.median_seconds:.6f}s (+{ratio:.0%})"
+            )
+    return regressions
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", type=Path, default=Path("benchmarks/latest.json"))
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS))
+    parser.add_argument("--recordings", type=Path, help="記録済みefetch XMLのディレクトリ（<dir>/efetch/<pmid>.xml）")
+    parser.add_argument("--eutils-latency", type=float, default=0.02)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--search-results", type=int, default=300)
+    parser.add_argument("--generate-articles", type=int, default=10)
+    parser.add_argument("--corpus-size", type=int, default=1_000_000, help="corpus_search のローカルコーパスの論文数")
+    args = parser.parse_args(argv)
+
+    eutils = FakeEutilsServer(latency_seconds=args.eutils_latency, recordings_dir=args.recordings).start()
+    chat = FakeChatCompletionsServer(latency_seconds=args.llm_latency).start()
+    original_client = llm.client
+    llm.client = OpenAI(api_key="benchmark", base_url=chat.base_url)
+    try:
+        results = []
+        for name in args.only or BENCHMARKS:
+            result = BENCHMARKS[name](args, {"eutils": eutils, "chat": chat})
+            results.append(result)
+            print(
+                f"{result.name:<20} median {result.median_seconds * 1000:10.3f} ms  "
+                f"p95 {result.p95_seconds * 1000:10.3f} ms  {result.items_per_second:12.1f} items/s"
+            )
+        memory = measure_article_memory(args)
+        print(
+            f"{'article_memory':<20} record {memory['record_bytes_per_article']:10.0f} B  "
+            f"pydantic {memory['pydantic_bytes_per_article']:10.0f} B  per article"
+        )
+    finally:
+        llm.client = original_client
+        shutdown_process_pool()
+        eutils.stop()
+        chat.stop()
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {result.name: {**asdict(result), "items_per_second": result.items_per_second} for result in results},
+        "memory": memory,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
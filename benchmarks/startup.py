@@ -0,0 +1,103 @@
+"""
+起動時間のベンチマーク
+
+新しいPythonプロセスで `python -X importtime` を使ってアプリのインポート時間の内訳を計測し、
+プロセス起動から最初のリクエストが返るまでの時間（コールドスタート）も計測する。
+
+    python -m benchmarks.startup --repeats 5 --top 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 初回使用時まで読み込まないモジュール（起動時に読み込まれていればリグレッション）
+DEFERRED_MODULES = ("openai", "firebase_admin", "jwt", "cryptography.x509", "numpy")
+
+FIRST_REQUEST_SCRIPT = """
+import time
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+from src.app import app
+imported = time.perf_counter()
+response = TestClient(app).get("/metrics")
+assert response.status_code == 200, response.status_code
+print(imported - start, time.perf_counter() - start)
+"""
+
+@dataclass
+class ImportProfile:
+    total_seconds: float
+    # モジュール名 -> (自身のインポート時間, 依存を含む累積時間)（秒）
+    modules: dict[str, tuple[float, float]] = field(default_factory=dict)
+
+    def top(self, n: int) -> list[tuple[str, float, float]]:
+        """自身のインポート時間が長いモジュール"""
+        ranked = sorted(self.modules.items(), key=lambda item: item[1][0], reverse=True)
+        return [(name, own, cumulative) for name, (own, cumulative) in ranked[:n]]
+
+def _run(args: list[str]) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+def parse_importtime(stderr: str) -> dict[str, tuple[float, float]]:
+    """`-X importtime` の出力をパース"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(own) / 1e6, int(cumulative) / 1e6)
+    return modules
+
+def import_profile(module: str = "src.app") -> ImportProfile:
+    """新しいプロセスでモジュールをインポートし、インポート時間の内訳を取得"""
+    modules = parse_importtime(_run(["-X", "importtime", "-c", f"import {module}"]).stderr)
+    return ImportProfile(total_seconds=modules.get(module, (0.0, 0.0))[1], modules=modules)
+
+def time_to_first_request() -> tuple[float, float]:
+    """新しいプロセスで (アプリのインポート時間, 最初のリクエストが返るまでの時間) を計測"""
+    imported, first_request = _run(["-c", FIRST_REQUEST_SCRIPT]).stdout.split()
+    return float(imported), float(first_request)
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="src.app")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", type=Path, help="結果をJSONで保存")
+    args = parser.parse_args(argv)
+
+    profile = import_profile(args.module)
+    print(f"{'module':<50}{'self ms':>10}{'cumulative ms':>15}")
+    for name, own, cumulative in profile.top(args.top):
+        print(f"{name:<50}{own * 1000:>10.1f}{cumulative * 1000:>15.1f}")
+
+    samples = [time_to_first_request() for _ in range(args.repeats)]
+    imports = statistics.median(sample[0] for sample in samples)
+    first_requests = statistics.median(sample[1] for sample in samples)
+    print(f"import {args.module}: median {imports * 1000:.1f} ms")
+    print(f"time to first request: median {first_requests * 1000:.1f} ms")
+
+    loaded = [name for name in DEFERRED_MODULES if name in profile.modules]
+    if args.output:
+        args.output.write_text(json.dumps({
+            "import_seconds": imports,
+            "first_request_seconds": first_requests,
+            "top_modules": profile.top(args.top),
+            "eagerly_loaded": loaded,
+        }, indent=2), encoding="utf-8")
+    if loaded:
+        print(f"Modules that should be loaded lazily were imported at startup: {', '.join(loaded)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,72 @@
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
-from .database import init_db
-from .routers import pubmed_search, article
+from fastapi import FastAPI, Request
+from starlette.concurrency import run_in_threadpool
+from .database import init_db, engine
+from .metrics import HTTP_REQUEST_SECONDS
+from .responses import FastJSONResponse
+from .profiling import ProfilingMiddleware, get_profiling_settings
+from .routers import pubmed_search, article, saved_searches, metrics, profiling, mesh, typeahead, citations
+from .watches import WatchScheduler, get_watch_settings
+from .workers import shutdown_process_pool
+from .citations import save_citation_graph
+from .mesh import get_mesh_index
+from .prefetch import PrefetchScheduler, get_prefetch_settings
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     init_db()
+    # MeSHインデックスの読み込み（構築元のXMLが更新されていれば再構築）を起動時に済ませ、
+    # 最初の検索リクエストでXMLのパースを待たせない
+    await run_in_threadpool(get_mesh_index)
+    scheduler = WatchScheduler(engine) if get_watch_settings().enabled else None
+    if scheduler:
+        scheduler.start()
+    prefetcher = PrefetchScheduler(engine) if get_prefetch_settings().enabled else None
+    if prefetcher:
+        prefetcher.start()
     yield
+    if scheduler:
+        await scheduler.stop()
+    if prefetcher:
+        await prefetcher.stop()
+    shutdown_process_pool()
+    save_citation_graph(force=True)
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# オンデマンドのリクエストプロファイリング（トークン未設定時はミドルウェアを登録しない）
+if get_profiling_settings().token:
+    app.add_middleware(ProfilingMiddleware)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """ルート単位のレイテンシを記録"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=str(status)
+        )
 
 # ルーターを登録
 app.include_router(pubmed_search.router, prefix="/api", tags=["PubMed Search"])
 app.include_router(article.router, prefix="/api", tags=["Article"])
+app.include_router(saved_searches.router, prefix="/api", tags=["Saved Search"])
+app.include_router(metrics.router, tags=["Metrics"])
+app.include_router(profiling.router, prefix="/api", tags=["Profiling"])
+app.include_router(mesh.router, prefix="/api", tags=["MeSH"])
+app.include_router(typeahead.router, prefix="/api", tags=["Typeahead"])
+app.include_router(citations.router, prefix="/api", tags=["Citations"])
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,117 @@
+# project/article_search.py
+
+from datetime import datetime
+from sqlalchemy import and_, column, event, literal_column, or_, select, table, text
+from sqlalchemy.orm import Session
+from .models import Article
+
+FTS_TABLE = "articles_fts"
+
+# trigram トークナイザは分かち書きのない日本語にも部分一致でき、3文字以上の語はインデックスで検索できる
+MIN_INDEXED_TERM_LENGTH = 3
+
+FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, summary, content,
+        content='articles', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, summary, content)
+        VALUES (new.id, new.title, new.summary, new.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary, content)
+        VALUES ('delete', old.id, old.title, old.summary, old.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, summary, content ON articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary, content)
+        VALUES ('delete', old.id, old.title, old.summary, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, title, summary, content)
+        VALUES (new.id, new.title, new.summary, new.content);
+    END
+    """,
+]
+
+_fts = table(FTS_TABLE, column("rowid"))
+
+def ensure_article_fts(connection) -> None:
+    """
+    記事の全文検索インデックス（SQLite FTS5）とトリガーを作成
+
+    既存のDBに後から作成した場合は、既存の記事からインデックスを再構築する。
+    SQLite以外では何もしない。
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first()
+    for statement in FTS_DDL:
+        connection.execute(text(statement))
+    if not exists:
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+@event.listens_for(Article.__table__, "after_create")
+def _create_article_fts(target, connection, **kwargs):
+    ensure_article_fts(connection)
+
+def _fts_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+def _match_conditions(db: Session, query: str) -> tuple[list, bool]:
+    """検索語ごとの条件と、FTSインデックスとの結合が必要かどうかを返す"""
+    terms = query.split()
+    use_fts = db.get_bind().dialect.name == "sqlite"
+    indexed = [term for term in terms if use_fts and len(term) >= MIN_INDEXED_TERM_LENGTH]
+    conditions = []
+    if indexed:
+        conditions.append(literal_column(FTS_TABLE).op("MATCH")(" ".join(_fts_phrase(term) for term in indexed)))
+
+    # インデックスで扱えない短い語（とSQLite以外のDB）は部分一致で絞り込む
+    for term in terms:
+        if term in indexed:
+            continue
+        pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        conditions.append(or_(
+            Article.title.ilike(pattern, escape="\\"),
+            Article.summary.ilike(pattern, escape="\\"),
+            Article.content.ilike(pattern, escape="\\"),
+        ))
+    return conditions, bool(indexed)
+
+def search_articles(
+    db: Session,
+    user_id: int,
+    query: str | None = None,
+    limit: int = 20,
+    after: tuple[datetime, int] | None = None
+) -> tuple[list[Article], bool]:
+    """
+    ユーザーの記事を新しい順に一覧・全文検索
+
+    after には前ページ最後の記事の (created_at, id) を指定する（キーセットページング）。
+    (記事のリスト, 次のページがあるか) を返す。
+    """
+    statement = select(Article).where(Article.user_id == user_id)
+    if query and query.strip():
+        conditions, use_fts = _match_conditions(db, query)
+        if use_fts:
+            statement = statement.join(_fts, _fts.c.rowid == Article.id)
+        statement = statement.where(*conditions)
+    if after is not None:
+        created_at, article_id = after
+        statement = statement.where(or_(
+            Article.created_at < created_at,
+            and_(Article.created_at == created_at, Article.id < article_id)
+        ))
+    statement = statement.order_by(Article.created_at.desc(), Article.id.desc()).limit(limit + 1)
+
+    articles = list(db.execute(statement).scalars())
+    return articles[:limit], len(articles) > limit
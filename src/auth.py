@@ -1,15 +1,195 @@
-from firebase_admin import auth, initialize_app
+import hashlib
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Callable
+import requests
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-
-# Firebase初期化
-initialize_app()
+from pydantic_settings import BaseSettings
+from starlette.concurrency import run_in_threadpool
+from .cache import TTLCache
+from .metrics import REGISTRY
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+FIREBASE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+
+class TokenVerificationError(Exception):
+    """IDトークンの検証に失敗した場合のエラー"""
+    pass
+
+class AuthSettings(BaseSettings):
+    firebase_project_id: str | None = None   # 未設定の場合はFirebaseアプリのproject_idを使用
+    token_cache_size: int = 10000
+    clock_skew_seconds: int = 5
+    certs_url: str = FIREBASE_CERTS_URL
+
+    class Config:
+        env_prefix = "AUTH_"
+
+@lru_cache()
+def get_auth_settings() -> AuthSettings:
+    return AuthSettings()
+
+@lru_cache()
+def get_firebase_app():
+    """
+    Firebaseアプリを取得（初回呼び出し時に初期化）
+
+    起動時間を短くするため、firebase_admin のインポートと初期化はインポート時ではなく初回使用時に行う。
+    """
+    import firebase_admin
+    try:
+        return firebase_admin.get_app()
+    except ValueError:
+        return firebase_admin.initialize_app()
+
+
+def _max_age(cache_control: str | None, default: int = 3600) -> int:
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(match.group(1)) if match else default
+
+def fetch_google_public_keys(url: str) -> tuple[dict[str, str], int]:
+    """Googleの署名用公開鍵（PEM）と、Cache-Controlから求めたキャッシュ秒数を取得"""
+    response = requests.get(url, timeout=10)
+    response.raise_for_status()
+    return response.json(), _max_age(response.headers.get("Cache-Control"))
+
+class PublicKeyCache:
+    """
+    IDトークン署名用の公開鍵のキャッシュ
+
+    レスポンスのCache-Control（max-age）に従って再取得する。
+    未知のkidの場合も再取得するが、min_refresh_interval 秒に1回までに制限する。
+    """
+    def __init__(
+        self,
+        fetch: Callable[[], tuple[dict[str, str], int]],
+        min_refresh_interval: float = 60,
+        timer: Callable[[], float] = time.monotonic
+    ):
+        self._fetch = fetch
+        self._min_refresh_interval = min_refresh_interval
+        self._timer = timer
+        self._keys: dict[str, object] = {}
+        self._expires_at = 0.0
+        self._fetched_at: float | None = None
+        self._lock = threading.Lock()
+
+    def get(self, kid: str):
+        now = self._timer()
+        key = self._keys.get(kid)
+        if key is not None and now < self._expires_at:
+            return key
+
+        with self._lock:
+            refresh_allowed = self._fetched_at is None or now - self._fetched_at >= self._min_refresh_interval
+            if (now >= self._expires_at or kid not in self._keys) and refresh_allowed:
+                pems, max_age = self._fetch()
+                self._keys = {key_id: self._load_key(pem) for key_id, pem in pems.items()}
+                self._fetched_at = now
+                self._expires_at = now + max_age
+
+        key = self._keys.get(kid)
+        if key is None:
+            raise TokenVerificationError(f"Unknown signing key: {kid}")
+        return key
+
+    @staticmethod
+    def _load_key(pem: str):
+        from cryptography import x509
+        from cryptography.hazmat.primitives.serialization import load_pem_public_key
+
+        data = pem.encode()
+        if b"BEGIN CERTIFICATE" in data:
+            return x509.load_pem_x509_certificate(data).public_key()
+        return load_pem_public_key(data)
+
+class FirebaseTokenVerifier:
+    """
+    Firebase IDトークンのローカル検証
+
+    公開鍵はキャッシュし、検証済みトークンは有効期限（exp）まで有界LRUに保持する。
+    """
+    def __init__(
+        self,
+        project_id: str,
+        key_cache: PublicKeyCache,
+        cache_size: int = 10000,
+        clock_skew_seconds: int = 5
+    ):
+        self.project_id = project_id
+        self.key_cache = key_cache
+        self.clock_skew_seconds = clock_skew_seconds
+        self.token_cache: TTLCache[bytes, dict] = TTLCache(maxsize=cache_size, ttl=3600)
+
+    @staticmethod
+    def _cache_key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def cached(self, token: str) -> dict | None:
+        """検証済みでまだ有効なトークンのクレームを返す（未検証の場合はNone）"""
+        return self.token_cache.get(self._cache_key(token))
+
+    def verify(self, token: str) -> dict:
+        """
+        IDトークンを検証してクレームを返す
+
+        Raises:
+            TokenVerificationError: 署名・発行者・対象・有効期限のいずれかが不正な場合
+        """
+        claims = self.cached(token)
+        if claims is not None:
+            return claims
+
+        import jwt
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            if not kid:
+                raise TokenVerificationError("Token has no key id")
+            claims = jwt.decode(
+                token,
+                self.key_cache.get(kid),
+                algorithms=["RS256"],
+                audience=self.project_id,
+                issuer=f"https://securetoken.google.com/{self.project_id}",
+                leeway=self.clock_skew_seconds,
+                options={"require": ["exp", "iat", "sub"]},
+            )
+        except jwt.PyJWTError as e:
+            raise TokenVerificationError(str(e))
+
+        if not claims.get("sub"):
+            raise TokenVerificationError("Token has no subject")
+        claims["uid"] = claims["sub"]
+
+        ttl = claims["exp"] - time.time()
+        if ttl > 0:
+            self.token_cache.set(self._cache_key(token), claims, ttl=ttl)
+        return claims
+
+@lru_cache()
+def get_token_verifier() -> FirebaseTokenVerifier:
+    settings = get_auth_settings()
+    verifier = FirebaseTokenVerifier(
+        project_id=settings.firebase_project_id or get_firebase_app().project_id,
+        key_cache=PublicKeyCache(lambda: fetch_google_public_keys(settings.certs_url)),
+        cache_size=settings.token_cache_size,
+        clock_skew_seconds=settings.clock_skew_seconds
+    )
+    REGISTRY.register_cache("firebase_tokens", verifier.token_cache)
+    return verifier
 
 async def verify_firebase_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        decoded_token = auth.verify_id_token(credentials.credentials)
+        verifier = get_token_verifier()
+        # 検証済みトークンはイベントループ上で即座に返し、署名検証のみスレッドで実行
+        decoded_token = verifier.cached(credentials.credentials)
+        if decoded_token is None:
+            decoded_token = await run_in_threadpool(verifier.verify, credentials.credentials)
         return decoded_token
     except Exception:
         raise HTTPException(
@@ -19,4 +199,19 @@ async def verify_firebase_token(credentials: HTTPAuthorizationCredentials = Depe
         )
 
 def get_current_user(token: dict = Depends(verify_firebase_token)):
-    return token.get('uid')
\ No newline at end of file
+    uid = token.get('uid')
+    if not uid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return uid
+
+async def get_optional_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(optional_security)
+) -> str | None:
+    """Bearerトークンがあれば検証してFirebase UIDを返す（なければNone。不正なトークンは401）"""
+    if credentials is None:
+        return None
+    return get_current_user(await verify_firebase_token(credentials))
@@ -0,0 +1,93 @@
+# project/cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+class TTLCache(Generic[K, V]):
+    """
+    有効期限付きのLRUキャッシュ（スレッドセーフ）
+
+    maxsizeを超えた場合は最も古く参照されたエントリから破棄する。
+    エントリごとに有効期限を指定することもできる。
+    weigher・max_weight を指定すると、エントリの重み（例: 保持する論文数）の合計も上限とする。
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        timer: Callable[[], float] = time.monotonic,
+        weigher: Callable[[V], int] | None = None,
+        max_weight: int | None = None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self._timer = timer
+        self._weigher = weigher
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._weights: dict[K, int] = {}
+        self._lock = threading.Lock()
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _remove(self, key: K) -> tuple[float, V]:
+        self.weight -= self._weights.pop(key, 0)
+        return self._data.pop(key)
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > self._timer():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+            return default
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """値を保存（ttlを省略した場合はキャッシュ既定の有効期限）"""
+        expires_at = self._timer() + (self.ttl if ttl is None else ttl)
+        weight = self._weigher(value) if self._weigher is not None else 0
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (expires_at, value)
+            if weight:
+                self._weights[key] = weight
+                self.weight += weight
+            while len(self._data) > self.maxsize or (
+                self.max_weight is not None and self.weight > self.max_weight and len(self._data) > 1
+            ):
+                self._remove(next(iter(self._data)))
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._weights.clear()
+            self.weight = 0
+
+    def __contains__(self, key: K) -> bool:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return entry is not _MISSING and entry[0] > self._timer()
+
+    def __len__(self) -> int:
+        return len(self._data)
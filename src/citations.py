@@ -0,0 +1,558 @@
+# project/citations.py
+
+from __future__ import annotations
+import json
+import logging
+import os
+import secrets
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, Sequence
+from pydantic_settings import BaseSettings
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class CitationSettings(BaseSettings):
+    enabled: bool = True
+    graph_dir: str = "data/citations"   # 引用グラフの保存先
+    refresh_days: int = 30              # これより前に取得した被引用は取得し直す
+    elink_batch_size: int = 100         # elink 1回あたりのPMID数
+    compact_edges: int = 100_000        # 未圧縮の追加辺がこれを超えたらCSRに統合して保存
+    related_max_neighbors: int = 200    # 関連論文の計算のために引用関係を取得する近傍論文数の上限
+    pagerank_damping: float = 0.85
+    pagerank_iterations: int = 100
+    pagerank_tolerance: float = 1e-10
+
+    class Config:
+        env_prefix = "CITATIONS_"
+
+@lru_cache()
+def get_citation_settings() -> CitationSettings:
+    return CitationSettings()
+
+class CitationGraphError(Exception):
+    """引用グラフ関連のエラー"""
+    pass
+
+FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"     # 最新のスナップショットのディレクトリ名
+LOCK_FILE = ".lock"
+
+# カラム名 -> dtype
+_COLUMNS: dict[str, str] = {
+    "pmids": "int64",          # ノード番号 -> PMID
+    "linked_at": "int32",      # 引用・被引用を取得した日（UNIX日数、0 = 未取得）
+    "sorted_pmids": "int64",   # PMID -> ノード番号の二分探索用
+    "sorted_nodes": "int32",
+    "ref_indptr": "int64",     # CSR形式: ノードiが引用する論文は ref_indices[ref_indptr[i]:ref_indptr[i+1]]
+    "ref_indices": "int32",
+    "cite_indptr": "int64",    # CSR形式: ノードiを引用する論文は cite_indices[cite_indptr[i]:cite_indptr[i+1]]
+    "cite_indices": "int32",
+}
+
+def _today() -> int:
+    return int(time.time() // 86400)
+
+def _csr(rows: np.ndarray, cols: np.ndarray, size: int) -> tuple[np.ndarray, np.ndarray]:
+    import numpy as np
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(size + 1, dtype="int64")
+    np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+    return indptr, cols[order].astype("int32")
+
+def _gather(indptr: np.ndarray, indices: np.ndarray, nodes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """複数ノードの隣接ノードをまとめて取得（(元ノードの位置, 隣接ノード) の組）"""
+    import numpy as np
+    # 圧縮前に追加されたノードはCSRに含まれない（隣接ノードなしとして扱う）
+    in_csr = nodes < len(indptr) - 1
+    starts = np.where(in_csr, indptr[np.where(in_csr, nodes, 0)], 0)
+    lengths = np.where(in_csr, indptr[np.where(in_csr, nodes + 1, 0)], 0) - starts
+    total = int(lengths.sum())
+    owners = np.repeat(np.arange(len(nodes)), lengths)
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return owners, indices[np.repeat(starts, lengths) + offsets]
+
+@dataclass(frozen=True)
+class RelatedPaper:
+    pmid: str
+    co_citations: int          # 両方を引用している論文の数
+    shared_references: int     # 共通して引用している論文の数（書誌結合）
+
+    @property
+    def score(self) -> int:
+        return self.co_citations + self.shared_references
+
+class CitationGraph:
+    """
+    PMID間の引用グラフ
+
+    ノードはPMIDに振った連番で、引用（references）と被引用（cited by）の両方向をCSR配列で保持する。
+    保存済みのCSRはメモリマップで読み込み、追加された辺は圧縮されるまで別に保持する（追加分のみの差分更新）。
+    PageRank・共引用・書誌結合はCSRに対するNumPyのベクトル演算で計算する。
+    """
+
+    def __init__(self, columns: dict[str, np.ndarray] | None = None):
+        import numpy as np
+        if columns is None:
+            columns = {name: np.zeros(1 if name.endswith("indptr") else 0, dtype=dtype) for name, dtype in _COLUMNS.items()}
+        self.columns = columns
+        self._base_nodes = len(columns["pmids"])
+        self._new_pmids: list[int] = []
+        self._new_nodes: dict[int, int] = {}
+        self._linked_at = np.array(columns["linked_at"], dtype="int32")
+        self._delta: set[tuple[int, int]] = set()
+        self._delta_edges: np.ndarray | None = None
+        self._version = 0                            # ノード・辺の追加ごとに増やす（PageRankのキャッシュの判定用）
+        self._pagerank: np.ndarray | None = None
+        self._pagerank_version = -1
+        self._pagerank_thread: threading.Thread | None = None
+        self._lock = threading.RLock()
+        self.snapshot: str | None = None             # 読み込み・保存したスナップショット
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return self._base_nodes + len(self._new_pmids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.columns["ref_indices"]) + len(self._delta)
+
+    def _lookup(self, pmids: np.ndarray) -> np.ndarray:
+        """PMIDのノード番号（未登録は -1）"""
+        import numpy as np
+        sorted_pmids = self.columns["sorted_pmids"]
+        nodes = np.full(len(pmids), -1, dtype="int64")
+        if len(sorted_pmids):
+            positions = np.minimum(np.searchsorted(sorted_pmids, pmids), len(sorted_pmids) - 1)
+            found = sorted_pmids[positions] == pmids
+            nodes[found] = self.columns["sorted_nodes"][positions[found]]
+        if self._new_nodes:
+            for i in np.flatnonzero(nodes < 0):
+                nodes[i] = self._new_nodes.get(int(pmids[i]), -1)
+        return nodes
+
+    def nodes(self, pmids: Iterable[str | int], create: bool = False) -> np.ndarray:
+        import numpy as np
+        values = np.fromiter((int(pmid) for pmid in pmids), dtype="int64")
+        with self._lock:
+            nodes = self._lookup(values)
+            if create:
+                created = len(self)
+                for i in np.flatnonzero(nodes < 0):
+                    pmid = int(values[i])
+                    node = self._new_nodes.get(pmid)
+                    if node is None:
+                        node = self._new_nodes[pmid] = len(self)
+                        self._new_pmids.append(pmid)
+                    nodes[i] = node
+                if len(self) > created:
+                    self._linked_at = np.concatenate([self._linked_at, np.zeros(len(self) - created, dtype="int32")])
+                    self._version += 1
+            return nodes
+
+    def _linked_days(self, nodes: np.ndarray) -> np.ndarray:
+        import numpy as np
+        days = np.zeros(len(nodes), dtype="int32")
+        known = nodes >= 0
+        days[known] = self._linked_at[nodes[known]]
+        return days
+
+    @property
+    def pending_edges(self) -> int:
+        """CSRに未統合の辺の数"""
+        return len(self._delta)
+
+    def pmid_of(self, nodes: np.ndarray) -> list[str]:
+        base = self.columns["pmids"]
+        return [str(int(base[n]) if n < self._base_nodes else self._new_pmids[n - self._base_nodes]) for n in nodes]
+
+    def stale(self, pmids: Sequence[str], max_age_days: int | None = None) -> list[str]:
+        """引用・被引用が未取得、または取得から max_age_days 日を超えたPMID"""
+        nodes = self.nodes(pmids)
+        max_age_days = get_citation_settings().refresh_days if max_age_days is None else max_age_days
+        with self._lock:
+            linked_at = self._linked_days(nodes)
+        fresh = (linked_at > 0) & (linked_at >= _today() - max_age_days)
+        return [pmid for pmid, ok in zip(pmids, fresh) if not ok]
+
+    def add_links(self, references: dict[str, Iterable[str]], cited_by: dict[str, Iterable[str]]) -> int:
+        """
+        elinkで取得した引用（PMID -> 引用先）・被引用（PMID -> 引用元）を追加し、追加した辺の数を返す
+
+        references・cited_by のキーのPMIDは取得済みとして記録する。既存の辺は重複して追加しない。
+        """
+        edges = [(src, dst) for src, targets in references.items() for dst in targets]
+        edges += [(src, dst) for dst, sources in cited_by.items() for src in sources]
+        with self._lock:
+            linked = self.nodes(set(references) | set(cited_by), create=True)
+            if not edges and not len(linked):
+                return 0
+            src = self.nodes((src for src, _ in edges), create=True)
+            dst = self.nodes((dst for _, dst in edges), create=True)
+            added = self._add_edges(src, dst)
+            self._linked_at[linked] = _today()
+            self.dirty = True
+            return added
+
+    def _add_edges(self, src: np.ndarray, dst: np.ndarray) -> int:
+        added = 0
+        for s, d in zip(src.tolist(), dst.tolist()):
+            if s == d or (s, d) in self._delta or self._has_base_edge(s, d):
+                continue
+            self._delta.add((s, d))
+            added += 1
+        if added:
+            self._delta_edges = None
+            self._version += 1
+        return added
+
+    def merge(self, other: "CitationGraph") -> int:
+        """
+        別のグラフ（他のプロセスが保存したもの）の辺と取得日を取り込み、追加した辺の数を返す
+        """
+        import numpy as np
+        with self._lock:
+            other_pmids = np.concatenate([np.asarray(other.columns["pmids"]), np.array(other._new_pmids, dtype="int64")])
+            mapping = self.nodes(other_pmids.tolist(), create=True)
+            other_src, other_dst = other.edges()
+            src, dst = mapping[other_src], mapping[other_dst]
+            # 既にある辺はまとめて除いてから追加
+            own_src, own_dst = self.edges()
+            size = len(self)
+            new = ~np.isin(src * size + dst, own_src * size + own_dst)
+            added = self._add_edges(src[new], dst[new])
+            self._linked_at[mapping] = np.maximum(self._linked_at[mapping], other._linked_at[:len(mapping)])
+            self.dirty = True
+            return added
+
+    def _has_base_edge(self, src: int, dst: int) -> bool:
+        import numpy as np
+        if src >= self._base_nodes:
+            return False
+        indptr = self.columns["ref_indptr"]
+        targets = self.columns["ref_indices"][indptr[src]:indptr[src + 1]]
+        position = np.searchsorted(targets, dst)
+        return position < len(targets) and targets[position] == dst
+
+    def _delta_array(self) -> np.ndarray:
+        """CSRに未統合の辺（(引用元, 引用先) の行、引用元・引用先の順にソート済み）"""
+        import numpy as np
+        if self._delta_edges is None:
+            self._delta_edges = np.array(sorted(self._delta), dtype="int64").reshape(-1, 2)
+        return self._delta_edges
+
+    def edges(self) -> tuple[np.ndarray, np.ndarray]:
+        """全ての辺 (引用元ノード, 引用先ノード)"""
+        import numpy as np
+        with self._lock:
+            indptr = self.columns["ref_indptr"]
+            src = np.repeat(np.arange(len(indptr) - 1, dtype="int64"), np.diff(indptr))
+            dst = np.asarray(self.columns["ref_indices"], dtype="int64")
+            if self._delta:
+                delta = self._delta_array()
+                src, dst = np.concatenate([src, delta[:, 0]]), np.concatenate([dst, delta[:, 1]])
+            return src, dst
+
+    def _neighbors(self, nodes: np.ndarray, direction: str) -> tuple[np.ndarray, np.ndarray]:
+        """ノードの隣接ノード（direction: "references" / "cited_by"）を (元ノードの位置, 隣接ノード) で返す"""
+        import numpy as np
+        prefix = "ref" if direction == "references" else "cite"
+        owners, neighbors = _gather(self.columns[f"{prefix}_indptr"], self.columns[f"{prefix}_indices"], nodes)
+        if self._delta:
+            delta = self._delta_array()
+            if direction == "cited_by":
+                delta = delta[:, ::-1]
+            position = {int(node): i for i, node in enumerate(nodes)}
+            mask = np.isin(delta[:, 0], nodes)
+            extra = delta[mask]
+            owners = np.concatenate([owners, [position[int(node)] for node in extra[:, 0]]]).astype("int64")
+            neighbors = np.concatenate([neighbors, extra[:, 1]]).astype("int64")
+        return owners, neighbors
+
+    def references(self, pmid: str) -> list[str]:
+        with self._lock:
+            nodes = self.nodes([pmid])
+            if nodes[0] < 0:
+                return []
+            return self.pmid_of(self._neighbors(nodes, "references")[1])
+
+    def cited_by(self, pmid: str) -> list[str]:
+        with self._lock:
+            nodes = self.nodes([pmid])
+            if nodes[0] < 0:
+                return []
+            return self.pmid_of(self._neighbors(nodes, "cited_by")[1])
+
+    def citation_counts(self, pmids: Sequence[str]) -> list[int | None]:
+        """ローカルの被引用数（被引用を取得していない論文はNone）"""
+        import numpy as np
+        with self._lock:
+            nodes = self.nodes(pmids)
+            indptr = self.columns["cite_indptr"]
+            counts = np.zeros(len(nodes), dtype="int64")
+            in_base = (nodes >= 0) & (nodes < self._base_nodes)
+            counts[in_base] = indptr[nodes[in_base] + 1] - indptr[nodes[in_base]]
+            if self._delta:
+                delta_dst = self._delta_array()[:, 1]
+                known = nodes >= 0
+                counts[known] += np.bincount(delta_dst, minlength=len(self))[nodes[known]]
+            linked = self._linked_days(nodes) > 0
+        return [int(count) if ok else None for count, ok in zip(counts, linked)]
+
+    def pagerank(self) -> np.ndarray:
+        """
+        全ノードのPageRank（ノード番号順、合計1）
+
+        引用を持たない（または未取得の）ノードの値は全ノードに均等に配分する。結果はノード・辺が追加されるまでキャッシュする。
+        反復計算はロックを保持せずに行う（その間も被引用数の参照・辺の追加は待たされない）。
+        """
+        import numpy as np
+        with self._lock:
+            if self._pagerank_version == self._version:
+                return self._pagerank
+            version = self._version
+            size = len(self)
+            src, dst = self.edges()
+
+        settings = get_citation_settings()
+        rank = np.zeros(0)
+        if size:
+            out_degree = np.bincount(src, minlength=size).astype("float64")
+            dangling = out_degree == 0
+            weights = np.divide(1.0, out_degree, out=np.zeros(size), where=~dangling)
+            damping = settings.pagerank_damping
+            rank = np.full(size, 1.0 / size)
+            for _ in range(settings.pagerank_iterations):
+                spread = np.bincount(dst, weights=(rank * weights)[src], minlength=size)
+                updated = (1 - damping) / size + damping * (spread + rank[dangling].sum() / size)
+                converged = np.abs(updated - rank).sum() < settings.pagerank_tolerance
+                rank = updated
+                if converged:
+                    break
+
+        with self._lock:
+            if version > self._pagerank_version:
+                self._pagerank, self._pagerank_version = rank, version
+        return rank
+
+    def cached_pagerank(self) -> np.ndarray | None:
+        """
+        計算済みのPageRank（グラフの変更後は再計算をバックグラウンドで始め、計算済みの値があればそれを返す）
+
+        検索ごとに全体を再計算しないよう、並べ替えの同順位の解消にはこちらを使う。
+        """
+        with self._lock:
+            if self._pagerank_version != self._version and (
+                self._pagerank_thread is None or not self._pagerank_thread.is_alive()
+            ):
+                self._pagerank_thread = threading.Thread(target=self.pagerank, name="citation-pagerank", daemon=True)
+                self._pagerank_thread.start()
+            return self._pagerank
+
+    def pagerank_of(self, pmids: Sequence[str], wait: bool = True) -> list[float]:
+        """
+        PMIDごとのPageRank（グラフにない論文は0）
+
+        wait=False の場合は計算済みの値を使い（ない場合・その後に追加された論文は0）、再計算を待たない。
+        """
+        nodes = self.nodes(pmids)
+        ranks = self.pagerank() if wait else self.cached_pagerank()
+        if ranks is None:
+            return [0.0] * len(nodes)
+        return [float(ranks[node]) if 0 <= node < len(ranks) else 0.0 for node in nodes]
+
+    def related(self, pmid: str, limit: int = 10) -> list[RelatedPaper]:
+        """
+        共引用（同じ論文に一緒に引用されている）と書誌結合（同じ論文を引用している）による関連論文
+
+        共引用数と共通の引用数の合計が多い順に返す。
+        """
+        import numpy as np
+        with self._lock:
+            node = self.nodes([pmid])
+            if node[0] < 0:
+                return []
+            size = len(self)
+            # 共引用: この論文を引用している論文が引用している論文
+            _, citers = self._neighbors(node, "cited_by")
+            _, co_cited = self._neighbors(np.unique(citers), "references")
+            co_citations = np.bincount(co_cited, minlength=size)
+            # 書誌結合: この論文が引用している論文を引用している論文
+            _, refs = self._neighbors(node, "references")
+            _, coupled = self._neighbors(np.unique(refs), "cited_by")
+            shared = np.bincount(coupled, minlength=size)
+
+            scores = co_citations + shared
+            scores[node[0]] = 0
+            candidates = np.flatnonzero(scores)
+            top = candidates[np.lexsort((candidates, -scores[candidates]))][:limit]
+            return [
+                RelatedPaper(related, int(co_citations[n]), int(shared[n]))
+                for related, n in zip(self.pmid_of(top), top)
+            ]
+
+    def compact(self) -> None:
+        """追加された辺・ノードをCSRに統合"""
+        import numpy as np
+        with self._lock:
+            src, dst = self.edges()
+            size = len(self)
+            pmids = np.concatenate([np.asarray(self.columns["pmids"]), np.array(self._new_pmids, dtype="int64")])
+            order = np.argsort(pmids, kind="stable")
+            ref_indptr, ref_indices = _csr(src, dst, size)
+            cite_indptr, cite_indices = _csr(dst, src, size)
+            self.columns = {
+                "pmids": pmids,
+                "linked_at": self._linked_at.copy(),
+                "sorted_pmids": pmids[order],
+                "sorted_nodes": order.astype("int32"),
+                "ref_indptr": ref_indptr,
+                "ref_indices": ref_indices,
+                "cite_indptr": cite_indptr,
+                "cite_indices": cite_indices,
+            }
+            self._base_nodes = size
+            self._new_pmids, self._new_nodes, self._delta, self._delta_edges = [], {}, set(), None
+
+    def save(self, directory: str | Path):
+        """
+        圧縮してカラムを.npy、メタデータをJSONとして新しいスナップショットのディレクトリに保存
+
+        一時ディレクトリに書き出してから os.replace で配置し、最後に CURRENT を差し替えるため、
+        途中で停止しても前のスナップショットがそのまま読み込まれる。他のプロセスがメモリマップしている
+        ファイルは上書きしない。複数のプロセスが保存する場合はファイルロックで直列化し、自分が読み込んだ後に
+        他のプロセスが保存したスナップショットの辺を取り込んでから保存する（辺を失わないように）。
+        """
+        import numpy as np
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock, _directory_lock(directory):
+            current = _current_snapshot(directory)
+            if current is not None and current != self.snapshot:
+                try:
+                    self.merge(CitationGraph.load(directory))
+                except CitationGraphError as e:
+                    logger.warning("Overwriting unreadable citation graph snapshot %s: %s", current, e)
+            self.compact()
+
+            staging = directory / f".tmp-{os.getpid()}-{secrets.token_hex(4)}"
+            staging.mkdir()
+            try:
+                for name in _COLUMNS:
+                    with (staging / f"{name}.npy").open("wb") as f:
+                        np.save(f, np.ascontiguousarray(self.columns[name]))
+                        os.fsync(f.fileno())
+                _write_atomic(staging / "meta.json", json.dumps(
+                    {"version": FORMAT_VERSION, "nodes": len(self), "edges": self.edge_count}
+                ))
+                snapshot = f"graph-{time.time_ns()}-{os.getpid()}"
+                os.replace(staging, directory / snapshot)
+            except BaseException:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            _write_atomic(directory / CURRENT_FILE, snapshot)
+
+            # 古いスナップショットは削除（メモリマップ中のプロセスはファイルを開いたまま参照できる）
+            for old in directory.glob("graph-*"):
+                if old.name != snapshot:
+                    shutil.rmtree(old, ignore_errors=True)
+            self.snapshot = snapshot
+            self.dirty = False
+
+    @classmethod
+    def load(cls, directory: str | Path, mmap: bool = True) -> "CitationGraph":
+        """保存済みグラフ（CURRENTが指すスナップショット）を読み込む（デフォルトはメモリマップ）"""
+        import numpy as np
+        directory = Path(directory)
+        try:
+            snapshot = _current_snapshot(directory)
+            if snapshot is None:
+                raise CitationGraphError(f"No citation graph snapshot in {directory}")
+            with (directory / snapshot / "meta.json").open(encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != FORMAT_VERSION:
+                raise CitationGraphError(f"Unsupported citation graph format: {meta.get('version')}")
+            columns = {
+                name: np.load(directory / snapshot / f"{name}.npy", mmap_mode="r" if mmap else None)
+                for name in _COLUMNS
+            }
+        except (OSError, ValueError) as e:
+            raise CitationGraphError(f"Failed to load citation graph from {directory}: {str(e)}")
+        graph = cls(columns)
+        graph.snapshot = snapshot
+        return graph
+
+def _current_snapshot(directory: Path) -> str | None:
+    try:
+        return (directory / CURRENT_FILE).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+def _write_atomic(path: Path, content: str) -> None:
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with temporary.open("w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+@contextmanager
+def _directory_lock(directory: Path) -> Iterator[None]:
+    """保存先ディレクトリの排他ロック（プロセス間）"""
+    try:
+        import fcntl
+    except ImportError:   # Windows: ロックなし（単一プロセスでの運用を前提とする）
+        yield
+        return
+    with (directory / LOCK_FILE).open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+_graph: CitationGraph | None = None
+_graph_lock = threading.Lock()
+
+def get_citation_graph() -> CitationGraph:
+    """共有の引用グラフ（保存済みのグラフがあれば読み込む）"""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                directory = Path(get_citation_settings().graph_dir)
+                graph = CitationGraph()
+                if (directory / CURRENT_FILE).exists():
+                    try:
+                        graph = CitationGraph.load(directory)
+                    except CitationGraphError as e:
+                        logger.warning("Starting with an empty citation graph: %s", e)
+                _graph = graph
+    return _graph
+
+def save_citation_graph(force: bool = False) -> None:
+    """変更があれば引用グラフを保存（force=False の場合は未圧縮の辺が閾値を超えたときのみ）"""
+    settings = get_citation_settings()
+    graph = _graph
+    if graph is None or not graph.dirty:
+        return
+    if not force and graph.pending_edges < settings.compact_edges:
+        return
+    try:
+        graph.save(settings.graph_dir)
+    except OSError as e:
+        logger.warning("Failed to save citation graph to %s: %s", settings.graph_dir, e)
+
+def reset_citation_graph() -> None:
+    """共有の引用グラフを破棄（次回の使用時に読み込み直す）"""
+    global _graph
+    with _graph_lock:
+        _graph = None
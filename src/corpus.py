@@ -0,0 +1,307 @@
+# project/corpus.py
+
+from __future__ import annotations
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+import numpy as np
+from .schemas import SearchCriteria, PublicationType, Language
+from .records import ArticleLike
+
+class CorpusError(Exception):
+    """ローカルコーパス関連のエラー"""
+    pass
+
+# 出版タイプ・言語はビットマスクで保持する（1論文に複数付与されるため）
+PUBLICATION_TYPE_BITS: dict[str, int] = {pt.value: 1 << i for i, pt in enumerate(PublicationType)}
+LANGUAGE_BITS: dict[str, int] = {lang.value: 1 << i for i, lang in enumerate(Language)}
+OTHER_LANGUAGE_BIT = 1 << len(Language)
+
+HUMANS_DESCRIPTOR = "humans"
+FORMAT_VERSION = 1
+
+# カラム名 -> dtype
+_COLUMNS: dict[str, str] = {
+    "pmid": "int64",
+    "year": "int16",            # 0 = 不明
+    "journal": "int32",         # journals辞書のコード (-1 = なし)
+    "journal_abbrev": "int32",  # journals辞書のコード (-1 = なし)
+    "pub_types": "uint16",
+    "languages": "uint16",
+    "mesh_indptr": "int64",     # CSR形式: 論文iのMeSHは mesh_codes[indptr[i]:indptr[i+1]]
+    "mesh_codes": "int32",
+}
+
+
+class _Dictionary:
+    """文字列の辞書エンコーディング（コード <-> 文字列）"""
+
+    def __init__(self, values: list[str] | None = None):
+        self.values: list[str] = list(values or [])
+        self._codes = {value: code for code, value in enumerate(self.values)}
+
+    def encode(self, value: str | None) -> int:
+        if not value:
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup_table(self, names: Iterable[str]) -> np.ndarray:
+        """指定した名前（大文字小文字無視）に一致するコードがTrueとなる参照表"""
+        wanted = {name.strip().lower() for name in names if name}
+        return np.fromiter(
+            (value.lower() in wanted for value in self.values),
+            dtype=bool,
+            count=len(self.values),
+        )
+
+
+class ColumnarCorpus:
+    """
+    ローカル論文コーパスのカラムナストア
+
+    各カラムはNumPy配列（.npy）として保存し、読み込み時はメモリマップする。
+    ジャーナル・MeSHは辞書エンコード、出版タイプ・言語はビットマスクで保持する。
+    """
+
+    def __init__(self, columns: dict[str, np.ndarray], journals: _Dictionary, mesh: _Dictionary, mesh_ui: list[str | None]):
+        self.columns = columns
+        self.journals = journals
+        self.mesh = mesh
+        self.mesh_ui = mesh_ui
+
+    def __len__(self) -> int:
+        return int(self.columns["pmid"].shape[0])
+
+    @property
+    def pmids(self) -> np.ndarray:
+        return self.columns["pmid"]
+
+    @classmethod
+    def empty(cls) -> "ColumnarCorpus":
+        columns = {name: np.zeros(0, dtype=dtype) for name, dtype in _COLUMNS.items()}
+        columns["mesh_indptr"] = np.zeros(1, dtype="int64")
+        return cls(columns, _Dictionary(), _Dictionary(), [])
+
+    @classmethod
+    def from_articles(cls, articles: Iterable[ArticleLike]) -> "ColumnarCorpus":
+        """検索結果からコーパスを構築"""
+        return cls.empty().append(articles)
+
+    def append(self, articles: Iterable[ArticleLike]) -> "ColumnarCorpus":
+        """
+        論文を追加した新しいコーパスを返す（既存PMIDはスキップ）
+
+        メモリマップされたカラムは読み取り専用のため、追加時は新しい配列を作成する。
+        """
+        journals = _Dictionary(self.journals.values)
+        mesh = _Dictionary(self.mesh.values)
+        mesh_ui = list(self.mesh_ui)
+        seen = set(self.pmids.tolist())
+
+        rows: dict[str, list[int]] = {name: [] for name in _COLUMNS if not name.startswith("mesh_")}
+        mesh_counts: list[int] = []
+        mesh_codes: list[int] = []
+
+        for article in articles:
+            pmid = int(article.pmid)
+            if pmid in seen:
+                continue
+            seen.add(pmid)
+
+            rows["pmid"].append(pmid)
+            rows["year"].append(article.publication_date.year or 0)
+            rows["journal"].append(journals.encode(article.journal))
+            rows["journal_abbrev"].append(journals.encode(article.journal_abbrev))
+            rows["pub_types"].append(_to_bits(article.publication_types, PUBLICATION_TYPE_BITS))
+            rows["languages"].append(_to_bits(article.languages, LANGUAGE_BITS, OTHER_LANGUAGE_BIT))
+
+            codes = []
+            for term in article.mesh_terms:
+                code = mesh.encode(term.descriptor)
+                if code < 0:
+                    continue
+                if code == len(mesh_ui):
+                    mesh_ui.append(term.ui)
+                codes.append(code)
+            mesh_codes.extend(codes)
+            mesh_counts.append(len(codes))
+
+        columns = {
+            name: np.concatenate([self.columns[name], np.asarray(values, dtype=_COLUMNS[name])])
+            for name, values in rows.items()
+        }
+        new_indptr = self.columns["mesh_indptr"][-1] + np.cumsum(np.asarray(mesh_counts, dtype="int64"))
+        columns["mesh_indptr"] = np.concatenate([self.columns["mesh_indptr"], new_indptr])
+        columns["mesh_codes"] = np.concatenate([self.columns["mesh_codes"], np.asarray(mesh_codes, dtype="int32")])
+
+        return ColumnarCorpus(columns, journals, mesh, mesh_ui)
+
+    def save(self, directory: str | Path):
+        """カラムを.npy、辞書をJSONとしてディレクトリに保存"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in _COLUMNS:
+            np.save(directory / f"{name}.npy", np.ascontiguousarray(self.columns[name]))
+        with (directory / "dictionaries.json").open("w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": FORMAT_VERSION,
+                    "journals": self.journals.values,
+                    "mesh": self.mesh.values,
+                    "mesh_ui": self.mesh_ui,
+                },
+                f,
+                ensure_ascii=False,
+            )
+
+    @classmethod
+    def load(cls, directory: str | Path, mmap: bool = True) -> "ColumnarCorpus":
+        """保存済みコーパスを読み込む（デフォルトはメモリマップ）"""
+        directory = Path(directory)
+        try:
+            with (directory / "dictionaries.json").open(encoding="utf-8") as f:
+                dictionaries = json.load(f)
+            if dictionaries.get("version") != FORMAT_VERSION:
+                raise CorpusError(f"Unsupported corpus format: {dictionaries.get('version')}")
+            columns = {
+                name: np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None)
+                for name in _COLUMNS
+            }
+        except (OSError, ValueError) as e:
+            raise CorpusError(f"Failed to load corpus from {directory}: {str(e)}")
+
+        return cls(
+            columns,
+            _Dictionary(dictionaries["journals"]),
+            _Dictionary(dictionaries["mesh"]),
+            dictionaries["mesh_ui"],
+        )
+
+    def _rows_with_any(self, lookup: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """
+        maskのうち、MeSHコードの参照表に一致する要素を1つ以上持つ行のマスク
+
+        候補行が少ない場合は候補行のMeSHのみを集めて評価する。
+        """
+        if not lookup.any():
+            return np.zeros(len(self), dtype=bool)
+        indptr = self.columns["mesh_indptr"]
+        codes = self.columns["mesh_codes"]
+        rows = np.flatnonzero(mask)
+
+        if len(rows) * 4 >= len(self):
+            hits = lookup[codes]
+            cumulative = np.concatenate([[0], np.cumsum(hits, dtype="int64")])
+            return mask & ((cumulative[indptr[1:]] - cumulative[indptr[:-1]]) > 0)
+
+        starts = indptr[rows]
+        lengths = indptr[rows + 1] - starts
+        ends = np.cumsum(lengths)
+        positions = np.repeat(starts - (ends - lengths), lengths) + np.arange(ends[-1] if len(ends) else 0)
+        cumulative = np.concatenate([[0], np.cumsum(lookup[codes[positions]], dtype="int64")])
+        result = np.zeros(len(self), dtype=bool)
+        result[rows[(cumulative[ends] - cumulative[ends - lengths]) > 0]] = True
+        return result
+
+    def mesh_lookup(self, terms: Iterable[str]) -> np.ndarray:
+        """MeSH用語（記述子名またはUI）からコード参照表を作成"""
+        terms = [term for term in terms if term]
+        lookup = self.mesh.lookup_table(terms)
+        uis = {term.strip().upper() for term in terms}
+        for code, ui in enumerate(self.mesh_ui):
+            if ui and ui.upper() in uis:
+                lookup[code] = True
+        return lookup
+
+    def search(self, criteria: SearchCriteria) -> np.ndarray:
+        """検索条件に一致するPMIDを返す（最大 criteria.max_results 件）"""
+        mask = compile_criteria(criteria).evaluate(self)
+        return self.pmids[np.flatnonzero(mask)[:criteria.max_results]]
+
+
+def _to_bits(values: Iterable[str], bits: dict[str, int], other: int = 0) -> int:
+    result = 0
+    for value in values:
+        result |= bits.get(value, other)
+    return result
+
+
+@dataclass(frozen=True)
+class CorpusPredicate:
+    """
+    SearchCriteriaをコンパイルした述語
+
+    evaluate()でカラム単位のベクトル演算によりブールマスクを生成する。
+    residual_fieldsはローカルで評価できない（NCBI側で評価が必要な）条件。
+    """
+    pub_type_mask: int = 0
+    language_mask: int = 0
+    start_year: int | None = None
+    end_year: int | None = None
+    journals: tuple[str, ...] = ()
+    mesh_terms: tuple[str, ...] = ()
+    humans_only: bool = False
+    residual_fields: tuple[str, ...] = field(default=())
+
+    def evaluate(self, corpus: ColumnarCorpus) -> np.ndarray:
+        columns = corpus.columns
+        mask = np.ones(len(corpus), dtype=bool)
+
+        if self.pub_type_mask:
+            mask &= (columns["pub_types"] & self.pub_type_mask) != 0
+        if self.language_mask:
+            mask &= (columns["languages"] & self.language_mask) != 0
+
+        if self.start_year is not None or self.end_year is not None:
+            years = columns["year"]
+            mask &= years > 0
+            if self.start_year is not None:
+                mask &= years >= self.start_year
+            if self.end_year is not None:
+                mask &= years <= self.end_year
+
+        if self.journals:
+            lookup = np.append(corpus.journals.lookup_table(self.journals), False)  # -1(なし)は末尾のFalseを参照
+            mask &= lookup[columns["journal"]] | lookup[columns["journal_abbrev"]]
+
+        # CSRを走査するMeSH条件は、他の条件で候補を絞り込んだ後に評価する
+        if self.mesh_terms:
+            mask = corpus._rows_with_any(corpus.mesh_lookup(self.mesh_terms), mask)
+        if self.humans_only:
+            mask = corpus._rows_with_any(corpus.mesh.lookup_table([HUMANS_DESCRIPTOR]), mask)
+
+        return mask
+
+
+def compile_criteria(criteria: SearchCriteria) -> CorpusPredicate:
+    """
+    SearchCriteriaをベクトル化可能な述語にコンパイル
+
+    出版タイプ・言語はビットマスク、ジャーナル・MeSHは辞書参照表として評価される。
+    キーワード・著者・所属機関などの全文系の条件は residual_fields に列挙される。
+    """
+    residual = [
+        name for name in ("exclude_keywords", "authors", "affiliations", "min_citations")
+        if getattr(criteria, name)
+    ]
+    if criteria.keywords:
+        residual.insert(0, "keywords")
+    if criteria.free_full_text:
+        residual.append("free_full_text")
+
+    return CorpusPredicate(
+        pub_type_mask=_to_bits((pt.value for pt in criteria.publication_types or []), PUBLICATION_TYPE_BITS),
+        language_mask=_to_bits((lang.value for lang in criteria.languages or []), LANGUAGE_BITS),
+        start_year=criteria.start_year,
+        end_year=criteria.end_year,
+        journals=tuple(criteria.journals or ()),
+        mesh_terms=tuple(criteria.mesh_terms or ()),
+        humans_only=criteria.humans_only,
+        residual_fields=tuple(residual),
+    )
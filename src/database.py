@@ -1,20 +1,92 @@
 # project/database.py
 
+from functools import lru_cache
+from pydantic_settings import BaseSettings
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import create_engine, Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-DATABASE_URL = "sqlite:///./app.db"  # 例: sqliteファイル。実際には好みのDB接続URLに置き換え
+class DatabaseSettings(BaseSettings):
+    url: str = "sqlite:///./app.db"  # 例: sqliteファイル。実際には好みのDB接続URLに置き換え
+    async_url: str | None = None     # 未設定の場合はurlから導出（sqlite -> aiosqlite, postgresql -> asyncpg）
+    echo: bool = False               # SQL文をログ出力する。開発時のみTrueにすると良い
+    pool_size: int = 10
+    max_overflow: int = 20
+    pool_recycle: int = 1800
+    sqlite_busy_timeout_ms: int = 5000
+    user_cache_ttl_seconds: int = 300
+    user_cache_size: int = 10000
+
+    class Config:
+        env_prefix = "DB_"
+
+@lru_cache()
+def get_database_settings() -> DatabaseSettings:
+    return DatabaseSettings()
+
+def to_async_url(url: str) -> str:
+    """同期ドライバのURLを非同期ドライバのURLに変換"""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def _engine_options(url: str, settings: DatabaseSettings) -> dict:
+    if _is_sqlite(url):
+        return {"connect_args": {"check_same_thread": False}} if "aiosqlite" not in url else {}
+    return {
+        "pool_size": settings.pool_size,
+        "max_overflow": settings.max_overflow,
+        "pool_recycle": settings.pool_recycle,
+        "pool_pre_ping": True,
+    }
+
+def _configure_sqlite(sync_engine, url: str, settings: DatabaseSettings):
+    """SQLiteファイルはWALモードで使用し、読み取りと書き込みが互いにブロックしないようにする"""
+    if not _is_sqlite(url) or url.rstrip("/").endswith(":memory:") or url.split("://", 1)[1] in ("", "/"):
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+_settings = get_database_settings()
+DATABASE_URL = _settings.url
+ASYNC_DATABASE_URL = _settings.async_url or to_async_url(DATABASE_URL)
 
 engine = create_engine(
     DATABASE_URL,
-    echo=True  # SQL文をログ出力する。開発時のみTrueにすると良い
+    echo=_settings.echo,
+    **_engine_options(DATABASE_URL, _settings)
+)
+_configure_sqlite(engine, DATABASE_URL, _settings)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=_settings.echo,
+    **_engine_options(ASYNC_DATABASE_URL, _settings)
 )
+_configure_sqlite(async_engine.sync_engine, ASYNC_DATABASE_URL, _settings)
 
 def init_db():
     """
     アプリ起動時に呼び出してテーブルを作成する処理。
     """
     from .models import SQLModel  # 循環インポート回避のためここで
+    from .article_search import ensure_article_fts
     SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        ensure_article_fts(connection)
 
 def get_db():
     """
@@ -22,3 +94,11 @@ def get_db():
     """
     with Session(engine) as session:
         yield session
+
+async def get_async_db():
+    """
+    FastAPIの依存関数として利用し、非同期セッションをyieldする。
+    イベントループをブロックせずにDBアクセスしたいエンドポイントで使用する。
+    """
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,141 @@
+# project/dedup.py
+
+from __future__ import annotations
+import re
+import zlib
+from functools import lru_cache
+from typing import TYPE_CHECKING, Sequence
+from pydantic_settings import BaseSettings
+
+if TYPE_CHECKING:
+    import numpy as np
+
+class DedupSettings(BaseSettings):
+    enabled: bool = True
+    num_perm: int = 128            # MinHash署名の長さ
+    bands: int = 32                # LSHのバンド数（num_permを割り切ること）
+    shingle_size: int = 3          # 単語n-gram
+    threshold: float = 0.8         # 同一グループとみなす推定Jaccard係数の下限
+    min_words: int = 20            # これより短い抄録は判定しない
+
+    class Config:
+        env_prefix = "DEDUP_"
+
+@lru_cache()
+def get_dedup_settings() -> DedupSettings:
+    return DedupSettings()
+
+_MAX_CHUNK_ELEMENTS = 4_000_000    # 署名計算時の (num_perm × シングル数) 行列の上限
+_WORD = re.compile(r"\w+")
+
+@lru_cache(maxsize=8)
+def _permutations(num_perm: int, seed: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    """
+    MinHashのハッシュ関数 ((a * h + b) mod 2^64) >> 32（multiply-shift法）の係数
+
+    固定シードで生成し、プロセスや検索をまたいで署名を比較可能にする。
+    """
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+    b = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True)
+    return a[:, None], b[:, None]
+
+def shingle_hashes(text: str, size: int) -> np.ndarray:
+    """小文字化した単語n-gramの32bitハッシュ（重複を除く）"""
+    import numpy as np
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return np.empty(0, dtype=np.uint64)
+    word_hashes = np.fromiter((zlib.crc32(word.encode()) for word in words), dtype=np.uint64, count=len(words))
+    combined = np.zeros(len(words) - size + 1, dtype=np.uint64)
+    for offset in range(size):
+        # 多項式ハッシュ（uint64のオーバーフローは2^64を法とする演算として扱う）
+        combined = combined * np.uint64(0x100000001B3) + word_hashes[offset:len(words) - size + 1 + offset]
+    return np.unique(combined >> np.uint64(32))
+
+def minhash_signatures(shingles: Sequence[np.ndarray], num_perm: int) -> np.ndarray:
+    """
+    各文書のMinHash署名（文書数 × num_perm）
+
+    全文書のシングルを連結し、num_perm 個のハッシュ関数を一括で適用して文書ごとの最小値を np.minimum.reduceat で求める。
+    """
+    import numpy as np
+    a, b = _permutations(num_perm)
+    signatures = np.empty((len(shingles), num_perm), dtype=np.uint64)
+    start = 0
+    while start < len(shingles):
+        # メモリを抑えるため、シングル数の合計が上限に収まる範囲ずつ計算
+        end, total = start, 0
+        while end < len(shingles) and (end == start or total + len(shingles[end]) <= _MAX_CHUNK_ELEMENTS // num_perm):
+            total += len(shingles[end])
+            end += 1
+        chunk = shingles[start:end]
+        hashes = np.concatenate(chunk)
+        offsets = np.cumsum([0] + [len(s) for s in chunk[:-1]])
+        permuted = (a * hashes[None, :] + b) >> np.uint64(32)
+        signatures[start:end] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        start = end
+    return signatures
+
+def _find(parent: list[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def duplicate_groups(texts: Sequence[str | None]) -> list[int | None]:
+    """
+    ほぼ同一の内容（エラータ・重複出版・プレプリントと掲載版など）のテキストをグループ化
+
+    MinHash署名をLSHのバンドごとにバケットへ分け、同じバケットに入った候補の推定Jaccard係数が
+    しきい値以上であれば同じグループとする。
+
+    Returns:
+    --------
+    list[int | None]
+        各テキストが属するグループの代表（グループ内で最初に現れるテキスト）のインデックス。
+        他のテキストと重複しないものは None
+    """
+    settings = get_dedup_settings()
+    if not settings.enabled or len(texts) < 2:
+        return [None] * len(texts)
+
+    indices, shingles = [], []
+    for i, text in enumerate(texts):
+        hashes = shingle_hashes(text or "", settings.shingle_size)
+        if len(hashes) >= settings.min_words - settings.shingle_size + 1:
+            indices.append(i)
+            shingles.append(hashes)
+    if len(indices) < 2:
+        return [None] * len(texts)
+
+    import numpy as np  # 起動時間を抑えるため初回使用時に読み込む
+    signatures = minhash_signatures(shingles, settings.num_perm)
+    rows = settings.num_perm // settings.bands
+    parent = list(range(len(indices)))
+    for band in range(settings.bands):
+        keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        _, buckets, counts = np.unique(
+            keys.view(np.dtype((np.void, keys.dtype.itemsize * rows))).ravel(),
+            return_inverse=True, return_counts=True
+        )
+        for bucket in np.flatnonzero(counts > 1):
+            members = np.flatnonzero(buckets == bucket)
+            first = members[0]
+            similarity = (signatures[members[1:]] == signatures[first]).mean(axis=1)
+            for member in members[1:][similarity >= settings.threshold]:
+                root_a, root_b = _find(parent, first), _find(parent, member)
+                if root_a != root_b:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    roots = [_find(parent, i) for i in range(len(indices))]
+    sizes: dict[int, int] = {}
+    for root in roots:
+        sizes[root] = sizes.get(root, 0) + 1
+
+    groups: list[int | None] = [None] * len(texts)
+    for i, root in zip(indices, roots):
+        if sizes[root] > 1:
+            groups[i] = indices[root]
+    return groups
@@ -0,0 +1,152 @@
+# project/exporters.py
+
+import csv
+import gzip
+from pathlib import Path
+from typing import Callable, IO, Iterable
+from pydantic_core import to_json
+from .records import ArticleLike, json_fallback
+
+class ExportError(Exception):
+    """検索結果のエクスポートに関するエラー"""
+    pass
+
+def write_jsonl(articles: Iterable[ArticleLike], f: IO[str]) -> int:
+    """1行1論文のJSON Linesとして書き出し"""
+    count = 0
+    for article in articles:
+        f.write(to_json(article, fallback=json_fallback).decode("utf-8"))
+        f.write("\n")
+        count += 1
+    return count
+
+def write_json(articles: Iterable[ArticleLike], f: IO[str]) -> int:
+    """JSON配列として書き出し（全件をメモリに載せずに1件ずつ出力）"""
+    count = 0
+    f.write("[")
+    for article in articles:
+        f.write(",\n" if count else "\n")
+        f.write(to_json(article, indent=2, fallback=json_fallback).decode("utf-8"))
+        count += 1
+    f.write("\n]\n" if count else "]\n")
+    return count
+
+# RISのタグ（https://en.wikipedia.org/wiki/RIS_(file_format)）
+def _ris_lines(article: ArticleLike) -> Iterable[tuple[str, str]]:
+    yield "TY", "JOUR"
+    yield "TI", article.title
+    for author in article.authors:
+        name = ", ".join(part for part in (author.last_name, author.fore_name) if part)
+        if name:
+            yield "AU", name
+    if article.publication_date.year:
+        date = article.publication_date
+        yield "PY", str(date.year)
+        yield "DA", "/".join(f"{part:02d}" if part else "" for part in (date.year, date.month, date.day))
+    if article.journal:
+        yield "JO", article.journal
+    if article.journal_abbrev:
+        yield "J2", article.journal_abbrev
+    if article.abstract:
+        yield "AB", article.abstract
+    for keyword in article.keywords:
+        yield "KW", keyword
+    for term in article.mesh_terms:
+        if term.descriptor:
+            yield "KW", term.descriptor
+    if article.doi:
+        yield "DO", article.doi
+    if article.url:
+        yield "UR", article.url
+    for language in article.languages:
+        yield "LA", language
+    yield "AN", article.pmid
+    if article.summary:
+        yield "N1", article.summary
+    yield "ER", ""
+
+def write_ris(articles: Iterable[ArticleLike], f: IO[str]) -> int:
+    """文献管理ソフト向けのRIS形式で書き出し"""
+    count = 0
+    for article in articles:
+        for tag, value in _ris_lines(article):
+            # RISは1タグ1行のため、値の中の改行は空白に置き換える
+            f.write(f"{tag}  - {' '.join(value.split())}\n")
+        f.write("\n")
+        count += 1
+    return count
+
+CSV_COLUMNS = [
+    "pmid", "title", "authors", "journal", "year", "doi", "url",
+    "citation_count", "publication_types", "mesh_terms", "keywords", "abstract", "summary",
+]
+
+def write_csv(articles: Iterable[ArticleLike], f: IO[str]) -> int:
+    """表計算ソフト向けのCSVで書き出し（複数値の列は「; 」区切り）"""
+    writer = csv.writer(f)
+    writer.writerow(CSV_COLUMNS)
+    count = 0
+    for article in articles:
+        writer.writerow([
+            article.pmid,
+            article.title,
+            "; ".join(" ".join(p for p in (a.last_name, a.fore_name) if p) for a in article.authors),
+            article.journal or "",
+            article.publication_date.year or "",
+            article.doi or "",
+            article.url or "",
+            article.citation_count,
+            "; ".join(article.publication_types),
+            "; ".join(term.descriptor for term in article.mesh_terms if term.descriptor),
+            "; ".join(article.keywords),
+            article.abstract,
+            article.summary or "",
+        ])
+        count += 1
+    return count
+
+WRITERS: dict[str, Callable[[Iterable[ArticleLike], IO[str]], int]] = {
+    "json": write_json,
+    "jsonl": write_jsonl,
+    "ris": write_ris,
+    "csv": write_csv,
+}
+
+def detect_format(file_path: Path) -> tuple[str, bool]:
+    """ファイル名の拡張子から (形式, gzip圧縮するか) を判定（例: results.jsonl.gz）"""
+    suffixes = [suffix.lower().lstrip(".") for suffix in file_path.suffixes]
+    compressed = bool(suffixes) and suffixes[-1] == "gz"
+    if compressed:
+        suffixes = suffixes[:-1]
+    if not suffixes or suffixes[-1] not in WRITERS:
+        raise ExportError(f"Unsupported export format: {file_path.name}")
+    return suffixes[-1], compressed
+
+def export_articles(
+    articles: Iterable[ArticleLike],
+    file_path: str | Path,
+    format: str | None = None,
+    compress: bool | None = None
+) -> int:
+    """
+    論文をファイルに逐次書き出し、書き出した件数を返す
+
+    形式・圧縮は省略時はファイル名から判定する（形式を指定した場合の圧縮は末尾の .gz のみで判定）。
+    ジェネレータを渡せば全件をメモリに載せずに出力できる。
+    """
+    file_path = Path(file_path)
+    if format is None:
+        format, detected_compress = detect_format(file_path)
+    else:
+        detected_compress = file_path.suffix.lower() == ".gz"
+    if compress is None:
+        compress = detected_compress
+    if format not in WRITERS:
+        raise ExportError(f"Unsupported export format: {format}")
+
+    newline = "" if format == "csv" else None
+    if compress:
+        with gzip.open(file_path, "wt", encoding="utf-8", newline=newline, compresslevel=6) as f:
+            return WRITERS[format](articles, f)
+    with file_path.open("w", encoding="utf-8", newline=newline) as f:
+        return WRITERS[format](articles, f)
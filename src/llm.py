@@ -1,11 +1,29 @@
-from openai import OpenAI
+from __future__ import annotations
 import os
+import threading
+from typing import TYPE_CHECKING
 from tenacity import retry, stop_after_attempt, wait_exponential
 from functools import lru_cache
 from pydantic_settings import BaseSettings
+from .metrics import LLM_REQUEST_SECONDS, LLM_TOKENS, LLM_ERRORS
+from .scheduler import upstream_slot
 
-# OpenAI クライアントの初期化
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# OpenAI クライアント（起動を速くするため初回使用時に生成。テスト等ではこの変数に代入して差し替える）
+client: OpenAI | None = None
+_client_lock = threading.Lock()
+
+def get_client() -> OpenAI:
+    """OpenAIクライアントを取得（初回呼び出し時にopenaiをインポートして生成）"""
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                from openai import OpenAI
+                client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return client
 
 class LLMError(Exception):
     """LLM関連のカスタムエラー"""
@@ -32,6 +50,21 @@ class LLMSettings(BaseSettings):
 def get_llm_settings() -> LLMSettings:
     return LLMSettings()
 
+def _create_completion(operation: str, **kwargs):
+    """チャット補完APIの呼び出し（公平スケジューラで実行枠を確保し、レイテンシ・トークン数を記録）"""
+    try:
+        with upstream_slot("llm"), LLM_REQUEST_SECONDS.time(operation=operation):
+            response = get_client().chat.completions.create(**kwargs)
+    except Exception:
+        LLM_ERRORS.inc(operation=operation)
+        raise
+
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        LLM_TOKENS.inc(usage.prompt_tokens or 0, operation=operation, kind="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens or 0, operation=operation, kind="completion")
+    return response
+
 @retry(
     stop=stop_after_attempt(3),  # 3回まで再試行
     wait=wait_exponential(multiplier=1, min=4, max=10)  # 指数関数的なバックオフ
@@ -55,7 +88,8 @@ def summarize_abstract(abstract_text: str) -> str:
     settings = get_llm_settings()
     
     try:
-        response = client.chat.completions.create(
+        response = _create_completion(
+            "summarize",
             model=settings.model_name,
             messages=[
                 {
@@ -104,7 +138,8 @@ def analyze_abstract(abstract_text: str) -> str:
     settings = get_llm_settings()
     
     try:
-        response = client.chat.completions.create(
+        response = _create_completion(
+            "analyze",
             model=settings.model_name,
             messages=[
                 {
@@ -0,0 +1,311 @@
+# project/mesh.py
+
+from __future__ import annotations
+import json
+import logging
+import os
+import re
+import xml.etree.ElementTree as ET
+from bisect import bisect_left
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+from pydantic_settings import BaseSettings
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class MeshSettings(BaseSettings):
+    descriptor_xml: str | None = None   # NLMが配布するMeSH記述子XML（desc20XX.xml）のパス
+    index_dir: str = "data/mesh"        # 構築したインデックスの保存先
+    max_expansion: int = 50             # ローカルで展開する下位記述子数の上限（超える場合はNCBI側の展開に任せる）
+    autocomplete_limit: int = 10
+
+    class Config:
+        env_prefix = "MESH_"
+
+@lru_cache()
+def get_mesh_settings() -> MeshSettings:
+    return MeshSettings()
+
+class MeshIndexError(Exception):
+    """MeSHインデックス関連のエラー"""
+    pass
+
+FORMAT_VERSION = 1
+
+# カラム名 -> dtype（文字列は UTF-8 の連結バイト列 *_blob と開始位置 *_offsets で保持する）
+_COLUMNS: dict[str, str] = {
+    "name_blob": "uint8",                # 記述子名
+    "name_offsets": "int64",
+    "ui_blob": "uint8",                  # 記述子UI（D000001 等）
+    "ui_offsets": "int64",
+    "key_blob": "uint8",                 # 正規化した用語（記述子名・エントリー用語・UI）をバイト順にソート
+    "key_offsets": "int64",
+    "key_descriptors": "int32",          # 用語 -> 記述子
+    "key_is_name": "bool",               # 用語が記述子名そのものか
+    "term_blob": "uint8",                # 用語の表示用文字列（keyと同じ順）
+    "term_offsets": "int64",
+    "tree_blob": "uint8",                # ツリー番号をバイト順にソート
+    "tree_offsets": "int64",
+    "tree_descriptors": "int32",         # ツリー番号 -> 記述子
+    "descriptor_tree_indptr": "int64",   # CSR形式: 記述子iのツリー番号は descriptor_trees[indptr[i]:indptr[i+1]]
+    "descriptor_trees": "int32",
+}
+
+_AUTOCOMPLETE_SCAN = 256                 # 前方一致の候補を順位付けのために走査する件数の上限
+_SPACES = re.compile(r"\s+")
+
+def normalize_term(term: str) -> str:
+    """照合用の正規化（大文字小文字・連続する空白を無視）"""
+    return _SPACES.sub(" ", term).strip().casefold()
+
+class _Strings:
+    """連結バイト列と開始位置からなる文字列の列（bisect で二分探索できる）"""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def prefix_range(self, prefix: bytes) -> tuple[int, int]:
+        """prefix で始まる要素の範囲 [start, end)（要素はバイト順にソート済みであること）"""
+        start = bisect_left(self, prefix)
+        # UTF-8 に 0xff は現れないため prefix + 0xff は prefix で始まるどの要素よりも大きい
+        return start, bisect_left(self, prefix + b"\xff", start)
+
+def _pack(values: Iterable[str]) -> tuple[np.ndarray, np.ndarray]:
+    import numpy as np
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype="int64")
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype="uint8"), offsets
+
+@dataclass(frozen=True)
+class MeshDescriptor:
+    ui: str
+    name: str
+    tree_numbers: tuple[str, ...]
+
+@dataclass(frozen=True)
+class MeshMatch:
+    """オートコンプリートの候補（term は入力に前方一致した用語）"""
+    descriptor: MeshDescriptor
+    term: str
+
+class MeshIndex:
+    """
+    MeSH記述子のオフラインインデックス
+
+    用語（記述子名・エントリー用語・UI）とツリー番号をそれぞれバイト順にソートした列として保持し、
+    前方一致を二分探索で求める（共通接頭辞をまとめたトライと同じ検索を、ポインタを持たない平坦な配列で行う）。
+    カラムは.npyとして保存し、読み込み時はメモリマップするため起動時にXMLを解析し直す必要はない。
+    """
+
+    def __init__(self, columns: dict[str, np.ndarray], source: dict | None = None):
+        self.columns = columns
+        self.source = source
+        self._names = _Strings(columns["name_blob"], columns["name_offsets"])
+        self._uis = _Strings(columns["ui_blob"], columns["ui_offsets"])
+        self._keys = _Strings(columns["key_blob"], columns["key_offsets"])
+        self._terms = _Strings(columns["term_blob"], columns["term_offsets"])
+        self._trees = _Strings(columns["tree_blob"], columns["tree_offsets"])
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @classmethod
+    def from_records(cls, records: Iterable[tuple[str, str, list[str], list[str]]], source: dict | None = None) -> "MeshIndex":
+        """(UI, 記述子名, ツリー番号, エントリー用語) の列からインデックスを構築"""
+        import numpy as np
+        uis, names, descriptor_trees = [], [], []
+        keys: dict[tuple[bytes, int], str] = {}
+        for descriptor, (ui, name, trees, terms) in enumerate(records):
+            uis.append(ui)
+            names.append(name)
+            descriptor_trees.append(trees)
+            for term in (name, *terms, ui):
+                keys.setdefault((normalize_term(term).encode("utf-8"), descriptor), term)
+
+        sorted_keys = sorted(keys)
+        trees = sorted((tree.encode("ascii"), descriptor) for descriptor, numbers in enumerate(descriptor_trees) for tree in numbers)
+        tree_ids = {tree: i for i, (tree, _) in enumerate(trees)}
+
+        columns = {}
+        columns["name_blob"], columns["name_offsets"] = _pack(names)
+        columns["ui_blob"], columns["ui_offsets"] = _pack(uis)
+        columns["key_blob"], columns["key_offsets"] = _pack(key.decode("utf-8") for key, _ in sorted_keys)
+        columns["key_descriptors"] = np.fromiter((descriptor for _, descriptor in sorted_keys), dtype="int32", count=len(sorted_keys))
+        columns["key_is_name"] = np.fromiter(
+            (key == normalize_term(names[descriptor]).encode("utf-8") for key, descriptor in sorted_keys),
+            dtype=bool, count=len(sorted_keys)
+        )
+        columns["term_blob"], columns["term_offsets"] = _pack(keys[key] for key in sorted_keys)
+        columns["tree_blob"], columns["tree_offsets"] = _pack(tree.decode("ascii") for tree, _ in trees)
+        columns["tree_descriptors"] = np.fromiter((descriptor for _, descriptor in trees), dtype="int32", count=len(trees))
+        columns["descriptor_tree_indptr"] = np.zeros(len(names) + 1, dtype="int64")
+        np.cumsum([len(numbers) for numbers in descriptor_trees], out=columns["descriptor_tree_indptr"][1:])
+        columns["descriptor_trees"] = np.fromiter(
+            (tree_ids[tree.encode("ascii")] for numbers in descriptor_trees for tree in numbers),
+            dtype="int32", count=int(columns["descriptor_tree_indptr"][-1])
+        )
+        return cls(columns, source)
+
+    @classmethod
+    def from_xml(cls, path: str | Path) -> "MeshIndex":
+        """
+        MeSH記述子XML（DescriptorRecordSet）からインデックスを構築
+
+        ファイル全体（数百MB）を木として保持しないよう、DescriptorRecord 単位で逐次解析して破棄する。
+        """
+        def records():
+            for _, elem in ET.iterparse(path, events=("end",)):
+                if elem.tag != "DescriptorRecord":
+                    continue
+                ui = elem.findtext("DescriptorUI")
+                name = elem.findtext("DescriptorName/String")
+                if ui and name:
+                    trees = [tree.text.strip() for tree in elem.findall("TreeNumberList/TreeNumber") if tree.text]
+                    terms = [term.text for term in elem.findall("ConceptList/Concept/TermList/Term/String") if term.text]
+                    yield ui.strip(), name.strip(), trees, terms
+                elem.clear()
+
+        try:
+            return cls.from_records(records(), source=_source_stamp(path))
+        except (OSError, ET.ParseError) as e:
+            raise MeshIndexError(f"Failed to parse MeSH descriptors from {path}: {str(e)}")
+
+    def save(self, directory: str | Path):
+        """カラムを.npy、メタデータをJSONとしてディレクトリに保存"""
+        import numpy as np
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in _COLUMNS:
+            np.save(directory / f"{name}.npy", np.ascontiguousarray(self.columns[name]))
+        with (directory / "meta.json").open("w", encoding="utf-8") as f:
+            json.dump({"version": FORMAT_VERSION, "descriptors": len(self), "source": self.source}, f)
+
+    @classmethod
+    def load(cls, directory: str | Path, mmap: bool = True) -> "MeshIndex":
+        """保存済みインデックスを読み込む（デフォルトはメモリマップ）"""
+        import numpy as np
+        directory = Path(directory)
+        try:
+            with (directory / "meta.json").open(encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != FORMAT_VERSION:
+                raise MeshIndexError(f"Unsupported MeSH index format: {meta.get('version')}")
+            columns = {
+                name: np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None)
+                for name in _COLUMNS
+            }
+        except (OSError, ValueError) as e:
+            raise MeshIndexError(f"Failed to load MeSH index from {directory}: {str(e)}")
+        return cls(columns, meta.get("source"))
+
+    def descriptor(self, i: int) -> MeshDescriptor:
+        indptr = self.columns["descriptor_tree_indptr"]
+        trees = self.columns["descriptor_trees"][indptr[i]:indptr[i + 1]]
+        return MeshDescriptor(
+            ui=self._uis[i].decode("utf-8"),
+            name=self._names[i].decode("utf-8"),
+            tree_numbers=tuple(self._trees[tree].decode("ascii") for tree in trees),
+        )
+
+    def lookup(self, term: str) -> int | None:
+        """記述子名・エントリー用語・UIのいずれかに完全一致する記述子"""
+        key = normalize_term(term).encode("utf-8")
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return int(self.columns["key_descriptors"][i])
+        return None
+
+    def autocomplete(self, prefix: str, limit: int = 10) -> list[MeshMatch]:
+        """
+        入力中の文字列に前方一致する記述子の候補
+
+        完全一致、記述子名での一致、短い用語の順に並べ、記述子ごとに1件にまとめる。
+        """
+        key = normalize_term(prefix).encode("utf-8")
+        if not key or limit <= 0:
+            return []
+        start, end = self._keys.prefix_range(key)
+        end = min(end, start + max(_AUTOCOMPLETE_SCAN, limit))
+        descriptors = self.columns["key_descriptors"][start:end].tolist()
+        is_name = self.columns["key_is_name"][start:end].tolist()
+        offsets = self.columns["key_offsets"][start:end + 1].tolist()
+
+        ranked: dict[int, tuple[tuple[bool, bool, int], int]] = {}
+        for j, descriptor in enumerate(descriptors):
+            length = offsets[j + 1] - offsets[j]
+            rank = (length != len(key), not is_name[j], length)
+            i = start + j
+            if descriptor not in ranked or rank < ranked[descriptor][0]:
+                ranked[descriptor] = (rank, i)
+
+        best = sorted(ranked.items(), key=lambda item: item[1])[:limit]
+        return [
+            MeshMatch(self.descriptor(descriptor), self._terms[i].decode("utf-8"))
+            for descriptor, (_, i) in best
+        ]
+
+    def subtree(self, descriptor: int) -> list[int]:
+        """記述子とその下位記述子（いずれかのツリー番号の下にあるもの）。記述子自身が先頭"""
+        import numpy as np
+        indptr = self.columns["descriptor_tree_indptr"]
+        tree_descriptors = self.columns["tree_descriptors"]
+        found = []
+        for tree in self.columns["descriptor_trees"][indptr[descriptor]:indptr[descriptor + 1]]:
+            start, end = self._trees.prefix_range(self._trees[tree] + b".")
+            found.append(tree_descriptors[start:end])
+        descendants = np.unique(np.concatenate(found)) if found else np.empty(0, dtype="int32")
+        return [descriptor, *(int(d) for d in descendants if d != descriptor)]
+
+    def name(self, descriptor: int) -> str:
+        return self._names[descriptor].decode("utf-8")
+
+def _source_stamp(path: str | Path) -> dict:
+    """インデックスの構築元XMLの識別情報（更新の検出用）"""
+    stat = os.stat(path)
+    return {"path": str(Path(path).resolve()), "size": stat.st_size, "mtime": stat.st_mtime}
+
+@lru_cache()
+def get_mesh_index() -> MeshIndex | None:
+    """
+    共有のMeSHインデックス
+
+    保存済みのインデックスがあれば読み込み、なければ（または構築元のXMLが更新されていれば）XMLから構築して保存する。
+    いずれも設定されていない場合はNone（MeSH用語は入力のままクエリに使う）。
+    XMLからの構築には時間がかかるため、アプリでは起動時（lifespan）に呼び出して読み込みを済ませておく。
+    """
+    settings = get_mesh_settings()
+    index_dir = Path(settings.index_dir)
+    index = None
+    if (index_dir / "meta.json").exists():
+        try:
+            index = MeshIndex.load(index_dir)
+        except MeshIndexError as e:
+            logger.warning("Rebuilding MeSH index: %s", e)
+
+    if settings.descriptor_xml:
+        try:
+            stale = index is None or index.source != _source_stamp(settings.descriptor_xml)
+            if stale:
+                index = MeshIndex.from_xml(settings.descriptor_xml)
+        except (OSError, MeshIndexError) as e:
+            logger.error("Failed to build MeSH index: %s", e)
+            stale = False
+        if stale:
+            try:
+                index.save(index_dir)
+            except OSError as e:
+                logger.warning("Failed to save MeSH index to %s: %s", index_dir, e)
+    return index
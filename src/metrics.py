@@ -0,0 +1,218 @@
+# project/metrics.py
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Iterator
+from .cache import TTLCache
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple[str, ...]) -> dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}", *self._samples()]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """単調増加するカウンタ"""
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """累積バケットで分布を記録するヒストグラム"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [バケットごとの件数..., +Infの件数, 合計値]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """ブロックの実行時間（秒）を記録"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return int(sum(state[:-1])) if state else 0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        lines = []
+        for key, state in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), state[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_bound(bound)})} {int(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {state[-1]!r}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {int(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    """メトリクスの登録とPrometheusテキスト形式での出力"""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._caches: dict[str, TTLCache] = {}
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_cache(self, name: str, cache: TTLCache) -> None:
+        """ヒット率を出力するキャッシュを登録"""
+        self._caches[name] = cache
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+
+        for metric_name, help_text, value_of in (
+            ("cache_hits_total", "Cache lookups that found a live entry.", lambda cache: cache.hits),
+            ("cache_misses_total", "Cache lookups that missed or found an expired entry.", lambda cache: cache.misses),
+            ("cache_entries", "Entries currently held by the cache.", len),
+        ):
+            lines.append(f"# HELP {metric_name} {help_text}")
+            lines.append(f"# TYPE {metric_name} {'gauge' if metric_name == 'cache_entries' else 'counter'}")
+            for cache_name, cache in self._caches.items():
+                lines.append(f"{metric_name}{_format_labels({'cache': cache_name})} {value_of(cache)}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# PubMed E-utilities
+EUTILS_REQUEST_SECONDS = REGISTRY.histogram(
+    "eutils_request_duration_seconds", "Latency of NCBI E-utilities requests.", ("endpoint",))
+EUTILS_RATE_LIMIT_WAIT_SECONDS = REGISTRY.histogram(
+    "eutils_rate_limit_wait_seconds", "Time spent waiting for the E-utilities rate limit.",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.2, 0.35, 0.5, 1.0, 2.5, 5.0))
+EUTILS_ERRORS = REGISTRY.counter(
+    "eutils_request_errors_total", "Failed NCBI E-utilities requests.", ("endpoint",))
+EUTILS_RETRIES = REGISTRY.counter(
+    "eutils_request_retries_total", "E-utilities requests retried after a transient failure.", ("endpoint", "reason"))
+EUTILS_CIRCUIT_OPENED = REGISTRY.counter(
+    "eutils_circuit_opened_total", "Times the circuit breaker for an E-utilities endpoint opened.", ("endpoint",))
+EUTILS_HEDGED_REQUESTS = REGISTRY.counter(
+    "eutils_hedged_requests_total", "Hedged duplicate E-utilities requests, by which copy answered first.", ("endpoint", "winner"))
+EFETCH_BATCH_SIZE = REGISTRY.histogram(
+    "pubmed_efetch_batch_size", "PMIDs requested per efetch call.", ("method",),
+    buckets=(10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000))
+EFETCH_RESPONSE_BYTES = REGISTRY.histogram(
+    "pubmed_efetch_response_bytes", "Size of efetch responses.",
+    buckets=(64e3, 256e3, 1e6, 4e6, 16e6, 64e6, 256e6))
+PUBMED_PARSE_SECONDS = REGISTRY.histogram(
+    "pubmed_parse_duration_seconds", "Time spent parsing efetch XML into articles.")
+PUBMED_ARTICLES_PARSED = REGISTRY.counter(
+    "pubmed_articles_parsed_total", "Articles parsed from efetch responses.")
+PUBMED_PARSE_ERRORS = REGISTRY.counter(
+    "pubmed_article_parse_errors_total", "Articles skipped because they could not be parsed.")
+
+# LLM
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "llm_request_duration_seconds", "Latency of chat completion calls.", ("operation",))
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens_total", "Tokens consumed by chat completion calls.", ("operation", "kind"))
+LLM_ERRORS = REGISTRY.counter(
+    "llm_request_errors_total", "Failed chat completion calls.", ("operation",))
+
+# 記事生成
+ARTICLE_GENERATION_SECONDS = REGISTRY.histogram(
+    "article_generation_duration_seconds", "Time spent generating or regenerating an article.", ("mode",))
+ARTICLES_PROCESSED = REGISTRY.counter(
+    "articles_processed_total", "Articles summarized or analyzed by the LLM pipeline.", ("stage",))
+ARTICLES_DEDUPLICATED = REGISTRY.counter(
+    "articles_deduplicated_total", "Near-duplicate articles that reused another article's LLM outputs.", ("stage",))
+
+# 上流（NCBI・LLM）の公平スケジューラ
+SCHEDULER_WAIT_SECONDS = REGISTRY.histogram(
+    "scheduler_wait_seconds", "Time upstream calls waited in the fair scheduler queue.", ("upstream", "priority"))
+SCHEDULER_QUEUE_TIMEOUTS = REGISTRY.counter(
+    "scheduler_queue_timeouts_total", "Upstream calls rejected after waiting too long in the scheduler queue.", ("upstream",))
+
+# HTTP
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Latency of HTTP requests handled by the API.", ("method", "route", "status"))
+
+
+# よく使われる検索の事前取得
+PREFETCH_QUERIES = REGISTRY.counter(
+    "prefetch_queries_total", "Popular queries re-run by the off-peak prefetcher, by outcome.", ("outcome",))
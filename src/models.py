@@ -1,7 +1,7 @@
 # project/models.py
 
-from datetime import datetime
-from sqlmodel import SQLModel, Field, Relationship
+from datetime import date, datetime
+from sqlmodel import SQLModel, Field, Relationship, Column, JSON, UniqueConstraint, Index
 
 class User(SQLModel, table=True):
     __tablename__ = "users"
@@ -12,20 +12,142 @@ class User(SQLModel, table=True):
 
     # リレーション: User -> Article
     articles: list["Article"] = Relationship(back_populates="user")
+    saved_searches: list["SavedSearch"] = Relationship(back_populates="user")
+
+
+class ArticlePaper(SQLModel, table=True):
+    """記事と引用元論文の対応（「PMID Xを引用している記事」の検索用）"""
+    __tablename__ = "article_papers"
+
+    article_id: int = Field(foreign_key="articles.id", primary_key=True)
+    pmid: str = Field(foreign_key="papers.pmid", primary_key=True, max_length=20, index=True)
+    position: int = 0
 
 
 class Article(SQLModel, table=True):
     __tablename__ = "articles"
+    # ユーザーごとの新着順一覧（キーセットページング）用
+    __table_args__ = (Index("ix_articles_user_created", "user_id", "created_at", "id"),)
 
     id: int | None = Field(default=None, primary_key=True)
     title: str = Field(max_length=500)
     content: str | None = None
     summary: str | None = None
-    keywords: list[str] | None = None
-    source_articles: list[str] | None = None
+    keywords: list[str] | None = Field(default=None, sa_column=Column(JSON))
+    source_articles: list[str] | None = Field(default=None, sa_column=Column(JSON))
+    # PMIDごとの要約・分析 {pmid: {"summary": ..., "analysis": ...}}（再生成時に再利用）
+    paper_outputs: dict[str, dict[str, str]] | None = Field(default=None, sa_column=Column(JSON))
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     user_id: int | None = Field(default=None, foreign_key="users.id")
 
     # リレーション: Article -> User
     user: User | None = Relationship(back_populates="articles")
+    # リレーション: Article <-> Paper
+    papers: list["Paper"] = Relationship(back_populates="articles", link_model=ArticlePaper)
+
+
+class SavedSearch(SQLModel, table=True):
+    __tablename__ = "saved_searches"
+
+    id: int | None = Field(default=None, primary_key=True)
+    name: str = Field(max_length=200)
+    criteria: str  # SearchCriteriaのJSON
+    last_checked_at: datetime | None = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    user_id: int | None = Field(default=None, foreign_key="users.id", index=True)
+
+    # リレーション: SavedSearch -> User
+    user: User | None = Relationship(back_populates="saved_searches")
+
+
+class SavedSearchPmid(SQLModel, table=True):
+    """保存済み検索で既に取得したPMID（差分検出用）"""
+    __tablename__ = "saved_search_pmids"
+
+    saved_search_id: int = Field(foreign_key="saved_searches.id", primary_key=True)
+    pmid: str = Field(primary_key=True, max_length=20)
+    first_seen_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class Paper(SQLModel, table=True):
+    """PubMedから取得した論文（検索結果の再利用用）"""
+    __tablename__ = "papers"
+
+    pmid: str = Field(primary_key=True, max_length=20)
+    title: str
+    abstract: str = ""
+    doi: str | None = None
+    journal: str | None = Field(default=None, index=True)
+    journal_abbrev: str | None = None
+    pub_year: int | None = Field(default=None, index=True)
+    pub_month: int | None = None
+    pub_day: int | None = None
+    url: str | None = None
+    citation_count: int = 0
+    publication_types: list[str] | None = Field(default=None, sa_column=Column(JSON))
+    languages: list[str] | None = Field(default=None, sa_column=Column(JSON))
+    fetched_at: datetime = Field(default_factory=datetime.utcnow)
+
+    # リレーション: Paper <-> Article
+    articles: list[Article] = Relationship(back_populates="papers", link_model=ArticlePaper)
+
+
+class Author(SQLModel, table=True):
+    __tablename__ = "authors"
+    __table_args__ = (UniqueConstraint("last_name", "fore_name"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    last_name: str = Field(default="", index=True)
+    fore_name: str = ""
+
+
+class PaperAuthor(SQLModel, table=True):
+    __tablename__ = "paper_authors"
+
+    pmid: str = Field(foreign_key="papers.pmid", primary_key=True, max_length=20)
+    position: int = Field(primary_key=True)
+    author_id: int = Field(foreign_key="authors.id", index=True)
+    affiliation: str | None = None
+
+
+class MeshHeading(SQLModel, table=True):
+    __tablename__ = "mesh_headings"
+
+    id: int | None = Field(default=None, primary_key=True)
+    descriptor: str = Field(unique=True, index=True)
+    ui: str | None = Field(default=None, max_length=20)
+
+
+class PaperMesh(SQLModel, table=True):
+    __tablename__ = "paper_mesh"
+
+    pmid: str = Field(foreign_key="papers.pmid", primary_key=True, max_length=20)
+    mesh_id: int = Field(foreign_key="mesh_headings.id", primary_key=True, index=True)
+    position: int = 0
+    qualifiers: list[str] | None = Field(default=None, sa_column=Column(JSON))
+
+
+class Keyword(SQLModel, table=True):
+    __tablename__ = "keywords"
+
+    id: int | None = Field(default=None, primary_key=True)
+    term: str = Field(unique=True, index=True)
+
+
+class PaperKeyword(SQLModel, table=True):
+    __tablename__ = "paper_keywords"
+
+    pmid: str = Field(foreign_key="papers.pmid", primary_key=True, max_length=20)
+    keyword_id: int = Field(foreign_key="keywords.id", primary_key=True, index=True)
+    position: int = 0
+
+
+class QueryLogEntry(SQLModel, table=True):
+    """正規化した検索条件ごとの日別の実行回数（よく使われる検索の事前取得用）"""
+    __tablename__ = "query_log"
+
+    key: str = Field(primary_key=True, max_length=64)   # 正規化した検索条件のハッシュ
+    day: date = Field(primary_key=True, index=True)
+    criteria: str                                       # 正規化したSearchCriteriaのJSON
+    hits: int = 0
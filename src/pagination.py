@@ -0,0 +1,69 @@
+# project/pagination.py
+
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import secrets
+from functools import lru_cache
+from pydantic_settings import BaseSettings
+
+class PaginationSettings(BaseSettings):
+    # カーソルの署名鍵（未設定の場合はプロセスごとに生成。複数ワーカーで動かす場合は共通の値を設定する）
+    cursor_secret: str | None = None
+
+    class Config:
+        env_prefix = "PAGINATION_"
+
+@lru_cache()
+def get_pagination_settings() -> PaginationSettings:
+    return PaginationSettings()
+
+@lru_cache()
+def _cursor_key() -> bytes:
+    secret = get_pagination_settings().cursor_secret
+    return secret.encode("utf-8") if secret else secrets.token_bytes(32)
+
+class InvalidCursorError(Exception):
+    """ページングカーソルが不正な場合のエラー"""
+    pass
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode((data + "=" * (-len(data) % 4)).encode("ascii"))
+
+def _signature(payload: bytes) -> bytes:
+    return hmac.new(_cursor_key(), payload, hashlib.sha256).digest()
+
+def encode_cursor(state: dict) -> str:
+    """ページング状態をURLセーフな不透明カーソル（HMAC署名付き）にエンコード"""
+    payload = json.dumps(state, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return f"{_b64encode(payload)}.{_b64encode(_signature(payload))}"
+
+def decode_cursor(cursor: str, required: tuple[str, ...] = ()) -> dict:
+    """
+    カーソルをページング状態にデコード
+
+    Raises:
+        InvalidCursorError: デコードできない、署名が一致しない（改ざんされた）、または必須キーが欠けている場合
+    """
+    try:
+        encoded_payload, encoded_signature = cursor.split(".", 1)
+        payload = _b64decode(encoded_payload)
+        signature = _b64decode(encoded_signature)
+    except (ValueError, UnicodeError, binascii.Error) as e:
+        raise InvalidCursorError(f"Invalid cursor: {str(e)}")
+    if not hmac.compare_digest(signature, _signature(payload)):
+        raise InvalidCursorError("Invalid cursor signature")
+
+    try:
+        state = json.loads(payload)
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {str(e)}")
+
+    if not isinstance(state, dict) or any(key not in state for key in required):
+        raise InvalidCursorError("Invalid cursor")
+    return state
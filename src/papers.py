@@ -0,0 +1,338 @@
+# project/papers.py
+
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, Iterator, TypeVar
+from sqlalchemy import delete, func, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from .models import Article, ArticlePaper, Author, Keyword, MeshHeading, Paper, PaperAuthor, PaperKeyword, PaperMesh
+from .records import ArticleLike, ArticleRecord, mesh_term, publication_date
+from .schemas import ArticleAuthor, ArticleMeshTerm, ArticleResponse, PublicationDate
+from .typeahead import queue_articles
+
+if TYPE_CHECKING:
+    from .corpus import ColumnarCorpus
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# IN句・一括INSERTの1回あたりの件数（SQLiteのバインド変数上限を超えないように）
+CHUNK_SIZE = 500
+
+def _chunks(items: list[T], size: int = CHUNK_SIZE) -> Iterator[list[T]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _supports_upsert(db: Session) -> bool:
+    """INSERT ... ON CONFLICT を使える方言か"""
+    return db.get_bind().dialect.name in ("postgresql", "sqlite")
+
+def _insert(db: Session, model):
+    """DBの方言に応じたINSERT（ON CONFLICT対応。その他の方言では通常のINSERT）"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    return insert(model)
+
+def _existing_keys(db: Session, model, keys: list[str], rows: list[dict], selected=()) -> dict:
+    """rowsのうち既に存在する行の キー -> 選択した列 の対応（複数列のキーはタプル）"""
+    columns = [getattr(model, key) for key in keys]
+    existing = {}
+    for chunk in _chunks(rows):
+        if len(keys) == 1:
+            condition = columns[0].in_([row[keys[0]] for row in chunk])
+        else:
+            condition = tuple_(*columns).in_([tuple(row[key] for key in keys) for row in chunk])
+        for row in db.execute(select(*columns, *selected).where(condition)):
+            existing[row[0] if len(keys) == 1 else tuple(row[:len(keys)])] = tuple(row[len(keys):])
+    return existing
+
+def _row_key(row: dict, keys: list[str]):
+    return row[keys[0]] if len(keys) == 1 else tuple(row[key] for key in keys)
+
+def _paper_row(article: ArticleLike, now: datetime) -> dict:
+    date = article.publication_date
+    return {
+        "pmid": article.pmid,
+        "title": article.title,
+        "abstract": article.abstract,
+        "doi": article.doi,
+        "journal": article.journal,
+        "journal_abbrev": article.journal_abbrev,
+        "pub_year": date.year,
+        "pub_month": date.month,
+        "pub_day": date.day,
+        "url": article.url,
+        "citation_count": article.citation_count,
+        "publication_types": list(article.publication_types),
+        "languages": list(article.languages),
+        "fetched_at": now,
+    }
+
+def _upsert_dictionary(db: Session, model, keys: list[str], rows: Iterable[dict], update_columns: list[str] = ()) -> dict:
+    """
+    名前→IDの辞書テーブルに行を追加し、キーからIDへの対応を返す
+
+    keys は一意制約の列（複数列の場合はタプルで対応を返す）。
+    update_columns の列は既存の行も新しい値で更新する（新しい値がNoneの場合は既存の値を残す）。
+    ON CONFLICT を使えない方言では、既存の行を検索してから追加・更新する。
+    """
+    rows = list({_row_key(row, keys): row for row in rows}.values())
+    if not rows:
+        return {}
+
+    if _supports_upsert(db):
+        stmt = _insert(db, model)
+        if update_columns:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=keys,
+                set_={column: func.coalesce(stmt.excluded[column], getattr(model, column)) for column in update_columns}
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=keys)
+        db.execute(stmt, rows)
+    else:
+        existing = _existing_keys(db, model, keys, rows, (model.id,))
+        new_rows = [row for row in rows if _row_key(row, keys) not in existing]
+        if new_rows:
+            db.execute(insert(model), new_rows)
+        changes = [
+            {"id": existing[_row_key(row, keys)][0], **{column: row[column] for column in update_columns if row[column] is not None}}
+            for row in rows if _row_key(row, keys) in existing and any(row[column] is not None for column in update_columns)
+        ]
+        if changes:
+            db.execute(update(model), changes)
+
+    return {key: values[0] for key, values in _existing_keys(db, model, keys, rows, (model.id,)).items()}
+
+def upsert_papers(db: Session, articles: list[ArticleLike], now: datetime | None = None) -> int:
+    """
+    検索結果の論文・著者・MeSH・キーワードを一括で保存
+
+    各テーブルに対して executemany で書き込み、コミットは呼び出し側に任せる
+    （記事の保存などと同じトランザクションにまとめられるように）。
+    既存の論文は最新の内容で上書きし、著者等の対応も置き換える。
+    """
+    articles = list({article.pmid: article for article in articles}.values())
+    if not articles:
+        return 0
+    now = now or datetime.utcnow()
+
+    paper_rows = [_paper_row(article, now) for article in articles]
+    if _supports_upsert(db):
+        stmt = _insert(db, Paper)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["pmid"],
+            set_={column: stmt.excluded[column] for column in paper_rows[0] if column != "pmid"}
+        )
+        db.execute(stmt, paper_rows)
+    else:
+        existing = _existing_keys(db, Paper, ["pmid"], paper_rows)
+        new_rows = [row for row in paper_rows if row["pmid"] not in existing]
+        if new_rows:
+            db.execute(insert(Paper), new_rows)
+        if len(new_rows) < len(paper_rows):
+            # 主キーを含む行のリストによるORMの一括UPDATE
+            db.execute(update(Paper), [row for row in paper_rows if row["pmid"] in existing])
+
+    author_ids = _upsert_dictionary(
+        db, Author, ["last_name", "fore_name"],
+        ({"last_name": author.last_name or "", "fore_name": author.fore_name or ""}
+         for article in articles for author in article.authors)
+    )
+    mesh_ids = _upsert_dictionary(
+        db, MeshHeading, ["descriptor"],
+        ({"descriptor": term.descriptor, "ui": term.ui}
+         for article in articles for term in article.mesh_terms if term.descriptor),
+        update_columns=["ui"]
+    )
+    keyword_ids = _upsert_dictionary(
+        db, Keyword, ["term"],
+        ({"term": keyword} for article in articles for keyword in article.keywords if keyword)
+    )
+
+    pmids = [article.pmid for article in articles]
+    for link in (PaperAuthor, PaperMesh, PaperKeyword):
+        for chunk in _chunks(pmids):
+            db.execute(delete(link).where(link.pmid.in_(chunk)))
+
+    author_rows = [
+        {
+            "pmid": article.pmid,
+            "position": position,
+            "author_id": author_ids[(author.last_name or "", author.fore_name or "")],
+            "affiliation": author.affiliation,
+        }
+        for article in articles for position, author in enumerate(article.authors)
+    ]
+    mesh_rows = list({
+        (article.pmid, term.descriptor): {
+            "pmid": article.pmid,
+            "mesh_id": mesh_ids[term.descriptor],
+            "position": position,
+            "qualifiers": list(term.qualifiers or []),
+        }
+        for article in articles for position, term in enumerate(article.mesh_terms) if term.descriptor
+    }.values())
+    keyword_rows = list({
+        (article.pmid, keyword): {"pmid": article.pmid, "keyword_id": keyword_ids[keyword], "position": position}
+        for article in articles for position, keyword in enumerate(article.keywords) if keyword
+    }.values())
+
+    for model, rows in ((PaperAuthor, author_rows), (PaperMesh, mesh_rows), (PaperKeyword, keyword_rows)):
+        if rows:
+            db.execute(_insert(db, model), rows)
+
+    # 入力補完の索引にはコミット後に反映する
+    queue_articles(db, articles)
+    return len(articles)
+
+def store_search_results(db: Session, articles: list[ArticleLike]) -> int:
+    """
+    検索結果の論文を保存してコミットし、保存件数を返す
+
+    結果セットの期限切れ後の再構成・入力補完の索引に使う。保存に失敗しても検索自体は失敗させない。
+    """
+    try:
+        count = upsert_papers(db, articles)
+        db.commit()
+        return count
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.warning("Failed to store %d search results: %s", len(articles), e)
+        return 0
+
+def link_article_papers(db: Session, article_id: int, pmids: list[str]) -> None:
+    """記事と引用元論文の対応を置き換え（コミットは呼び出し側）"""
+    db.execute(delete(ArticlePaper).where(ArticlePaper.article_id == article_id))
+    pmids = list(dict.fromkeys(pmids))
+    if pmids:
+        db.execute(
+            _insert(db, ArticlePaper),
+            [{"article_id": article_id, "pmid": pmid, "position": position} for position, pmid in enumerate(pmids)]
+        )
+
+def save_article_papers(db: Session, article: Article, papers: list[ArticleLike]) -> None:
+    """記事の引用元論文を保存して対応付ける（コミットは呼び出し側）"""
+    upsert_papers(db, papers)
+    link_article_papers(db, article.id, [paper.pmid for paper in papers])
+
+def load_papers(db: Session, pmids: list[str]) -> list[ArticleResponse]:
+    """
+    保存済みの論文をPMIDの順序で取得
+
+    保存されていないPMIDは結果に含まれない。要約・分析は保存しないため空となる。
+    """
+    pmids = list(dict.fromkeys(pmids))
+    papers: dict[str, ArticleResponse] = {}
+    for chunk in _chunks(pmids):
+        for paper in db.execute(select(Paper).where(Paper.pmid.in_(chunk))).scalars():
+            papers[paper.pmid] = ArticleResponse(
+                pmid=paper.pmid,
+                title=paper.title,
+                abstract=paper.abstract,
+                publication_types=paper.publication_types or [],
+                languages=paper.languages or [],
+                doi=paper.doi,
+                journal=paper.journal,
+                journal_abbrev=paper.journal_abbrev,
+                publication_date=PublicationDate(year=paper.pub_year, month=paper.pub_month, day=paper.pub_day),
+                url=paper.url,
+                citation_count=paper.citation_count,
+            )
+
+        found = [pmid for pmid in chunk if pmid in papers]
+        if not found:
+            continue
+        authors = db.execute(
+            select(PaperAuthor.pmid, Author.last_name, Author.fore_name, PaperAuthor.affiliation)
+            .join(Author, Author.id == PaperAuthor.author_id)
+            .where(PaperAuthor.pmid.in_(found))
+            .order_by(PaperAuthor.pmid, PaperAuthor.position)
+        )
+        for pmid, last_name, fore_name, affiliation in authors:
+            papers[pmid].authors.append(
+                ArticleAuthor(last_name=last_name or None, fore_name=fore_name or None, affiliation=affiliation)
+            )
+        mesh_terms = db.execute(
+            select(PaperMesh.pmid, MeshHeading.descriptor, MeshHeading.ui, PaperMesh.qualifiers)
+            .join(MeshHeading, MeshHeading.id == PaperMesh.mesh_id)
+            .where(PaperMesh.pmid.in_(found))
+            .order_by(PaperMesh.pmid, PaperMesh.position)
+        )
+        for pmid, descriptor, ui, qualifiers in mesh_terms:
+            papers[pmid].mesh_terms.append(ArticleMeshTerm(descriptor=descriptor, qualifiers=qualifiers or [], ui=ui))
+        keywords = db.execute(
+            select(PaperKeyword.pmid, Keyword.term)
+            .join(Keyword, Keyword.id == PaperKeyword.keyword_id)
+            .where(PaperKeyword.pmid.in_(found))
+            .order_by(PaperKeyword.pmid, PaperKeyword.position)
+        )
+        for pmid, term in keywords:
+            papers[pmid].keywords.append(term)
+
+    return [papers[pmid] for pmid in pmids if pmid in papers]
+
+def find_citing_articles(db: Session, pmid: str, user_id: int | None = None) -> list[Article]:
+    """指定したPMIDを引用元に含む記事（user_idを指定した場合はそのユーザーの記事のみ）"""
+    query = (
+        select(Article)
+        .join(ArticlePaper, ArticlePaper.article_id == Article.id)
+        .where(ArticlePaper.pmid == pmid)
+        .order_by(Article.created_at.desc())
+    )
+    if user_id is not None:
+        query = query.where(Article.user_id == user_id)
+    return list(db.execute(query).scalars())
+
+def _corpus_records(db: Session, batch_size: int) -> Iterator[ArticleRecord]:
+    """コーパスに必要な列のみの論文（PMID順にキーセットページングで読み込む）"""
+    last_pmid = None
+    while True:
+        query = select(
+            Paper.pmid, Paper.journal, Paper.journal_abbrev, Paper.pub_year, Paper.publication_types, Paper.languages
+        ).order_by(Paper.pmid).limit(batch_size)
+        if last_pmid is not None:
+            query = query.where(Paper.pmid > last_pmid)
+        rows = db.execute(query).all()
+        if not rows:
+            return
+
+        mesh_terms: dict[str, list] = defaultdict(list)
+        for chunk in _chunks([row.pmid for row in rows]):
+            for pmid, descriptor, ui in db.execute(
+                select(PaperMesh.pmid, MeshHeading.descriptor, MeshHeading.ui)
+                .join(MeshHeading, MeshHeading.id == PaperMesh.mesh_id)
+                .where(PaperMesh.pmid.in_(chunk))
+                .order_by(PaperMesh.pmid, PaperMesh.position)
+            ):
+                mesh_terms[pmid].append(mesh_term(descriptor, [], ui))
+
+        for row in rows:
+            yield ArticleRecord(
+                pmid=row.pmid,
+                title="",
+                abstract="",
+                mesh_terms=tuple(mesh_terms.get(row.pmid, ())),
+                publication_types=tuple(row.publication_types or ()),
+                languages=tuple(row.languages or ()),
+                journal=row.journal,
+                journal_abbrev=row.journal_abbrev,
+                publication_date=publication_date(row.pub_year, None, None),
+            )
+        last_pmid = rows[-1].pmid
+
+def build_corpus(db: Session, batch_size: int = 10000) -> "ColumnarCorpus":
+    """
+    保存済みの論文からローカルコーパス（カラムナストア）を構築
+
+    論文は batch_size 件ずつ読み込み、全件の ORM オブジェクトをメモリに載せずに列へ変換する。
+    """
+    from .corpus import ColumnarCorpus
+    return ColumnarCorpus.from_articles(_corpus_records(db, batch_size))
@@ -0,0 +1,292 @@
+# project/prefetch.py
+
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Iterable
+from pydantic_settings import BaseSettings
+from sqlalchemy import delete, func, select
+from sqlmodel import Session
+from .cache import TTLCache
+from .mesh import get_mesh_index
+from .metrics import PREFETCH_QUERIES, REGISTRY
+from .models import QueryLogEntry
+from .papers import store_search_results
+from .pubmed import PubMedAdvancedSearch
+from .records import ArticleLike
+from .scheduler import Priority, tenant_scope
+from .schemas import SearchCriteria
+from .services import enrich_articles
+
+logger = logging.getLogger(__name__)
+
+class PrefetchSettings(BaseSettings):
+    enabled: bool = False                  # クエリログ・検索結果キャッシュ・事前取得をまとめて有効化
+    top_n: int = 200                       # 事前取得する検索の件数
+    min_hits: int = 2                      # 期間内にこの回数以上実行された検索のみ事前取得
+    lookback_days: int = 7                 # 実行回数を数える期間
+    retention_days: int = 30               # クエリログの保持期間
+    window_start_hour: int = 2             # オフピークの時間帯（サーバーのローカル時刻、終了時刻は含まない）
+    window_end_hour: int = 6
+    idle_seconds: float = 300              # 直近の検索からこの時間が経過している間のみ事前取得
+    query_interval_seconds: float = 1.0    # 事前取得する検索の間隔（NCBIの上限を対話的な検索に残す）
+    poll_seconds: float = 300              # クエリログの書き出し・事前取得の確認間隔
+    cache_ttl_seconds: int = 93600         # 翌日の事前取得まで残るよう1日より長くする
+    live_cache_ttl_seconds: int = 300      # 事前取得以外（その場で検索した結果）の保持期間
+    cache_size: int = 1000
+    cache_max_results: int = 500           # これを超える件数の検索はキャッシュしない
+
+    class Config:
+        env_prefix = "PREFETCH_"
+
+@lru_cache()
+def get_prefetch_settings() -> PrefetchSettings:
+    return PrefetchSettings()
+
+PREFETCH_TENANT = "prefetch"
+
+_WHITESPACE = re.compile(r"\s+")
+
+def _clean(value: str) -> str:
+    return _WHITESPACE.sub(" ", value).strip()
+
+def _unique_sorted(values: Iterable | None) -> list | None:
+    """順序が結果に影響しないリスト条件の正規化（重複・空文字を除いてソート）"""
+    unique = sorted({value for value in values or () if value})
+    return unique or None
+
+def canonical_query(criteria: SearchCriteria) -> tuple[str, SearchCriteria]:
+    """
+    同じ結果になる検索条件を1つにまとめる正規化と、そのキー（正規化した条件のJSONのハッシュ）
+
+    空白を詰め、ORで結合されるリスト条件はソートし、MeSH用語はMeSHインデックスがあれば記述子名に揃える。
+    キーワードはPubMedの演算子（AND/OR/NOT）を含みうるため大文字小文字は変えない。
+    """
+    index = get_mesh_index()
+    mesh_terms = []
+    for term in criteria.mesh_terms or ():
+        descriptor = index.lookup(term) if index is not None else None
+        mesh_terms.append(index.name(descriptor) if descriptor is not None else _clean(term))
+
+    canonical = SearchCriteria.model_validate({
+        **criteria.model_dump(),
+        "keywords": _clean(criteria.keywords),
+        "search_fields": _unique_sorted(criteria.search_fields),
+        "exclude_keywords": _unique_sorted(_clean(keyword) for keyword in criteria.exclude_keywords or ()),
+        "mesh_terms": _unique_sorted(mesh_terms),
+        "publication_types": _unique_sorted(criteria.publication_types),
+        "authors": _unique_sorted(_clean(author) for author in criteria.authors or ()),
+        "journals": _unique_sorted(_clean(journal) for journal in criteria.journals or ()),
+        "affiliations": _unique_sorted(_clean(affiliation) for affiliation in criteria.affiliations or ()),
+        "languages": _unique_sorted(criteria.languages),
+    })
+    key = hashlib.sha256(canonical.model_dump_json().encode("utf-8")).hexdigest()
+    return key, canonical
+
+def is_cacheable(criteria: SearchCriteria) -> bool:
+    return criteria.max_results <= get_prefetch_settings().cache_max_results
+
+class QueryLog:
+    """
+    実行された検索（正規化した条件）の記録
+
+    リクエストごとにはメモリ上で数えるのみで、データベースへはスケジューラが定期的にまとめて書き出す。
+    """
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._pending: dict[str, tuple[str, int]] = {}   # キー -> (条件のJSON, 回数)
+        self._last_search: float | None = None
+        self._lock = threading.Lock()
+
+    def record(self, key: str, criteria: SearchCriteria) -> None:
+        with self._lock:
+            criteria_json, hits = self._pending.get(key) or (criteria.model_dump_json(), 0)
+            self._pending[key] = (criteria_json, hits + 1)
+            self._last_search = self._clock()
+
+    def idle_seconds(self) -> float:
+        """直近の検索からの経過秒数（検索がなければ無限大）"""
+        last_search = self._last_search
+        return float("inf") if last_search is None else self._clock() - last_search
+
+    def flush(self, db: Session, day: date | None = None) -> int:
+        """記録した回数を日別の行に加算し、保持期間を過ぎた行を削除する（書き出した検索の種類数を返す）"""
+        day = day or date.today()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        try:
+            for key, (criteria_json, hits) in pending.items():
+                entry = db.get(QueryLogEntry, (key, day))
+                if entry is None:
+                    entry = QueryLogEntry(key=key, day=day, criteria=criteria_json)
+                entry.hits += hits
+                db.add(entry)
+            db.execute(delete(QueryLogEntry).where(
+                QueryLogEntry.day < day - timedelta(days=get_prefetch_settings().retention_days)
+            ))
+            db.commit()
+        except Exception:
+            db.rollback()
+            # 書き出せなかった回数は次回に持ち越す
+            with self._lock:
+                for key, (criteria_json, hits) in pending.items():
+                    _, newer = self._pending.get(key) or (criteria_json, 0)
+                    self._pending[key] = (criteria_json, hits + newer)
+            raise
+        return len(pending)
+
+def popular_queries(db: Session, limit: int, since: date, min_hits: int = 1) -> list[tuple[str, SearchCriteria]]:
+    """since以降の実行回数が多い順の (キー, 正規化した検索条件)"""
+    hits = func.sum(QueryLogEntry.hits)
+    rows = db.execute(
+        select(QueryLogEntry.key, func.max(QueryLogEntry.criteria))
+        .where(QueryLogEntry.day >= since)
+        .group_by(QueryLogEntry.key)
+        .having(hits >= min_hits)
+        .order_by(hits.desc(), QueryLogEntry.key)
+        .limit(limit)
+    )
+    return [(key, SearchCriteria.model_validate_json(criteria)) for key, criteria in rows]
+
+class SearchResultCache:
+    """正規化した検索条件のキーごとの検索結果（LLMの要約・分析を付与済み）"""
+    def __init__(self, maxsize: int, ttl: float):
+        self.cache: TTLCache[str, list[ArticleLike]] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key: str) -> list[ArticleLike] | None:
+        articles = self.cache.get(key)
+        return list(articles) if articles is not None else None
+
+    def put(self, key: str, articles: list[ArticleLike], ttl: float | None = None) -> None:
+        # 結果が空の検索は一時的な障害の可能性もあるためキャッシュしない
+        if articles:
+            self.cache.set(key, list(articles), ttl=ttl)
+
+@lru_cache()
+def get_query_log() -> QueryLog:
+    return QueryLog()
+
+@lru_cache()
+def get_search_cache() -> SearchResultCache:
+    settings = get_prefetch_settings()
+    cache = SearchResultCache(settings.cache_size, settings.cache_ttl_seconds)
+    REGISTRY.register_cache("search_results", cache.cache)
+    return cache
+
+class QueryPrefetcher:
+    """
+    よく使われる検索をオフピークの時間帯に再実行し、検索結果キャッシュを温めるクラス
+
+    直近の実行回数が多い順に、検索が途絶えている間だけバッチの優先度で実行する（公平スケジューラにより
+    対話的な検索がNCBI・LLMの実行枠を優先して使う）。検索が再開されたら中断し、同じ日の次回の確認時に
+    未取得の検索から続ける。
+    """
+    def __init__(
+        self,
+        searcher: PubMedAdvancedSearch | None = None,
+        enrich: bool = True,
+        log: QueryLog | None = None,
+        cache: SearchResultCache | None = None,
+        clock: Callable[[], datetime] = datetime.now,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.searcher = searcher or PubMedAdvancedSearch()
+        self.enrich = enrich
+        self.log = log or get_query_log()
+        self.cache = cache or get_search_cache()
+        self.clock = clock
+        self.sleep = sleep
+        self._day: date | None = None
+        self._done: set[str] = set()
+
+    def in_window(self, now: datetime) -> bool:
+        settings = get_prefetch_settings()
+        start, end = settings.window_start_hour, settings.window_end_hour
+        if start <= end:
+            return start <= now.hour < end
+        return now.hour >= start or now.hour < end   # 日付をまたぐ時間帯（例: 22時〜5時）
+
+    def _can_run(self) -> bool:
+        return self.in_window(self.clock()) and self.log.idle_seconds() >= get_prefetch_settings().idle_seconds
+
+    def run(self, db: Session) -> int:
+        """オフピークかつ検索が途絶えていれば、その日にまだ取得していない人気の検索を取得し、取得件数を返す"""
+        settings = get_prefetch_settings()
+        if not self._can_run():
+            return 0
+
+        today = self.clock().date()
+        if self._day != today:
+            self._day, self._done = today, set()
+        queries = popular_queries(db, settings.top_n, today - timedelta(days=settings.lookback_days), settings.min_hits)
+
+        prefetched = 0
+        for key, criteria in queries:
+            if key in self._done:
+                continue
+            if prefetched and settings.query_interval_seconds:
+                self.sleep(settings.query_interval_seconds)
+            if not self._can_run():
+                PREFETCH_QUERIES.inc(outcome="deferred")
+                break
+            try:
+                with tenant_scope(PREFETCH_TENANT, Priority.BATCH):
+                    articles = self.searcher.search_papers(criteria)
+                    if self.enrich:
+                        enrich_articles(articles)
+                self.cache.put(key, articles)
+                store_search_results(db, articles)
+                PREFETCH_QUERIES.inc(outcome="ok")
+            except Exception:
+                PREFETCH_QUERIES.inc(outcome="error")
+                logger.exception("Failed to prefetch query %s", key)
+            self._done.add(key)
+            prefetched += 1
+        return prefetched
+
+class PrefetchScheduler:
+    """クエリログの書き出しと人気の検索の事前取得を定期的に行うバックグラウンドタスク"""
+    def __init__(self, engine, prefetcher: QueryPrefetcher | None = None):
+        self.engine = engine
+        self.prefetcher = prefetcher or QueryPrefetcher()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # 未書き出しの記録を残す
+        await asyncio.to_thread(self.flush)
+
+    def flush(self) -> int:
+        with Session(self.engine) as db:
+            return self.prefetcher.log.flush(db)
+
+    def run_once(self) -> int:
+        with Session(self.engine) as db:
+            self.prefetcher.log.flush(db)
+            return self.prefetcher.run(db)
+
+    async def _run(self):
+        poll_seconds = get_prefetch_settings().poll_seconds
+        while True:
+            try:
+                # 同期I/O（NCBI・LLM・DB）のためスレッドで実行
+                await asyncio.to_thread(self.run_once)
+            except Exception:
+                logger.exception("Prefetch scheduler iteration failed")
+            await asyncio.sleep(poll_seconds)
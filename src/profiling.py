@@ -0,0 +1,123 @@
+# project/profiling.py
+
+import hmac
+import secrets
+import sys
+import threading
+from collections import Counter
+from functools import lru_cache
+from types import FrameType
+from urllib.parse import parse_qs
+from pydantic_settings import BaseSettings
+from .cache import TTLCache
+
+PROFILE_HEADER = "x-profile-token"
+PROFILE_QUERY_PARAM = "profile_token"
+PROFILE_ID_HEADER = "x-profile-id"
+
+class ProfilingSettings(BaseSettings):
+    token: str | None = None         # 未設定の場合はプロファイリング無効（ミドルウェア自体を登録しない）
+    interval_seconds: float = 0.002  # サンプリング間隔
+    max_profiles: int = 32
+    ttl_seconds: int = 3600
+
+    class Config:
+        env_prefix = "PROFILING_"
+
+@lru_cache()
+def get_profiling_settings() -> ProfilingSettings:
+    return ProfilingSettings()
+
+@lru_cache()
+def get_profile_store() -> TTLCache[str, str]:
+    """採取したプロファイル（collapsed stack形式）の保存先"""
+    settings = get_profiling_settings()
+    return TTLCache(maxsize=settings.max_profiles, ttl=settings.ttl_seconds)
+
+def is_authorized(token: str | None) -> bool:
+    expected = get_profiling_settings().token
+    return bool(expected and token and hmac.compare_digest(token, expected))
+
+
+def _frame_name(frame: FrameType) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_name}:{frame.f_lineno}"
+
+class StackSampler:
+    """
+    全スレッドのスタックを一定間隔で採取するサンプリングプロファイラ
+
+    結果はflamegraph.pl / speedscope 互換の collapsed stack 形式
+    （"スレッド名;呼び出し元;...;呼び出し先 サンプル数"）で出力する。
+    同時に処理中の他リクエストのスタックも含まれる点に注意。
+    """
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        self._thread.join()
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval_seconds):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+
+class ProfilingMiddleware:
+    """
+    管理者用ヘッダー（X-Profile-Token）またはクエリ（?profile_token=）で指定された
+    リクエストのみをサンプリングプロファイラで計測するASGIミドルウェア
+
+    採取結果はプロファイルストアに保存され、レスポンスヘッダー X-Profile-Id のIDで取得できる。
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not is_authorized(self._requested_token(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = secrets.token_urlsafe(12)
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (PROFILE_ID_HEADER.encode(), profile_id.encode())]
+            await send(message)
+
+        sampler = StackSampler(get_profiling_settings().interval_seconds)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            get_profile_store().set(profile_id, sampler.stop())
+
+    @staticmethod
+    def _requested_token(scope) -> str | None:
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER.encode():
+                return value.decode("latin-1")
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        values = query.get(PROFILE_QUERY_PARAM)
+        return values[0] if values else None
@@ -2,18 +2,145 @@ from __future__ import annotations
 import requests
 import xml.etree.ElementTree as ET
 from datetime import datetime
+import math
 import time
-import json
+import threading
+import logging
 from pathlib import Path
-from typing import Callable
-from schemas import SearchCriteria, ArticleResponse, SearchField, PublicationType, Language, SortBy
+from typing import Callable, Iterable
+from dataclasses import dataclass
+from concurrent.futures import Future
+from functools import lru_cache
+from pydantic_settings import BaseSettings
+from tenacity import Retrying, retry_if_exception, stop_after_attempt
+from .schemas import SearchCriteria, SearchField, PublicationType, Language, SortBy
+from .exporters import ExportError, detect_format, export_articles
+from .workers import get_worker_settings, should_offload, submit
+from .scheduler import SchedulerTimeoutError, upstream_slot
+from .mesh import get_mesh_index, get_mesh_settings
+from .citations import CitationGraph, RelatedPaper, get_citation_graph, get_citation_settings, save_citation_graph
+from .resilience import (
+    CircuitBreaker, CircuitOpenError, LatencyWindow, failure_reason, hedged, is_retryable, wait_retry_after
+)
+from .records import ArticleLike, ArticleRecord, AuthorRecord, MeshTermRecord, DateRecord, EMPTY_DATE, intern, mesh_term, publication_date
+from .metrics import (
+    EUTILS_REQUEST_SECONDS, EUTILS_RATE_LIMIT_WAIT_SECONDS, EUTILS_ERRORS,
+    PUBMED_PARSE_SECONDS, PUBMED_ARTICLES_PARSED, PUBMED_PARSE_ERRORS,
+    EFETCH_BATCH_SIZE, EFETCH_RESPONSE_BYTES,
+    EUTILS_RETRIES, EUTILS_CIRCUIT_OPENED, EUTILS_HEDGED_REQUESTS
+)
+
+logger = logging.getLogger(__name__)
+
+# elinkのリンク名（引用先・引用元）
+ELINK_REFERENCES = "pubmed_pubmed_refs"
+ELINK_CITED_BY = "pubmed_pubmed_citedin"
 
 class PubMedSearchError(Exception):
     """PubMed検索に関連するエラー"""
     pass
 
+class PubMedSettings(BaseSettings):
+    base_url: str = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+    # efetchのバッチサイズ（観測したレスポンスサイズ・所要時間から調整）
+    efetch_initial_batch: int = 200           # 観測値がない間のバッチサイズ
+    efetch_min_batch: int = 20
+    efetch_max_batch: int = 10000             # NCBIのefetchの上限
+    efetch_target_bytes: int = 64 * 1024 * 1024
+    efetch_target_seconds: float = 20.0
+    efetch_post_min_ids: int = 200            # これ以上のPMIDはURL長の制限を避けるためPOSTで送る
+    # タイムアウト・再試行
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+    max_attempts: int = 4
+    retry_backoff_seconds: float = 0.5        # ジッター付き指数バックオフの初期値
+    retry_max_wait_seconds: float = 30.0      # Retry-Afterを含む1回の待機の上限
+    # エンドポイントごとのサーキットブレーカー
+    breaker_failure_threshold: int = 5
+    breaker_reset_seconds: float = 30.0
+    # efetchのヘッジ（所要時間が直近のhedge_quantileを超えたら同じリクエストをもう1件送る）
+    hedge_efetch: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+
+    class Config:
+        env_prefix = "PUBMED_"
+
+@lru_cache()
+def get_pubmed_settings() -> PubMedSettings:
+    return PubMedSettings()
+
+@dataclass(frozen=True)
+class SearchHistory:
+    """NCBI History Serverに保持された検索結果の参照"""
+    count: int           # 検索結果の総件数
+    webenv: str
+    query_key: str
+    pmids: list[str]     # esearchで取得した先頭のPMID
+
+@lru_cache(maxsize=None)
+def get_circuit_breaker(base_url: str, endpoint: str) -> CircuitBreaker:
+    """E-utilitiesのエンドポイントごとのサーキットブレーカー"""
+    settings = get_pubmed_settings()
+    return CircuitBreaker(f"{base_url}/{endpoint}", settings.breaker_failure_threshold, settings.breaker_reset_seconds)
+
+@lru_cache(maxsize=None)
+def get_latency_window(endpoint: str) -> LatencyWindow:
+    """E-utilitiesのエンドポイントごとの直近の所要時間（成功したリクエストのみ）"""
+    return LatencyWindow()
+
+class EfetchBatchSizer:
+    """
+    efetchの1リクエストあたりのPMID数を決める
+
+    論文1件あたりのレスポンスサイズと所要時間の移動平均から、目標サイズ・目標時間に収まる最大の件数を選ぶ。
+    E-utilitiesはリクエスト数で制限されるため、バッチは大きいほど検索全体の往復回数が減る。
+    """
+    def __init__(self, settings: PubMedSettings, smoothing: float = 0.3):
+        self.settings = settings
+        self.smoothing = smoothing
+        self.bytes_per_article: float | None = None
+        self.seconds_per_article: float | None = None
+        self._lock = threading.Lock()
+
+    def batch_size(self) -> int:
+        """現在の推定値での1リクエストあたりの最大件数"""
+        settings = self.settings
+        with self._lock:
+            if self.bytes_per_article is None or self.seconds_per_article is None:
+                size = settings.efetch_initial_batch
+            else:
+                size = min(
+                    settings.efetch_target_bytes / max(self.bytes_per_article, 1.0),
+                    settings.efetch_target_seconds / max(self.seconds_per_article, 1e-6)
+                )
+        return int(max(settings.efetch_min_batch, min(settings.efetch_max_batch, size)))
+
+    def next_batch(self, remaining: int) -> int:
+        """残りremaining件のうち次に取得する件数（最小の往復回数で、各バッチが均等になるよう分割）"""
+        size = self.batch_size()
+        if remaining <= size:
+            return remaining
+        return math.ceil(remaining / math.ceil(remaining / size))
+
+    def observe(self, articles: int, response_bytes: int, seconds: float) -> None:
+        """efetchの結果を推定値に反映"""
+        if articles <= 0:
+            return
+        with self._lock:
+            self.bytes_per_article = self._update(self.bytes_per_article, response_bytes / articles)
+            self.seconds_per_article = self._update(self.seconds_per_article, seconds / articles)
+
+    def _update(self, current: float | None, value: float) -> float:
+        return value if current is None else current + self.smoothing * (value - current)
+
+@lru_cache()
+def get_efetch_batch_sizer() -> EfetchBatchSizer:
+    """プロセス内で共有するバッチサイズの推定（検索をまたいで学習する）"""
+    return EfetchBatchSizer(get_pubmed_settings())
+
 class PubMedAdvancedSearch:
-    def __init__(self, api_key: str | None = None):
+    def __init__(self, api_key: str | None = None, base_url: str | None = None):
         """
         PubMed検索クラスの初期化
         
@@ -23,8 +150,10 @@ class PubMedAdvancedSearch:
             NCBI E-utilities API key
             - リクエスト制限: APIキーあり=10req/sec, なし=3req/sec
             - 取得方法: https://ncbiinsights.ncbi.nlm.nih.gov/2017/11/02/new-api-keys-for-the-e-utilities/
+        base_url : str | None
+            E-utilitiesのベースURL（省略時は環境変数 PUBMED_BASE_URL またはNCBI）
         """
-        self.base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+        self.base_url = base_url or get_pubmed_settings().base_url
         self.api_key = api_key
         self._last_request_time = 0
         self._rate_limit = 0.1 if api_key else 0.34  # 10 req/sec or 3 req/sec
@@ -33,24 +162,120 @@ class PubMedAdvancedSearch:
         """リクエスト制限を遵守するための待機"""
         current_time = time.time()
         time_since_last_request = current_time - self._last_request_time
-        if time_since_last_request < self._rate_limit:
-            time.sleep(self._rate_limit - time_since_last_request)
+        wait_seconds = max(self._rate_limit - time_since_last_request, 0)
+        if wait_seconds:
+            time.sleep(wait_seconds)
+        EUTILS_RATE_LIMIT_WAIT_SECONDS.observe(wait_seconds)
         self._last_request_time = time.time()
 
-    def _make_request(self, endpoint: str, params: dict) -> requests.Response:
-        """レート制限を考慮したリクエスト実行"""
-        self._wait_for_rate_limit()
+    def _make_request(self, endpoint: str, params: dict, method: str = "GET") -> requests.Response:
+        """
+        レート制限を考慮したリクエスト実行（POSTの場合はパラメータをフォームで送信）
+
+        接続エラー・タイムアウト・429・5xxはRetry-Afterに従って（なければジッター付き指数バックオフで）再試行する。
+        エンドポイントごとのサーキットブレーカーが開いている間は送信せずにエラーとする。
+        べき等なefetchは、設定により所要時間が直近のパーセンタイルを超えた場合に同じリクエストをもう1件送る。
+        """
+        settings = get_pubmed_settings()
         url = f"{self.base_url}/{endpoint}"
         
         if self.api_key:
             params["api_key"] = self.api_key
             
+        metric_endpoint = endpoint.removesuffix(".fcgi")
+        breaker = get_circuit_breaker(self.base_url, metric_endpoint)
+        retrying = Retrying(
+            stop=stop_after_attempt(settings.max_attempts),
+            wait=wait_retry_after(settings.retry_backoff_seconds, settings.retry_max_wait_seconds),
+            retry=retry_if_exception(is_retryable),
+            before_sleep=lambda state: EUTILS_RETRIES.inc(
+                endpoint=metric_endpoint, reason=failure_reason(state.outcome.exception())
+            ),
+            reraise=True
+        )
         try:
-            response = requests.get(url, params=params)
+            for attempt in retrying:
+                # 全ユーザーで共有するNCBIの枠を公平スケジューラで確保してから送信
+                with attempt, upstream_slot("ncbi"):
+                    breaker.before_call()
+                    self._wait_for_rate_limit()
+                    response = self._send(metric_endpoint, url, params, method, breaker)
+            return response
+        except (CircuitOpenError, SchedulerTimeoutError, requests.RequestException) as e:
+            EUTILS_ERRORS.inc(endpoint=metric_endpoint)
+            raise PubMedSearchError(f"API request failed: {str(e)}")
+
+    def _send(
+        self,
+        metric_endpoint: str,
+        url: str,
+        params: dict,
+        method: str,
+        breaker: CircuitBreaker
+    ) -> requests.Response:
+        """1回分のリクエスト送信（結果をサーキットブレーカーに記録）"""
+        settings = get_pubmed_settings()
+        timeout = (settings.connect_timeout, settings.read_timeout)
+
+        def send() -> requests.Response:
+            start = time.perf_counter()
+            try:
+                if method == "POST":
+                    response = requests.post(url, data=params, timeout=timeout)
+                else:
+                    response = requests.get(url, params=params, timeout=timeout)
+            finally:
+                elapsed = time.perf_counter() - start
+                EUTILS_REQUEST_SECONDS.observe(elapsed, endpoint=metric_endpoint)
+            if response.ok:
+                get_latency_window(metric_endpoint).add(elapsed)
             response.raise_for_status()
+            # 再試行・Retry-Afterの待機・レート制限・スケジューラの待ち時間を含まない、成功した送信のみの所要時間
+            response.send_seconds = elapsed
             return response
+
+        hedge_delay = None
+        if settings.hedge_efetch and metric_endpoint == "efetch":
+            hedge_delay = get_latency_window(metric_endpoint).quantile(settings.hedge_quantile, settings.hedge_min_samples)
+
+        try:
+            if hedge_delay is None:
+                response = send()
+            else:
+                response, winner = hedged(send, hedge_delay, before_hedge=self._wait_for_rate_limit)
+                if winner:
+                    EUTILS_HEDGED_REQUESTS.inc(endpoint=metric_endpoint, winner=winner)
         except requests.RequestException as e:
-            raise PubMedSearchError(f"API request failed: {str(e)}")
+            if is_retryable(e) and failure_reason(e) != "429":
+                if breaker.record_failure():
+                    EUTILS_CIRCUIT_OPENED.inc(endpoint=metric_endpoint)
+            else:
+                # 429・4xxは呼び出し先が応答しているため障害として数えない
+                breaker.record_success()
+            raise
+        breaker.record_success()
+        return response
+
+    def _mesh_query(self, term: str, include_subheadings: bool) -> str:
+        """
+        MeSH用語1件分のクエリ
+
+        include_subheadings（従来どおりの意味）がTrueの場合はその記述子のみ（[MeSH Terms:noexp]）、
+        Falseの場合はPubMedの既定と同じく下位記述子を含めて検索する。
+        ローカルのMeSHインデックスがあれば、エントリー用語・UIを記述子名に正規化し、下位記述子もローカルで展開して
+        列挙する（上限を超える場合はNCBI側の展開に任せる）。インデックスがない、または用語が見つからない場合は入力のまま使う。
+        """
+        index = get_mesh_index()
+        descriptor = index.lookup(term) if index is not None else None
+        name = index.name(descriptor) if descriptor is not None else term
+        if include_subheadings:
+            return f'"{name}"[MeSH Terms:noexp]'
+
+        if descriptor is not None:
+            subtree = index.subtree(descriptor)
+            if len(subtree) <= get_mesh_settings().max_expansion:
+                return " OR ".join(f'"{index.name(d)}"[MeSH Terms:noexp]' for d in subtree)
+        return f'"{name}"[MeSH Terms]'
 
     def _build_search_query(self, criteria: SearchCriteria) -> str:
         """検索クエリの構築"""
@@ -74,12 +299,7 @@ class PubMedAdvancedSearch:
         
         # MeSH用語
         if criteria.mesh_terms:
-            mesh_queries = []
-            for term in criteria.mesh_terms:
-                if criteria.include_mesh_subheadings:
-                    mesh_queries.append(f'"{term}"[MeSH Terms:noexp]')
-                else:
-                    mesh_queries.append(f'"{term}"[MeSH Terms]')
+            mesh_queries = [self._mesh_query(term, criteria.include_mesh_subheadings) for term in criteria.mesh_terms]
             query_parts.append(f"({' OR '.join(mesh_queries)})")
         
         # Publication type
@@ -128,7 +348,7 @@ class PubMedAdvancedSearch:
         self, 
         criteria: SearchCriteria,
         progress_callback: Callable[[int, int], None] | None = None
-    ) -> list[ArticleResponse]:
+    ) -> list[ArticleRecord]:
         """
         論文検索の実行
         
@@ -141,73 +361,273 @@ class PubMedAdvancedSearch:
             
         Returns:
         --------
-        list[ArticleResponse]
-            検索結果の論文リスト
+        list[ArticleRecord]
+            検索結果の論文リスト（APIで返す際に to_dict()/to_response() で変換する）
         """
-        search_query = self._build_search_query(criteria)
+        try:
+            pmids = self.search_pmids(criteria)
+            if not pmids:
+                return []
+
+            articles = self.fetch_articles(pmids, criteria.min_citations, progress_callback)
+            if criteria.sort_by == SortBy.MOST_CITED:
+                articles = self.rank_by_citations(articles)
+            return articles
+            
+        except ET.ParseError as e:
+            raise PubMedSearchError(f"Failed to parse XML response: {str(e)}")
+        except Exception as e:
+            raise PubMedSearchError(f"Search failed: {str(e)}")
+
+    def search_pmids(self, criteria: SearchCriteria, since: datetime | None = None) -> list[str]:
+        """
+        検索条件に一致するPMIDのみを取得（esearch）
         
-        # 検索実行（PMIDの取得）
+        Parameters:
+        -----------
+        criteria : SearchCriteria
+            検索条件
+        since : datetime | None
+            指定した場合、この日付（UTC）以降にPubMedへ登録された論文（Entrez Date）のみに限定
+            
+        Returns:
+        --------
+        list[str]
+            PMIDのリスト（最大 criteria.max_results 件）
+        """
+        extra_params = {}
+        if since is not None:
+            # since（保存済み検索の last_checked_at）はUTCで記録しているため、上限も同じくUTCの日付にする
+            extra_params = {
+                "datetype": "edat",
+                "mindate": since.strftime("%Y/%m/%d"),
+                "maxdate": datetime.utcnow().strftime("%Y/%m/%d")
+            }
+        
+        search_tree = self._esearch(criteria, criteria.max_results, extra_params)
+        
+        # 検索結果件数の確認
+        count_elem = search_tree.find(".//Count")
+        if count_elem is None or count_elem.text == "0":
+            return []
+            
+        return [id_elem.text for id_elem in search_tree.findall(".//Id")]
+
+    def search_history(self, criteria: SearchCriteria, retmax: int) -> SearchHistory:
+        """
+        検索結果をNCBI History Serverに保持し、その参照と先頭retmax件のPMIDを取得
+        
+        以降のページは fetch_page() で WebEnv/QueryKey を指定して取得する。
+        """
+        try:
+            search_tree = self._esearch(criteria, retmax, {})
+        except ET.ParseError as e:
+            raise PubMedSearchError(f"Failed to parse XML response: {str(e)}")
+        
+        count_elem = search_tree.find(".//Count")
+        webenv = search_tree.find(".//WebEnv")
+        query_key = search_tree.find(".//QueryKey")
+        count = int(count_elem.text) if count_elem is not None and count_elem.text else 0
+        if count and (webenv is None or query_key is None):
+            raise PubMedSearchError("esearch response did not include WebEnv/QueryKey")
+        
+        return SearchHistory(
+            count=count,
+            webenv=webenv.text if webenv is not None else "",
+            query_key=query_key.text if query_key is not None else "",
+            pmids=[id_elem.text for id_elem in search_tree.findall(".//Id")]
+        )
+
+    def _esearch(self, criteria: SearchCriteria, retmax: int, extra_params: dict) -> ET.Element:
+        """esearchの実行"""
         search_params = {
             "db": "pubmed",
-            "term": search_query,
-            "retmax": criteria.max_results,
+            "term": self._build_search_query(criteria),
+            "retmax": retmax,
             "retmode": "xml",
             "usehistory": "y",
-            "sort": criteria.sort_by
+            "sort": criteria.sort_by,
+            **extra_params
         }
         
-        try:
-            response = self._make_request("esearch.fcgi", search_params)
-            search_tree = ET.fromstring(response.content)
-            
-            # 検索結果件数の確認
-            count_elem = search_tree.find(".//Count")
-            if count_elem is None or count_elem.text == "0":
-                return []
+        response = self._make_request("esearch.fcgi", search_params)
+        return ET.fromstring(response.content)
+
+    def fetch_articles(
+        self,
+        pmids: list[str],
+        min_citations: int | None = None,
+        progress_callback: Callable[[int, int], None] | None = None
+    ) -> list[ArticleRecord]:
+        """
+        PMIDのリストから論文詳細を取得（efetch）
+        
+        Parameters:
+        -----------
+        pmids : list[str]
+            取得対象のPMID
+        min_citations : int | None
+            指定した場合、被引用数がこの値未満の論文を除外
+        progress_callback : Callable[[int, int], None] | None
+            進捗コールバック関数 (current, total) -> None
+        """
+        total_results = len(pmids)
+        batches: list[Future | list[ArticleRecord]] = []
+        sizer = get_efetch_batch_sizer()
+        post_min_ids = get_pubmed_settings().efetch_post_min_ids
+        
+        # バッチサイズは直前までの観測値から決める
+        # 大きなバッチのパースはプロセスプールで行い、その間に次のバッチを取得する
+        i = 0
+        while i < total_results:
+            if progress_callback:
+                progress_callback(i, total_results)
                 
-            total_results = min(int(count_elem.text), criteria.max_results)
+            batch_pmids = pmids[i:i + sizer.next_batch(total_results - i)]
+            fetch_params = {
+                "db": "pubmed",
+                "id": ",".join(batch_pmids),
+                "retmode": "xml"
+            }
+            method = "POST" if len(batch_pmids) >= post_min_ids else "GET"
             
-            pmids = [id_elem.text for id_elem in search_tree.findall(".//Id")]
-            if not pmids:
-                return []
-
-            # 論文詳細の取得
-            results: list[ArticleResponse] = []
-            batch_size = 100
+            response = self._make_request("efetch.fcgi", fetch_params, method)
+            # 待機時間を含めると429が続いた際にバッチが縮み、リクエスト数がかえって増えるため送信時間のみで推定
+            sizer.observe(len(batch_pmids), len(response.content), response.send_seconds)
+            EFETCH_BATCH_SIZE.observe(len(batch_pmids), method=method)
+            EFETCH_RESPONSE_BYTES.observe(len(response.content))
             
-            for i in range(0, len(pmids), batch_size):
-                if progress_callback:
-                    progress_callback(i, total_results)
-                    
-                batch_pmids = pmids[i:i + batch_size]
-                fetch_params = {
-                    "db": "pubmed",
-                    "id": ",".join(batch_pmids),
-                    "retmode": "xml"
-                }
-                
-                response = self._make_request("efetch.fcgi", fetch_params)
-                batch_results = self._parse_articles(response.content)
-                
-                # 被引用数の取得（もし必要な場合）
-                if criteria.min_citations is not None:
-                    for article in batch_results:
-                        article.citation_count = self._get_citation_count(article.pmid)
-                        if article.citation_count < criteria.min_citations:
-                            continue
-                        results.append(article)
-                else:
-                    results.extend(batch_results)
+            batches.append(self._parse_articles_async(response.content))
+            i += len(batch_pmids)
 
-            if progress_callback:
-                progress_callback(total_results, total_results)
+        results: list[ArticleRecord] = []
+        for batch in batches:
+            batch_results = self._collect_parsed(batch) if isinstance(batch, Future) else batch
+            results.extend(self._filter_by_citations(batch_results, min_citations))
 
-            return results
-            
+        if progress_callback:
+            progress_callback(total_results, total_results)
+
+        return results
+
+    def fetch_page(
+        self,
+        webenv: str,
+        query_key: str,
+        retstart: int,
+        retmax: int,
+        min_citations: int | None = None
+    ) -> list[ArticleRecord]:
+        """NCBI History Serverに保持された検索結果の1ページ分を取得（efetch）"""
+        fetch_params = {
+            "db": "pubmed",
+            "WebEnv": webenv,
+            "query_key": query_key,
+            "retstart": retstart,
+            "retmax": retmax,
+            "retmode": "xml"
+        }
+        
+        try:
+            response = self._make_request("efetch.fcgi", fetch_params)
+            return self._filter_by_citations(self._parse_articles(response.content), min_citations)
         except ET.ParseError as e:
             raise PubMedSearchError(f"Failed to parse XML response: {str(e)}")
-        except Exception as e:
-            raise PubMedSearchError(f"Search failed: {str(e)}")
+
+    def _filter_by_citations(self, articles: list[ArticleRecord], min_citations: int | None) -> list[ArticleRecord]:
+        """被引用数の取得と最小被引用数によるフィルタ（min_citations指定時のみ）"""
+        if min_citations is None:
+            return articles
+        self._set_citation_counts(articles)
+        return [article for article in articles if article.citation_count >= min_citations]
+
+    def _set_citation_counts(self, articles: list[ArticleRecord]) -> CitationGraph | None:
+        """
+        被引用数を設定
+
+        ローカルの引用グラフが有効な場合は、未取得の論文の引用関係をまとめて取得してグラフから数える。
+        無効な場合は論文ごとにelinkで取得する。
+        """
+        if not get_citation_settings().enabled:
+            for article in articles:
+                article.citation_count = self._get_citation_count(article.pmid)
+            return None
+
+        pmids = [article.pmid for article in articles]
+        try:
+            graph = self.update_citation_graph(pmids)
+        except (PubMedSearchError, ValueError) as e:
+            # 取得できなかった論文は被引用数0として扱う（論文ごとに取得していたときと同じ）
+            logger.warning("Failed to update citation graph: %s", e)
+            graph = get_citation_graph()
+        for article, count in zip(articles, graph.citation_counts(pmids)):
+            article.citation_count = count or 0
+        return graph
+
+    def rank_by_citations(self, articles: list[ArticleRecord]) -> list[ArticleRecord]:
+        """被引用数の多い順に並べ替え（同数の場合は引用グラフ上の計算済みのPageRank、さらに同じ場合は元の順）"""
+        graph = self._set_citation_counts(articles)
+        if graph is None:
+            return sorted(articles, key=lambda article: -article.citation_count)
+        counts = [article.citation_count for article in articles]
+        if len(set(counts)) == len(counts):
+            return sorted(articles, key=lambda article: -article.citation_count)
+        # 同順位の解消には計算済みのPageRankを使い、再計算（グラフ全体の反復）は検索を待たせずに行う
+        ranks = graph.pagerank_of([article.pmid for article in articles], wait=False)
+        order = sorted(range(len(articles)), key=lambda i: (-counts[i], -ranks[i]))
+        return [articles[i] for i in order]
+
+    def update_citation_graph(self, pmids: list[str]) -> CitationGraph:
+        """未取得（または取得から時間が経った）論文の引用関係をelinkで取得し、共有の引用グラフに追加"""
+        graph = get_citation_graph()
+        stale = graph.stale(pmids)
+        if stale:
+            references, cited_by = self.fetch_citation_links(stale)
+            graph.add_links(references, cited_by)
+            save_citation_graph()
+        return graph
+
+    def find_related_papers(self, pmid: str, limit: int = 10) -> list[RelatedPaper]:
+        """
+        共引用・書誌結合による関連論文
+
+        論文自身と、その引用先・引用元（最大 related_max_neighbors 件）の引用関係を取得してからローカルのグラフで計算する。
+        """
+        graph = self.update_citation_graph([pmid])
+        neighbors = list(dict.fromkeys(graph.cited_by(pmid) + graph.references(pmid)))
+        self.update_citation_graph(neighbors[:get_citation_settings().related_max_neighbors])
+        return graph.related(pmid, limit)
+
+    def fetch_citation_links(self, pmids: list[str]) -> tuple[dict[str, list[str]], dict[str, list[str]]]:
+        """
+        複数論文の引用先（references）と引用元（cited by）をelinkでまとめて取得
+
+        IDを個別のパラメータとして送ると論文ごとのリンクセットが返るため、バッチ単位のPOSTで論文ごとのリンクを得られる。
+
+        Returns:
+        --------
+        tuple[dict[str, list[str]], dict[str, list[str]]]
+            (PMID -> 引用先のPMID, PMID -> 引用元のPMID)。リンクのない論文は空リスト
+        """
+        batch_size = get_citation_settings().elink_batch_size
+        links: dict[str, dict[str, list[str]]] = {ELINK_REFERENCES: {}, ELINK_CITED_BY: {}}
+        for start in range(0, len(pmids), batch_size):
+            batch = pmids[start:start + batch_size]
+            for linkname, found in links.items():
+                params = {"dbfrom": "pubmed", "db": "pubmed", "id": batch, "linkname": linkname, "retmode": "json"}
+                response = self._make_request("elink.fcgi", params, "POST")
+                for linkset in response.json().get("linksets", []):
+                    ids = linkset.get("ids", [])
+                    if len(ids) != 1:
+                        continue
+                    found[str(ids[0])] = [
+                        str(link)
+                        for linkset_db in linkset.get("linksetdbs", []) if linkset_db.get("linkname") == linkname
+                        for link in linkset_db.get("links", [])
+                    ]
+                for pmid in batch:
+                    found.setdefault(pmid, [])
+        return links[ELINK_REFERENCES], links[ELINK_CITED_BY]
 
     def _get_citation_count(self, pmid: str) -> int:
         """PMIDに基づいて論文の被引用数を取得"""
@@ -224,31 +644,62 @@ class PubMedAdvancedSearch:
         except Exception:
             return 0
 
-    def _parse_articles(self, content: bytes) -> list[ArticleResponse]:
-        """XMLレスポンスからArticleResponseオブジェクトのリストを生成"""
+    def _parse_articles(self, content: bytes) -> list[ArticleRecord]:
+        """XMLレスポンスからArticleRecordのリストを生成"""
+        parsed = self._parse_articles_async(content)
+        return self._collect_parsed(parsed) if isinstance(parsed, Future) else parsed
+
+    def _parse_articles_async(self, content: bytes) -> Future | list[ArticleRecord]:
+        """
+        大きなレスポンスはプロセスプールでのパースを開始してFutureを返し、小さなものはその場でパースする
+
+        Futureの結果は _collect_parsed() で取得する。
+        """
+        if should_offload(len(content), get_worker_settings().parse_min_bytes):
+            return submit(_parse_efetch_xml, content)
+        return self._record_parsed(*_parse_efetch_xml(content))
+
+    def _collect_parsed(self, future: Future) -> list[ArticleRecord]:
+        return self._record_parsed(*future.result())
+
+    @staticmethod
+    def _record_parsed(
+        articles: list[ArticleRecord],
+        errors: list[tuple[str, str]],
+        seconds: float
+    ) -> list[ArticleRecord]:
+        PUBMED_PARSE_SECONDS.observe(seconds)
+        for pmid, error in errors:
+            PUBMED_PARSE_ERRORS.inc()
+            logger.warning("Error processing article %s: %s", pmid, error)
+        PUBMED_ARTICLES_PARSED.inc(len(articles))
+        return articles
+
+    def _extract_articles(self, content: bytes) -> tuple[list[ArticleRecord], list[tuple[str, str]]]:
+        """XMLをパースし、(論文のリスト, (PMID, エラー内容) のリスト) を返す"""
         tree = ET.fromstring(content)
-        articles: list[ArticleResponse] = []
+        articles: list[ArticleRecord] = []
+        errors: list[tuple[str, str]] = []
         
         for article_elem in tree.findall(".//PubmedArticle"):
             try:
-                article_data = self._extract_article_data(article_elem)
-                article = ArticleResponse(**article_data)
-                articles.append(article)
+                articles.append(self._extract_article_data(article_elem))
             except Exception as e:
                 pmid = article_elem.find(".//PMID")
-                pmid_text = pmid.text if pmid is not None else "unknown"
-                print(f"Error processing article {pmid_text}: {str(e)}")
-                
-        return articles
+                errors.append((pmid.text if pmid is not None else "unknown", str(e)))
+        
+        return articles, errors
 
-    def _extract_article_data(self, article: ET.Element) -> dict:
+    def _extract_article_data(self, article: ET.Element) -> ArticleRecord:
         """論文要素から詳細データを抽出"""
         # PMID
         pmid = article.find(".//PMID").text
+        if not pmid:
+            raise ValueError("PMID not available")
         
         # タイトル
         title_elem = article.find(".//ArticleTitle")
-        title = title_elem.text if title_elem is not None else "Title not available"
+        title = title_elem.text if title_elem is not None and title_elem.text else "Title not available"
         
         # アブストラクト
         abstract = self._extract_abstract(article)
@@ -260,7 +711,13 @@ class PubMedAdvancedSearch:
         mesh_terms = self._extract_mesh_terms(article)
         
         # キーワード
-        keywords = [keyword.text for keyword in article.findall(".//Keyword") if keyword.text]
+        keywords = tuple(keyword.text for keyword in article.findall(".//Keyword") if keyword.text)
+        
+        # 出版タイプ・言語
+        publication_types = tuple(
+            intern(pt.text) for pt in article.findall(".//PublicationTypeList/PublicationType") if pt.text
+        )
+        languages = tuple(intern(lang.text) for lang in article.findall(".//Article/Language") if lang.text)
         
         # DOI
         doi_elem = article.find(".//ArticleId[@IdType='doi']")
@@ -278,24 +735,23 @@ class PubMedAdvancedSearch:
             journal_abbrev_text = None
         
         # 出版日
-        publication_date = self._extract_publication_date(article)
-        
-        # PubMed URL
-        url = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" if pmid else None
-        
-        return {
-            "pmid": pmid,
-            "title": title,
-            "abstract": abstract,
-            "authors": authors,
-            "mesh_terms": mesh_terms,
-            "keywords": keywords,
-            "doi": doi,
-            "journal": journal,
-            "journal_abbrev": journal_abbrev_text,
-            "publication_date": publication_date,
-            "url": url
-        }
+        pub_date = self._extract_publication_date(article)
+        
+        # PubMed URLはPMIDから導出（ArticleRecord.url）
+        return ArticleRecord(
+            pmid=pmid,
+            title=title,
+            abstract=abstract,
+            authors=authors,
+            mesh_terms=mesh_terms,
+            keywords=keywords,
+            publication_types=publication_types,
+            languages=languages,
+            doi=doi,
+            journal=intern(journal),
+            journal_abbrev=intern(journal_abbrev_text),
+            publication_date=pub_date
+        )
 
     def _extract_abstract(self, article: ET.Element) -> str:
         """構造化アブストラクトを含むアブストラクトを抽出"""
@@ -315,7 +771,7 @@ class PubMedAdvancedSearch:
             
         return "\n".join(abstract_texts)
 
-    def _extract_authors(self, article: ET.Element) -> list[dict]:
+    def _extract_authors(self, article: ET.Element) -> tuple[AuthorRecord, ...]:
         """著者情報を抽出"""
         authors = []
         
@@ -325,16 +781,15 @@ class PubMedAdvancedSearch:
             affiliation = author_elem.find(".//Affiliation")
             
             if last_name is not None:
-                author_data = {
-                    "last_name": last_name.text,
-                    "fore_name": fore_name.text if fore_name is not None else None,
-                    "affiliation": affiliation.text if affiliation is not None else None
-                }
-                authors.append(author_data)
+                authors.append(AuthorRecord(
+                    last_name=last_name.text,
+                    fore_name=fore_name.text if fore_name is not None else None,
+                    affiliation=affiliation.text if affiliation is not None else None
+                ))
         
-        return authors
+        return tuple(authors)
 
-    def _extract_mesh_terms(self, article: ET.Element) -> list[dict]:
+    def _extract_mesh_terms(self, article: ET.Element) -> tuple[MeshTermRecord, ...]:
         """MeSH用語を抽出"""
         mesh_terms = []
         
@@ -343,18 +798,15 @@ class PubMedAdvancedSearch:
             qualifiers = [q.text for q in mesh_elem.findall("QualifierName")]
             
             if descriptor is not None:
-                mesh_terms.append({
-                    "descriptor": descriptor.text,
-                    "qualifiers": qualifiers
-                })
+                mesh_terms.append(mesh_term(descriptor.text, qualifiers, descriptor.get("UI")))
         
-        return mesh_terms
+        return tuple(mesh_terms)
 
-    def _extract_publication_date(self, article: ET.Element) -> dict:
+    def _extract_publication_date(self, article: ET.Element) -> DateRecord:
         """出版日情報を抽出"""
         pub_date = article.find(".//PubDate")
         if pub_date is None:
-            return {"year": None, "month": None, "day": None}
+            return EMPTY_DATE
         
         date_dict = {}
         
@@ -383,21 +835,34 @@ class PubMedAdvancedSearch:
         day = pub_date.find("Day")
         date_dict["day"] = int(day.text) if day is not None else None
         
-        return date_dict
+        return publication_date(date_dict["year"], date_dict["month"], date_dict["day"])
 
-    def save_results(self, results: list[ArticleResponse], file_path: str | Path):
-        """検索結果をJSONファイルとして保存"""
-        if not results:
-            return
-            
-        file_path = Path(file_path)
-        with file_path.open('w', encoding='utf-8') as f:
-            json.dump(
-                [article.dict() for article in results],
-                f,
-                ensure_ascii=False,
-                indent=2
-            )
+    def save_results(self, results: Iterable[ArticleLike], file_path: str | Path, format: str | None = None) -> int:
+        """
+        検索結果をファイルに保存し、保存件数を返す
+
+        形式は省略時はファイル名から判定する（.json / .jsonl / .ris / .csv、末尾に .gz でgzip圧縮）。
+        判定できない拡張子（.txt など）は従来どおりJSONで保存する。
+        1件ずつ書き出すため、ジェネレータを渡せば大量の結果も一定のメモリで保存できる。
+        """
+        if isinstance(results, list) and not results:
+            return 0
+        if format is None:
+            try:
+                detect_format(Path(file_path))
+            except ExportError:
+                format = "json"
+        return export_articles(results, file_path, format)
+
+def _parse_efetch_xml(content: bytes) -> tuple[list[ArticleRecord], list[tuple[str, str]], float]:
+    """
+    efetchのXMLをパースし、(論文のリスト, パースエラー, 所要秒数) を返す
+
+    プロセスプールのワーカーでも実行されるため、メトリクス・ログは呼び出し元のプロセスで記録する。
+    """
+    start = time.perf_counter()
+    articles, errors = PubMedAdvancedSearch(base_url="")._extract_articles(content)
+    return articles, errors, time.perf_counter() - start
 
 def example_usage():
     """使用例"""
@@ -0,0 +1,210 @@
+# project/records.py
+
+import sys
+from functools import lru_cache
+from typing import Any, NamedTuple, Union
+from .schemas import ArticleResponse, ArticleAuthor, ArticleMeshTerm, PublicationDate
+
+class AuthorRecord(NamedTuple):
+    last_name: str | None
+    fore_name: str | None = None
+    affiliation: str | None = None
+
+class MeshTermRecord(NamedTuple):
+    descriptor: str | None
+    qualifiers: tuple[str, ...] = ()
+    ui: str | None = None
+
+class DateRecord(NamedTuple):
+    year: int | None = None
+    month: int | None = None
+    day: int | None = None
+
+EMPTY_DATE = DateRecord()
+
+@lru_cache(maxsize=65536)
+def publication_date(year: int | None, month: int | None, day: int | None) -> DateRecord:
+    """出版日（同じ日付の論文は同じインスタンスを共有）"""
+    return DateRecord(year, month, day)
+
+def intern(value: str | None) -> str | None:
+    """ジャーナル名・MeSH用語など繰り返し現れる文字列を共有"""
+    return sys.intern(value) if value else value
+
+def mesh_term(descriptor: str | None, qualifiers: list[str], ui: str | None) -> MeshTermRecord:
+    return MeshTermRecord(intern(descriptor), tuple(intern(q) for q in qualifiers if q), intern(ui))
+
+class ArticleRecord:
+    """
+    パース済み論文の内部表現
+
+    ArticleResponse と同じ属性名で読み取れるが、__slots__ とタプルのみで構成し、
+    ジャーナル名・MeSH用語・出版タイプ・言語は intern した文字列を共有する。
+    検索・キャッシュ・記事生成の内部ではこのまま扱い、APIの境界でのみ to_dict()/to_response() で変換する。
+    """
+    __slots__ = (
+        "pmid", "title", "abstract", "authors", "mesh_terms", "keywords",
+        "publication_types", "languages", "doi", "journal", "journal_abbrev",
+        "publication_date", "citation_count", "summary", "analysis", "duplicate_group",
+    )
+
+    def __init__(
+        self,
+        pmid: str,
+        title: str,
+        abstract: str,
+        authors: tuple[AuthorRecord, ...] = (),
+        mesh_terms: tuple[MeshTermRecord, ...] = (),
+        keywords: tuple[str, ...] = (),
+        publication_types: tuple[str, ...] = (),
+        languages: tuple[str, ...] = (),
+        doi: str | None = None,
+        journal: str | None = None,
+        journal_abbrev: str | None = None,
+        publication_date: DateRecord = EMPTY_DATE,
+        citation_count: int = 0,
+        summary: str | None = None,
+        analysis: str | None = None,
+        duplicate_group: str | None = None
+    ):
+        self.pmid = pmid
+        self.title = title
+        self.abstract = abstract
+        self.authors = authors
+        self.mesh_terms = mesh_terms
+        self.keywords = keywords
+        self.publication_types = publication_types
+        self.languages = languages
+        self.doi = doi
+        self.journal = journal
+        self.journal_abbrev = journal_abbrev
+        self.publication_date = publication_date
+        self.citation_count = citation_count
+        self.summary = summary
+        self.analysis = analysis
+        self.duplicate_group = duplicate_group
+
+    @property
+    def url(self) -> str | None:
+        return f"https://pubmed.ncbi.nlm.nih.gov/{self.pmid}/" if self.pmid else None
+
+    def to_dict(self) -> dict[str, Any]:
+        """ArticleResponse.model_dump() と同じ形式のdict"""
+        date = self.publication_date
+        return {
+            "pmid": self.pmid,
+            "title": self.title,
+            "abstract": self.abstract,
+            "authors": [
+                {"last_name": a.last_name, "fore_name": a.fore_name, "affiliation": a.affiliation}
+                for a in self.authors
+            ],
+            "mesh_terms": [
+                {"descriptor": m.descriptor, "qualifiers": list(m.qualifiers), "ui": m.ui}
+                for m in self.mesh_terms
+            ],
+            "keywords": list(self.keywords),
+            "publication_types": list(self.publication_types),
+            "languages": list(self.languages),
+            "doi": self.doi,
+            "journal": self.journal,
+            "journal_abbrev": self.journal_abbrev,
+            "publication_date": {"year": date.year, "month": date.month, "day": date.day},
+            "url": self.url,
+            "citation_count": self.citation_count,
+            "summary": self.summary,
+            "analysis": self.analysis,
+            "duplicate_group": self.duplicate_group,
+        }
+
+    def to_response(self) -> ArticleResponse:
+        """APIモデルに変換（値は検証済みのため再検証しない）"""
+        date = self.publication_date
+        return ArticleResponse.model_construct(
+            pmid=self.pmid,
+            title=self.title,
+            abstract=self.abstract,
+            authors=[ArticleAuthor.model_construct(**a._asdict()) for a in self.authors],
+            mesh_terms=[
+                ArticleMeshTerm.model_construct(descriptor=m.descriptor, qualifiers=list(m.qualifiers), ui=m.ui)
+                for m in self.mesh_terms
+            ],
+            keywords=list(self.keywords),
+            publication_types=list(self.publication_types),
+            languages=list(self.languages),
+            doi=self.doi,
+            journal=self.journal,
+            journal_abbrev=self.journal_abbrev,
+            publication_date=PublicationDate.model_construct(year=date.year, month=date.month, day=date.day),
+            url=self.url,
+            citation_count=self.citation_count,
+            summary=self.summary,
+            analysis=self.analysis,
+            duplicate_group=self.duplicate_group,
+        )
+
+    @classmethod
+    def from_response(cls, article: ArticleResponse) -> "ArticleRecord":
+        date = article.publication_date
+        return cls(
+            pmid=article.pmid,
+            title=article.title,
+            abstract=article.abstract,
+            authors=tuple(AuthorRecord(a.last_name, a.fore_name, a.affiliation) for a in article.authors),
+            mesh_terms=tuple(mesh_term(m.descriptor, m.qualifiers or [], m.ui) for m in article.mesh_terms),
+            keywords=tuple(article.keywords),
+            publication_types=tuple(intern(t) for t in article.publication_types),
+            languages=tuple(intern(lang) for lang in article.languages),
+            doi=article.doi,
+            journal=intern(article.journal),
+            journal_abbrev=intern(article.journal_abbrev),
+            publication_date=publication_date(date.year, date.month, date.day),
+            citation_count=article.citation_count,
+            summary=article.summary,
+            analysis=article.analysis,
+            duplicate_group=article.duplicate_group,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ArticleRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # プロセス間ではスロットの値のタプルとして受け渡し、受け取り側で文字列を intern し直す
+        return _restore_record, tuple(getattr(self, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"ArticleRecord(pmid={self.pmid!r}, title={self.title!r})"
+
+def _restore_record(
+    pmid, title, abstract, authors, mesh_terms, keywords, publication_types, languages,
+    doi, journal, journal_abbrev, date, citation_count, summary, analysis, duplicate_group
+) -> ArticleRecord:
+    return ArticleRecord(
+        pmid, title, abstract,
+        authors=authors,
+        mesh_terms=tuple(mesh_term(m.descriptor, m.qualifiers, m.ui) for m in mesh_terms),
+        keywords=keywords,
+        publication_types=tuple(intern(t) for t in publication_types),
+        languages=tuple(intern(lang) for lang in languages),
+        doi=doi,
+        journal=intern(journal),
+        journal_abbrev=intern(journal_abbrev),
+        publication_date=publication_date(*date),
+        citation_count=citation_count,
+        summary=summary,
+        analysis=analysis,
+        duplicate_group=duplicate_group,
+    )
+
+# 内部処理（記事生成・エクスポート等）はどちらも属性名で扱う
+ArticleLike = Union[ArticleRecord, ArticleResponse]
+
+def json_fallback(value: Any) -> Any:
+    """pydantic_core.to_json で ArticleRecord をエンコードするためのフォールバック"""
+    if isinstance(value, ArticleRecord):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,189 @@
+# project/resilience.py
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, TypeVar
+import requests
+from tenacity import RetryCallState, wait_random_exponential
+
+T = TypeVar("T")
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+class CircuitOpenError(Exception):
+    """サーキットブレーカーが開いているため呼び出しを行わなかった"""
+    pass
+
+def is_retryable(error: BaseException) -> bool:
+    """再試行で回復する可能性のあるエラー（接続エラー・タイムアウト・429・5xx）"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in RETRY_STATUSES
+    return False
+
+def failure_reason(error: BaseException) -> str:
+    """メトリクスのラベル用のエラー種別"""
+    if isinstance(error, requests.Timeout):
+        return "timeout"
+    if isinstance(error, requests.ConnectionError):
+        return "connection"
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return str(error.response.status_code)
+    return type(error).__name__
+
+def retry_after_seconds(response: requests.Response | None) -> float | None:
+    """Retry-Afterヘッダー（秒数またはHTTP日付）が示す待機秒数"""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+class wait_retry_after:
+    """
+    tenacityの待機戦略: Retry-Afterがあればそれに従い、なければジッター付き指数バックオフ
+
+    いずれの場合も max_seconds を上限とする。
+    """
+    def __init__(self, initial_seconds: float, max_seconds: float):
+        self.max_seconds = max_seconds
+        self._backoff = wait_random_exponential(multiplier=initial_seconds, max=max_seconds)
+
+    def __call__(self, retry_state: RetryCallState) -> float:
+        error = retry_state.outcome.exception() if retry_state.outcome else None
+        retry_after = retry_after_seconds(getattr(error, "response", None))
+        if retry_after is not None:
+            return min(retry_after, self.max_seconds)
+        return self._backoff(retry_state)
+
+class CircuitBreaker:
+    """
+    連続して失敗した呼び出し先への呼び出しを一定時間止めるサーキットブレーカー
+
+    failure_threshold 回連続で失敗すると開き、reset_seconds 経過後に1件だけ試行を許可する（半開）。
+    試行が成功すれば閉じ、失敗すれば再び開く。
+    """
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """呼び出しの可否を判定（開いている場合は CircuitOpenError）"""
+        with self._lock:
+            if self.state == "open":
+                if self.clock() - self._opened_at < self.reset_seconds:
+                    raise CircuitOpenError(f"Circuit for {self.name} is open")
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "half_open":
+                if self._trial_in_flight:
+                    raise CircuitOpenError(f"Circuit for {self.name} is half-open and a trial call is in flight")
+                self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """失敗を記録し、これによりブレーカーが開いた場合はTrueを返す"""
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state = "open"
+                self._opened_at = self.clock()
+                return True
+            return False
+
+class LatencyWindow:
+    """直近の所要時間からパーセンタイルを求める（ヘッジの待機時間の決定用）"""
+    def __init__(self, size: int = 200):
+        self._samples: deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int = 1) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < max(min_samples, 1):
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+_hedge_executor: ThreadPoolExecutor | None = None
+_hedge_lock = threading.Lock()
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(thread_name_prefix="hedged-request")
+    return _hedge_executor
+
+def hedged(
+    func: Callable[[], T],
+    delay: float,
+    before_hedge: Callable[[], None] | None = None
+) -> tuple[T, str | None]:
+    """
+    べき等な呼び出しを実行し、delay秒以内に終わらなければ同じ呼び出しをもう1件送り、先に成功した方を返す
+
+    Returns:
+    --------
+    tuple[T, str | None]
+        (結果, 勝った側 "primary"/"hedge"。ヘッジを送らなかった場合はNone)
+
+    両方失敗した場合は最後の例外を送出する。負けた側の呼び出しは中断できないため、バックグラウンドで完了まで実行される。
+    """
+    executor = _get_hedge_executor()
+    primary = executor.submit(func)
+    try:
+        return primary.result(timeout=delay), None
+    except FutureTimeoutError:
+        pass
+
+    if before_hedge:
+        before_hedge()
+    backup = executor.submit(func)
+    names: dict[Future, str] = {primary: "primary", backup: "hedge"}
+    pending = set(names)
+    error: BaseException | None = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result(), names[future]
+            error = future.exception()
+    raise error
@@ -0,0 +1,96 @@
+# project/result_sets.py
+
+import secrets
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pydantic_settings import BaseSettings
+from .cache import TTLCache
+from .metrics import REGISTRY
+from .records import ArticleLike
+
+class ResultSetError(Exception):
+    """検索結果セットに関連するエラー"""
+    pass
+
+class ResultSetSettings(BaseSettings):
+    ttl_seconds: int = 3600
+    max_entries: int = 256
+    max_articles: int = 20000          # 全結果セットで保持する論文数の上限（超えた場合は古い結果セットから破棄）
+    max_set_articles: int = 1000       # これを超える件数の検索結果は保持しない（ハンドルを発行しない）
+
+    class Config:
+        env_prefix = "RESULT_SET_"
+
+@lru_cache()
+def get_result_set_settings() -> ResultSetSettings:
+    return ResultSetSettings()
+
+@dataclass(frozen=True)
+class ResultSet:
+    handle: str
+    articles: list[ArticleLike]
+    expires_at: datetime
+
+class ResultSetStore:
+    """
+    検索結果をサーバー側に保持し、推測困難なハンドルで参照できるようにするストア
+
+    記事生成時に検索結果全体をクライアントから再送・再検証する代わりに、
+    ハンドル（と必要ならPMIDの部分集合）だけを受け取る。
+    保持する論文数の合計にも上限を設け、大きな検索結果が少数あるだけでメモリを占有しないようにする。
+    """
+    def __init__(self, ttl_seconds: int, max_entries: int, max_articles: int | None = None, max_set_articles: int | None = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_set_articles = max_set_articles
+        self._cache: TTLCache[str, ResultSet] = TTLCache(
+            maxsize=max_entries,
+            ttl=ttl_seconds,
+            weigher=lambda result_set: len(result_set.articles),
+            max_weight=max_articles
+        )
+
+    @property
+    def cache(self) -> TTLCache[str, ResultSet]:
+        return self._cache
+
+    def put(self, articles: list[ArticleLike]) -> ResultSet | None:
+        """検索結果を保存し、ハンドルを発行（件数が上限を超える場合は保存せずNone）"""
+        if self.max_set_articles is not None and len(articles) > self.max_set_articles:
+            return None
+        result_set = ResultSet(
+            handle=secrets.token_urlsafe(24),
+            articles=list(articles),
+            expires_at=datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+        )
+        self._cache.set(result_set.handle, result_set)
+        return result_set
+
+    def get(self, handle: str, pmids: list[str] | None = None) -> list[ArticleLike]:
+        """
+        ハンドルから検索結果を取得
+
+        pmidsを指定した場合はその順序で部分集合を返す。
+
+        Raises:
+            ResultSetError: ハンドルが存在しないか期限切れ、またはPMIDが結果セットに含まれない場合
+        """
+        result_set = self._cache.get(handle)
+        if result_set is None:
+            raise ResultSetError("Result set not found or expired")
+
+        if pmids is None:
+            return result_set.articles
+
+        by_pmid = {article.pmid: article for article in result_set.articles}
+        missing = [pmid for pmid in pmids if pmid not in by_pmid]
+        if missing:
+            raise ResultSetError(f"PMIDs not in result set: {', '.join(missing)}")
+        return [by_pmid[pmid] for pmid in pmids]
+
+@lru_cache()
+def get_result_set_store() -> ResultSetStore:
+    settings = get_result_set_settings()
+    store = ResultSetStore(settings.ttl_seconds, settings.max_entries, settings.max_articles, settings.max_set_articles)
+    REGISTRY.register_cache("result_sets", store.cache)
+    return store
@@ -1,36 +1,143 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlmodel import Session
-from ..schemas import ArticleResponse, ArticleCreateResponse
-from ..database import get_db
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query
+from starlette.concurrency import run_in_threadpool
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..records import ArticleLike
+from ..schemas import ArticleResponse, ArticleCreateResponse, ArticlePage, ResultSetReference
+from ..database import get_async_db
 from ..auth import get_current_user
-from ..models import User
+from ..models import Article
+from ..article_search import search_articles
+from ..pagination import encode_cursor, decode_cursor, InvalidCursorError
+from ..papers import save_article_papers, load_papers, find_citing_articles
+from ..users import get_user_id
 from ..services import ArticleGenerator
+from ..result_sets import get_result_set_store, ResultSetError
+from ..scheduler import tenant_scope
 
 router = APIRouter()
 
+async def _resolve_search_results(
+    db: AsyncSession,
+    search_results: list[ArticleResponse] | ResultSetReference
+) -> list[ArticleLike]:
+    """
+    検索結果（またはサーバー側の結果セットの参照）を論文リストに解決
+
+    結果セットが期限切れでもPMIDが指定されていれば、保存済みの論文から再構成する。
+    """
+    if isinstance(search_results, ResultSetReference):
+        try:
+            return get_result_set_store().get(search_results.handle, search_results.pmids)
+        except ResultSetError as e:
+            if search_results.pmids:
+                papers = await db.run_sync(load_papers, search_results.pmids)
+                if len(papers) == len(set(search_results.pmids)):
+                    return papers
+            raise HTTPException(status_code=404, detail=str(e))
+    return search_results
+
 @router.post("/generate-article", response_model=ArticleCreateResponse)
 async def generate_article(
-    search_results: list[ArticleResponse],
-    db: Session = Depends(get_db),
+    search_results: list[ArticleResponse] | ResultSetReference,
+    db: AsyncSession = Depends(get_async_db),
     current_user: str = Depends(get_current_user)
 ):
-    """検索結果から記事を生成"""
+    """検索結果（または /pubmed-search が返した結果セットのハンドル）から記事を生成"""
+    search_results = await _resolve_search_results(db, search_results)
     try:
         generator = ArticleGenerator()
-        article = generator.generate_article(search_results)
+        with tenant_scope(current_user):
+            article = await run_in_threadpool(generator.generate_article, search_results)
         
         # Firebase UIDをDBのuser_idに変換
-        user = db.exec(db.select(User).where(User.firebase_uid == current_user)).first()
-        if not user:
+        user_id = await get_user_id(db, current_user)
+        if user_id is None:
             raise HTTPException(status_code=404, detail="User not found")
             
-        article.user_id = user.id
+        article.user_id = user_id
         
-        # DBに保存
+        # DBに保存（記事・引用元論文・対応を1トランザクションで）
         db.add(article)
-        db.commit()
-        db.refresh(article)
+        await db.flush()
+        await db.run_sync(save_article_papers, article, search_results)
+        await db.commit()
+        await db.refresh(article)
         
         return article
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/articles", response_model=ArticlePage)
+async def list_articles(
+    q: str | None = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    自分の記事を新しい順に一覧（qを指定した場合はタイトル・要約・本文を全文検索）
+
+    次ページは next_cursor を cursor に指定して取得する。
+    """
+    after = None
+    if cursor:
+        try:
+            state = decode_cursor(cursor, required=("created_at", "id"))
+            after = (datetime.fromisoformat(state["created_at"]), int(state["id"]))
+        except (InvalidCursorError, TypeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    user_id = await get_user_id(db, current_user)
+    if user_id is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    articles, has_more = await db.run_sync(search_articles, user_id, q, limit, after)
+    next_cursor = None
+    if has_more:
+        last = articles[-1]
+        next_cursor = encode_cursor({"created_at": last.created_at.isoformat(), "id": last.id})
+    return ArticlePage(
+        articles=[ArticleCreateResponse.model_validate(article, from_attributes=True) for article in articles],
+        next_cursor=next_cursor
+    )
+
+@router.post("/articles/{article_id}/regenerate", response_model=ArticleCreateResponse)
+async def regenerate_article(
+    article_id: int,
+    search_results: list[ArticleResponse] | ResultSetReference,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: str = Depends(get_current_user)
+):
+    """新しい検索結果で既存の記事を再生成（追加された論文のみLLMで処理）"""
+    search_results = await _resolve_search_results(db, search_results)
+    user_id = await get_user_id(db, current_user)
+    article = await db.get(Article, article_id)
+    if user_id is None or not article or article.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Article not found")
+
+    try:
+        with tenant_scope(current_user):
+            article = await run_in_threadpool(ArticleGenerator().regenerate_article, article, search_results)
+
+        db.add(article)
+        await db.run_sync(save_article_papers, article, search_results)
+        await db.commit()
+        await db.refresh(article)
+
+        return article
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/papers/{pmid}/articles", response_model=list[ArticleCreateResponse])
+async def list_citing_articles(
+    pmid: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: str = Depends(get_current_user)
+):
+    """指定したPMIDを引用元に含む自分の記事の一覧"""
+    user_id = await get_user_id(db, current_user)
+    if user_id is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return await db.run_sync(find_citing_articles, pmid, user_id)
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from starlette.concurrency import run_in_threadpool
+from ..schemas import RelatedPaperResponse
+from ..pubmed import PubMedAdvancedSearch, PubMedSearchError
+from ..citations import get_citation_settings
+from ..scheduler import tenant_scope
+from .pubmed_search import get_tenant_id
+
+router = APIRouter()
+
+@router.get("/papers/{pmid}/related", response_model=list[RelatedPaperResponse])
+async def related_papers(
+    pmid: str = Path(..., pattern=r"^\d+$"),
+    limit: int = Query(10, ge=1, le=100),
+    tenant_id: str = Depends(get_tenant_id)
+):
+    """
+    関連論文（共引用・書誌結合）
+
+    ローカルの引用グラフにない引用関係のみelinkでまとめて取得し、スコアはグラフ上で計算する。
+    """
+    if not get_citation_settings().enabled:
+        raise HTTPException(status_code=503, detail="Citation graph is disabled")
+    try:
+        with tenant_scope(tenant_id):
+            related = await run_in_threadpool(PubMedAdvancedSearch().find_related_papers, pmid, limit)
+    except PubMedSearchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return [
+        RelatedPaperResponse(
+            pmid=paper.pmid,
+            score=paper.score,
+            co_citations=paper.co_citations,
+            shared_references=paper.shared_references,
+        )
+        for paper in related
+    ]
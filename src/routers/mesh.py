@@ -0,0 +1,28 @@
+from fastapi import APIRouter, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from ..schemas import MeshSuggestion
+from ..mesh import get_mesh_index, get_mesh_settings
+
+router = APIRouter()
+
+@router.get("/mesh/autocomplete", response_model=list[MeshSuggestion])
+async def mesh_autocomplete(q: str = Query(..., min_length=1), limit: int | None = Query(None, ge=1, le=100)):
+    """
+    MeSH記述子のオートコンプリート
+
+    記述子名・エントリー用語・UIの前方一致で候補を返す（NCBIへの問い合わせは行わない）。
+    初回のみインデックスの読み込み（または構築）を行うため、スレッドプールで取得する。
+    """
+    index = await run_in_threadpool(get_mesh_index)
+    if index is None:
+        raise HTTPException(status_code=503, detail="MeSH index is not configured")
+    matches = index.autocomplete(q, limit or get_mesh_settings().autocomplete_limit)
+    return [
+        MeshSuggestion(
+            ui=match.descriptor.ui,
+            name=match.descriptor.name,
+            term=match.term,
+            tree_numbers=list(match.descriptor.tree_numbers),
+        )
+        for match in matches
+    ]
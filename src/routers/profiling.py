@@ -0,0 +1,13 @@
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import PlainTextResponse
+from ..profiling import get_profile_store, is_authorized
+
+router = APIRouter()
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse, include_in_schema=False)
+async def get_profile(profile_id: str, x_profile_token: str | None = Header(default=None)):
+    """採取したプロファイルをcollapsed stack形式で取得（flamegraph.pl / speedscope で可視化可能）"""
+    profile = get_profile_store().get(profile_id) if is_authorized(x_profile_token) else None
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(profile)
@@ -1,27 +1,153 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from starlette.concurrency import run_in_threadpool
 from sqlmodel import Session
-from ..schemas import SearchCriteria, ArticleResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..database import get_async_db
+from ..schemas import SearchCriteria, ArticleResponse, SearchPageRequest, SearchPage, MAX_PAGE_SIZE
 from ..pubmed import PubMedAdvancedSearch, PubMedSearchError
-from ..llm import summarize_abstract, analyze_abstract
+from ..pagination import encode_cursor, decode_cursor, InvalidCursorError
+from ..services import enrich_articles
+from ..papers import store_search_results
+from ..result_sets import get_result_set_store
+from ..responses import FastJSONResponse
+from ..records import ArticleRecord
+from ..auth import get_optional_user
+from ..scheduler import tenant_scope, request_tenant_id, search_priority
+from ..prefetch import canonical_query, get_prefetch_settings, get_query_log, get_search_cache, is_cacheable
 
 router = APIRouter()
 
+async def get_tenant_id(request: Request, current_user: str | None = Depends(get_optional_user)) -> str:
+    """公平スケジューラでの利用者ID（Bearerトークンがなければクライアントの IP で区別）"""
+    return request_tenant_id(current_user, request.client.host if request.client else None)
+
 @router.post("/pubmed-search", response_model=list[ArticleResponse])
 async def pubmed_search(
     criteria: SearchCriteria,
+    tenant_id: str = Depends(get_tenant_id),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """PubMed検索エンドポイント"""
+    """
+    PubMed検索エンドポイント
+
+    検索結果は検証済みのモデルのため、レスポンスモデルでの再検証を省いて直接JSONにエンコードする。
+    NCBIへのリクエスト・LLM呼び出しはブロッキングのため、イベントループを止めないようスレッドプールで実行する。
+    事前取得（PREFETCH_ENABLED）が有効な場合は、同じ条件の検索結果をキャッシュから返す。
+    NCBIから取得した論文はDBに保存する（結果セットの期限切れ後の記事生成・入力補完で再利用）。
+    """
+    try:
+        # よく使われる検索は正規化した条件で記録し、オフピークに事前取得した結果を返す
+        cache_key = None
+        if get_prefetch_settings().enabled and is_cacheable(criteria):
+            # MeSHインデックスの初回読み込みを含むためスレッドプールで実行
+            cache_key, canonical = await run_in_threadpool(canonical_query, criteria)
+            get_query_log().record(cache_key, canonical)
+        results = get_search_cache().get(cache_key) if cache_key else None
+
+        if results is None:
+            with tenant_scope(tenant_id, search_priority(criteria.max_results)):
+                searcher = PubMedAdvancedSearch()
+                results = await run_in_threadpool(searcher.search_papers, criteria)
+
+                # 必要に応じて各論文の要約と分析を追加
+                await run_in_threadpool(enrich_articles, results)
+            await db.run_sync(store_search_results, results)
+            if cache_key:
+                # 新しい論文を反映するよう、その場で検索した結果は事前取得した結果より短い期間だけ保持する
+                get_search_cache().put(cache_key, results, ttl=get_prefetch_settings().live_cache_ttl_seconds)
+
+        # 記事生成で再利用できるよう検索結果をサーバー側に保持（件数が多すぎる場合はハンドルを返さない）
+        result_set = get_result_set_store().put(results)
+        if result_set is None:
+            return FastJSONResponse(results)
+        return FastJSONResponse(results, headers={
+            "X-Result-Set-Handle": result_set.handle,
+            "X-Result-Set-Expires": result_set.expires_at.isoformat() + "Z",
+        })
+    except PubMedSearchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+
+def _page_response(articles: list[ArticleRecord], total: int, next_cursor: str | None) -> FastJSONResponse:
+    """SearchPage 形式のレスポンス（ArticleRecordを直接エンコード）"""
+    return FastJSONResponse({"articles": articles, "total": total, "next_cursor": next_cursor})
+
+def _next_cursor(state: dict, offset: int) -> str | None:
+    if offset >= state["total"]:
+        return None
+    return encode_cursor({**state, "offset": offset})
+
+@router.post("/pubmed-search/pages", response_model=SearchPage)
+async def pubmed_search_first_page(request: SearchPageRequest, tenant_id: str = Depends(get_tenant_id)):
+    """
+    ページ単位の検索（先頭ページ）
+
+    検索結果はNCBI History Serverに保持され、以降のページは next_cursor で取得する。
+    各ページでは、そのページの論文のみを取得・要約する。
+    """
+    criteria = request.criteria
     try:
-        searcher = PubMedAdvancedSearch()
-        results = searcher.search_papers(criteria)
+        page_size = min(request.page_size, criteria.max_results)
+        with tenant_scope(tenant_id, search_priority(page_size)):
+            searcher = PubMedAdvancedSearch()
+            history = await run_in_threadpool(searcher.search_history, criteria, page_size)
+            
+            total = min(history.count, criteria.max_results)
+            articles = await run_in_threadpool(
+                searcher.fetch_articles, history.pmids[:page_size], criteria.min_citations
+            ) if total else []
+            await run_in_threadpool(enrich_articles, articles)
         
-        # 必要に応じて各論文の要約と分析を追加
-        for article in results:
-            if article.abstract:
-                article.summary = summarize_abstract(article.abstract)
-                article.analysis = analyze_abstract(article.abstract)
+        state = {
+            "webenv": history.webenv,
+            "query_key": history.query_key,
+            "page_size": request.page_size,
+            "total": total,
+            "min_citations": criteria.min_citations
+        }
+        return _page_response(articles, total, _next_cursor(state, page_size))
+    except PubMedSearchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+def _is_count(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+def _page_state(cursor: str) -> dict:
+    """カーソルのページング状態（署名と各値の型を検証）"""
+    state = decode_cursor(cursor, required=("webenv", "query_key", "page_size", "total", "offset"))
+    if not (
+        isinstance(state["webenv"], str) and isinstance(state["query_key"], str)
+        and all(_is_count(state[key]) for key in ("page_size", "total", "offset"))
+        and (state.get("min_citations") is None or _is_count(state["min_citations"]))
+    ):
+        raise InvalidCursorError("Invalid cursor")
+    return state
+
+@router.get("/pubmed-search/pages", response_model=SearchPage)
+async def pubmed_search_next_page(cursor: str, tenant_id: str = Depends(get_tenant_id)):
+    """ページ単位の検索（カーソルで指定した次ページ）"""
+    try:
+        state = _page_state(cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        offset = state["offset"]
+        retmax = min(state["page_size"], MAX_PAGE_SIZE, state["total"] - offset)
+        if retmax <= 0:
+            return _page_response([], state["total"], None)
+        with tenant_scope(tenant_id, search_priority(retmax)):
+            articles = await run_in_threadpool(
+                PubMedAdvancedSearch().fetch_page,
+                state["webenv"], state["query_key"], offset, retmax, state.get("min_citations")
+            )
+            await run_in_threadpool(enrich_articles, articles)
         
-        return results
+        return _page_response(articles, state["total"], _next_cursor(state, offset + retmax))
     except PubMedSearchError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
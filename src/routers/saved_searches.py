@@ -0,0 +1,99 @@
+from fastapi import APIRouter, HTTPException, Depends
+from starlette.concurrency import run_in_threadpool
+from sqlmodel import Session, select
+from ..schemas import SavedSearchCreate, SavedSearchResponse, SearchCriteria, ArticleResponse
+from ..database import get_db
+from ..auth import get_current_user
+from ..models import User, SavedSearch, SavedSearchPmid
+from ..pubmed import PubMedSearchError
+from ..watches import SavedSearchWatcher
+from ..responses import FastJSONResponse
+from ..scheduler import tenant_scope
+
+router = APIRouter()
+
+def _get_user(db: Session, firebase_uid: str) -> User:
+    user = db.exec(select(User).where(User.firebase_uid == firebase_uid)).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+def _get_saved_search(db: Session, saved_search_id: int, user: User) -> SavedSearch:
+    saved_search = db.get(SavedSearch, saved_search_id)
+    if not saved_search or saved_search.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Saved search not found")
+    return saved_search
+
+def _to_response(saved_search: SavedSearch) -> SavedSearchResponse:
+    return SavedSearchResponse(
+        id=saved_search.id,
+        name=saved_search.name,
+        criteria=SearchCriteria.model_validate_json(saved_search.criteria),
+        last_checked_at=saved_search.last_checked_at,
+        created_at=saved_search.created_at
+    )
+
+@router.post("/saved-searches", response_model=SavedSearchResponse)
+async def create_saved_search(
+    request: SavedSearchCreate,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user)
+):
+    """検索条件を保存（以降は新着論文のみを定期取得）"""
+    user = _get_user(db, current_user)
+    saved_search = SavedSearch(
+        name=request.name,
+        criteria=request.criteria.model_dump_json(),
+        user_id=user.id
+    )
+    db.add(saved_search)
+    db.commit()
+    db.refresh(saved_search)
+    return _to_response(saved_search)
+
+@router.get("/saved-searches", response_model=list[SavedSearchResponse])
+async def list_saved_searches(
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user)
+):
+    """保存済み検索の一覧"""
+    user = _get_user(db, current_user)
+    saved_searches = db.exec(select(SavedSearch).where(SavedSearch.user_id == user.id)).all()
+    return [_to_response(saved_search) for saved_search in saved_searches]
+
+@router.post("/saved-searches/{saved_search_id}/refresh", response_model=list[ArticleResponse])
+async def refresh_saved_search(
+    saved_search_id: int,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    保存済み検索を即時に再実行し、新着論文を返す
+
+    NCBIへのリクエスト（公平スケジューラでの実行枠の待機を含む）・LLM呼び出しはブロッキングのため、
+    イベントループを止めないようスレッドプールで実行する。
+    """
+    user = _get_user(db, current_user)
+    saved_search = _get_saved_search(db, saved_search_id, user)
+    try:
+        with tenant_scope(current_user):
+            articles = await run_in_threadpool(SavedSearchWatcher().refresh, db, saved_search)
+        return FastJSONResponse(articles)
+    except PubMedSearchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+@router.delete("/saved-searches/{saved_search_id}", status_code=204)
+async def delete_saved_search(
+    saved_search_id: int,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user)
+):
+    """保存済み検索の削除"""
+    user = _get_user(db, current_user)
+    saved_search = _get_saved_search(db, saved_search_id, user)
+    for seen in db.exec(select(SavedSearchPmid).where(SavedSearchPmid.saved_search_id == saved_search.id)).all():
+        db.delete(seen)
+    db.delete(saved_search)
+    db.commit()
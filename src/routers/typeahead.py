@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+from ..database import get_db
+from ..schemas import TypeaheadField, TypeaheadSuggestion
+from ..typeahead import get_typeahead_index, get_typeahead_settings
+
+router = APIRouter()
+
+@router.get("/typeahead/{field}", response_model=list[TypeaheadSuggestion])
+async def typeahead(
+    field: TypeaheadField,
+    q: str = Query(..., min_length=1),
+    limit: int | None = Query(None, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """
+    著者・ジャーナル・所属機関の入力補完
+
+    保存済み論文に現れる値のうち q に前方一致するものを、含まれる論文数の多い順に返す。
+    初回のみデータベースから索引を構築するため、スレッドプールで実行する。
+    """
+    if not get_typeahead_settings().enabled:
+        raise HTTPException(status_code=503, detail="Typeahead is disabled")
+    index = get_typeahead_index()
+    if not index.loaded:
+        await run_in_threadpool(index.load, db)
+    return [TypeaheadSuggestion(value=value, count=count) for value, count in index.complete(field, q, limit)]
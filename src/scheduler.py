@@ -0,0 +1,226 @@
+# project/scheduler.py
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import lru_cache
+from typing import Callable, Iterator
+from pydantic_settings import BaseSettings
+from .metrics import SCHEDULER_WAIT_SECONDS, SCHEDULER_QUEUE_TIMEOUTS
+
+class SchedulerSettings(BaseSettings):
+    enabled: bool = True
+    # NCBI E-utilities（全ユーザーで共有する上限）
+    ncbi_concurrency: int = 3
+    ncbi_per_user_concurrency: int = 2
+    ncbi_rate_per_second: float | None = None   # NCBIの上限（APIキーなし3/秒, あり10/秒）に合わせて設定
+    # LLM
+    llm_concurrency: int = 8
+    llm_per_user_concurrency: int = 4
+    # 優先度クラスごとの重み（待ち行列での取り分の比）
+    interactive_weight: float = 4.0
+    batch_weight: float = 1.0
+    interactive_max_results: int = 500          # これを超える検索はバッチとして扱う
+    queue_timeout_seconds: float = 120.0
+
+    class Config:
+        env_prefix = "SCHEDULER_"
+
+@lru_cache()
+def get_scheduler_settings() -> SchedulerSettings:
+    return SchedulerSettings()
+
+class SchedulerTimeoutError(Exception):
+    """待ち行列での待機が上限を超えた"""
+    pass
+
+class Priority(str, Enum):
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+
+@dataclass(frozen=True)
+class Tenant:
+    """上流の呼び出しを行う利用者（Firebase UID、未認証の場合は anon:<クライアントIP>）"""
+    id: str
+    priority: Priority = Priority.INTERACTIVE
+
+SYSTEM_TENANT = Tenant("system", Priority.BATCH)
+
+_current_tenant: ContextVar[Tenant] = ContextVar("current_tenant", default=SYSTEM_TENANT)
+
+@contextmanager
+def tenant_scope(tenant_id: str, priority: Priority = Priority.INTERACTIVE) -> Iterator[Tenant]:
+    """
+    このブロック内（run_in_threadpool 等でコンテキストを引き継いだスレッドを含む）の上流呼び出しを tenant_id として扱う
+    """
+    tenant = Tenant(tenant_id, priority)
+    token = _current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current_tenant.reset(token)
+
+def current_tenant() -> Tenant:
+    return _current_tenant.get()
+
+def request_tenant_id(user_id: str | None, client_host: str | None) -> str:
+    """リクエストの利用者ID（未認証の場合はクライアントIPで区別）"""
+    return user_id or f"anon:{client_host or 'unknown'}"
+
+def search_priority(max_results: int) -> Priority:
+    """検索件数が多い検索はバッチとして扱う"""
+    if max_results > get_scheduler_settings().interactive_max_results:
+        return Priority.BATCH
+    return Priority.INTERACTIVE
+
+@dataclass(order=True)
+class _Ticket:
+    finish_tag: float
+    seq: int
+    start_tag: float = field(compare=False)
+    tenant: Tenant = field(compare=False)
+
+class FairScheduler:
+    """
+    共有の上流（NCBI・LLM）への呼び出しを利用者ごとに公平に割り当てるスケジューラ
+
+    重み付き公平キューイング（WFQ）: 各呼び出しに 仮想時刻 + コスト/重み の終了タグを付け、
+    同時実行数に空きがあるとき、利用者ごとの同時実行数の上限に達していない中で終了タグが最小の呼び出しを実行する。
+    重みは優先度クラス（対話/バッチ）で決まるため、大量の呼び出しを待たせている利用者がいても、
+    他の利用者の呼び出しは自分の取り分に応じてすぐに順番が回ってくる。
+    """
+    def __init__(
+        self,
+        name: str,
+        concurrency: int,
+        per_tenant_concurrency: int,
+        weights: dict[Priority, float] | None = None,
+        rate_per_second: float | None = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.concurrency = concurrency
+        self.per_tenant_concurrency = per_tenant_concurrency
+        self.weights = weights or {Priority.INTERACTIVE: 4.0, Priority.BATCH: 1.0}
+        self.min_interval = 1.0 / rate_per_second if rate_per_second else 0.0
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting: list[_Ticket] = []
+        self._active = 0
+        self._active_by_tenant: dict[str, int] = {}
+        self._finish_tags: dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._next_start = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiting)
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @contextmanager
+    def slot(self, cost: float = 1.0, timeout: float | None = None) -> Iterator[None]:
+        """現在の利用者として実行枠を確保し、ブロックの間保持する"""
+        tenant = current_tenant()
+        start = time.perf_counter()
+        ticket = self._acquire(tenant, cost, timeout)
+        SCHEDULER_WAIT_SECONDS.observe(time.perf_counter() - start, upstream=self.name, priority=tenant.priority.value)
+        try:
+            yield
+        finally:
+            self._release(ticket)
+
+    def _acquire(self, tenant: Tenant, cost: float, timeout: float | None) -> _Ticket:
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._cond:
+            start_tag = max(self._virtual_time, self._finish_tags.get(tenant.id, 0.0))
+            finish_tag = start_tag + cost / self.weights.get(tenant.priority, 1.0)
+            ticket = _Ticket(finish_tag, next(self._seq), start_tag, tenant)
+            self._finish_tags[tenant.id] = ticket.finish_tag
+            self._waiting.append(ticket)
+
+            while self._next_eligible() is not ticket:
+                remaining = None if deadline is None else deadline - self.clock()
+                if remaining is not None and remaining <= 0:
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+                    SCHEDULER_QUEUE_TIMEOUTS.inc(upstream=self.name)
+                    raise SchedulerTimeoutError(f"Timed out waiting for {self.name} capacity")
+                self._cond.wait(remaining)
+
+            self._waiting.remove(ticket)
+            self._active += 1
+            self._active_by_tenant[tenant.id] = self._active_by_tenant.get(tenant.id, 0) + 1
+            self._virtual_time = max(self._virtual_time, ticket.start_tag)
+            self._prune_finish_tags()
+
+            delay = 0.0
+            if self.min_interval:
+                now = self.clock()
+                start_at = max(now, self._next_start)
+                self._next_start = start_at + self.min_interval
+                delay = start_at - now
+            # 同時実行数に空きが残っていれば次の呼び出しも起こす
+            self._cond.notify_all()
+
+        if delay > 0:
+            time.sleep(delay)
+        return ticket
+
+    def _release(self, ticket: _Ticket) -> None:
+        with self._cond:
+            self._active -= 1
+            count = self._active_by_tenant[ticket.tenant.id] - 1
+            if count:
+                self._active_by_tenant[ticket.tenant.id] = count
+            else:
+                del self._active_by_tenant[ticket.tenant.id]
+            self._cond.notify_all()
+
+    def _next_eligible(self) -> _Ticket | None:
+        """次に実行する呼び出し（同時実行数に空きがなければNone）"""
+        if self._active >= self.concurrency:
+            return None
+        eligible = [
+            ticket for ticket in self._waiting
+            if self._active_by_tenant.get(ticket.tenant.id, 0) < self.per_tenant_concurrency
+        ]
+        return min(eligible, default=None)
+
+    def _prune_finish_tags(self) -> None:
+        # 仮想時刻に追い越された利用者のタグは不要（次の呼び出しは仮想時刻から始まる）
+        if len(self._finish_tags) > 10000:
+            self._finish_tags = {
+                tenant_id: tag for tenant_id, tag in self._finish_tags.items() if tag > self._virtual_time
+            }
+
+@lru_cache(maxsize=None)
+def get_scheduler(upstream: str) -> FairScheduler:
+    """上流ごとの共有スケジューラ（"ncbi" / "llm"）"""
+    settings = get_scheduler_settings()
+    weights = {Priority.INTERACTIVE: settings.interactive_weight, Priority.BATCH: settings.batch_weight}
+    if upstream == "ncbi":
+        return FairScheduler(
+            "ncbi", settings.ncbi_concurrency, settings.ncbi_per_user_concurrency,
+            weights, settings.ncbi_rate_per_second
+        )
+    if upstream == "llm":
+        return FairScheduler("llm", settings.llm_concurrency, settings.llm_per_user_concurrency, weights)
+    raise ValueError(f"Unknown upstream: {upstream}")
+
+@contextmanager
+def upstream_slot(upstream: str, cost: float = 1.0) -> Iterator[None]:
+    """上流への1回の呼び出しの実行枠（スケジューラが無効な場合は何もしない）"""
+    settings = get_scheduler_settings()
+    if not settings.enabled:
+        yield
+        return
+    with get_scheduler(upstream).slot(cost, settings.queue_timeout_seconds):
+        yield
@@ -82,7 +82,7 @@ class SearchCriteria(BaseModel):
     search_fields: list[SearchField] | None = None
     exclude_keywords: list[str] | None = None
     mesh_terms: list[str] | None = None
-    include_mesh_subheadings: bool = False
+    include_mesh_subheadings: bool = False   # Trueの場合は指定した記述子のみ（下位記述子に展開しない）
     publication_types: list[PublicationType] | None = None
     authors: list[str] | None = None
     journals: list[str] | None = None
@@ -105,6 +105,7 @@ class ArticleAuthor(BaseModel):
 class ArticleMeshTerm(BaseModel):
     descriptor: str | None = None
     qualifiers: list[str] | None = None
+    ui: str | None = None          # MeSH Descriptor UI (例: D003920)
 
 class PublicationDate(BaseModel):
     year: int | None = None
@@ -118,6 +119,8 @@ class ArticleResponse(BaseModel):
     authors: list[ArticleAuthor] = []
     mesh_terms: list[ArticleMeshTerm] = []
     keywords: list[str] = []
+    publication_types: list[str] = []
+    languages: list[str] = []
     doi: str | None = None
     journal: str | None = None
     journal_abbrev: str | None = None
@@ -126,9 +129,50 @@ class ArticleResponse(BaseModel):
     citation_count: int = 0
     summary: str | None = None
     analysis: str | None = None
+    duplicate_group: str | None = None   # 内容がほぼ同一の論文のグループ（要約・分析を共有した代表論文のPMID）
 
     # ほか必要ならフィールド追加
 
+# 入力補完
+class MeshSuggestion(BaseModel):
+    ui: str                             # 記述子UI（D000001 等）
+    name: str                           # 記述子名（クエリに使う正式名）
+    term: str                           # 入力に一致した用語（エントリー用語の場合は記述子名と異なる）
+    tree_numbers: list[str] = []
+
+class TypeaheadField(str, Enum):
+    AUTHORS = "authors"
+    JOURNALS = "journals"
+    AFFILIATIONS = "affiliations"
+
+class TypeaheadSuggestion(BaseModel):
+    value: str                          # SearchCriteriaにそのまま指定できる表記
+    count: int                          # 保存済み論文のうち、この値を含む論文の数
+
+# 引用グラフ
+class RelatedPaperResponse(BaseModel):
+    pmid: str
+    score: int                          # co_citations + shared_references
+    co_citations: int                   # 両方の論文を引用している論文の数
+    shared_references: int              # 両方の論文が引用している論文の数
+
+# ページ単位の検索
+MAX_PAGE_SIZE = 200
+
+class SearchPageRequest(BaseModel):
+    criteria: SearchCriteria
+    page_size: int = Field(default=20, ge=1, le=MAX_PAGE_SIZE)
+
+class SearchPage(BaseModel):
+    articles: list[ArticleResponse]
+    total: int                          # 取得可能な総件数（max_resultsで上限）
+    next_cursor: str | None = None      # 次ページ取得用の不透明カーソル（最終ページではNone）
+
+# サーバー側に保持した検索結果の参照（記事生成時に検索結果全体を再送しない）
+class ResultSetReference(BaseModel):
+    handle: str
+    pmids: list[str] | None = None   # 指定した場合はこのPMIDのみを使用
+
 # 例: 記事生成後のレスポンスなど
 class ArticleCreateResponse(BaseModel):
     id: int
@@ -143,3 +187,20 @@ class ArticleCreateResponse(BaseModel):
 
     class Config:
         orm_mode = True
+
+# 生成済み記事の一覧・全文検索のページ
+class ArticlePage(BaseModel):
+    articles: list[ArticleCreateResponse]
+    next_cursor: str | None = None      # 次ページ取得用の不透明カーソル（最終ページではNone）
+
+# 保存済み検索（定期的な差分取得）
+class SavedSearchCreate(BaseModel):
+    name: str
+    criteria: SearchCriteria
+
+class SavedSearchResponse(BaseModel):
+    id: int
+    name: str
+    criteria: SearchCriteria
+    last_checked_at: datetime | None = None
+    created_at: datetime
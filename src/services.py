@@ -1,70 +1,183 @@
 # project/services.py
 
-from .schemas import ArticleResponse
+import hashlib
+from .records import ArticleLike
 from .models import Article
-from openai import OpenAI
-from .llm import summarize_abstract, analyze_abstract
-import os
+from .llm import summarize_abstract, analyze_abstract, get_client
+from .metrics import ARTICLE_GENERATION_SECONDS, ARTICLES_PROCESSED, ARTICLES_DEDUPLICATED
+from .dedup import duplicate_groups
+from .workers import get_worker_settings, should_offload, run_in_process
+from datetime import datetime
+
+def abstract_hash(abstract: str | None) -> str:
+    """保存済みの要約・分析が現在の抄録から生成されたものかの判定用"""
+    return hashlib.sha256((abstract or "").encode("utf-8")).hexdigest()[:16]
 
 class ArticleGenerationError(Exception):
     """記事生成に関連するエラー"""
     pass
 
+def enrich_articles(articles: list[ArticleLike]) -> None:
+    """
+    各論文にLLMによる要約と分析を付与
+
+    抄録がほぼ同一の論文（重複出版・エラータ等）はグループの代表論文の要約・分析を共有し、
+    duplicate_group に代表論文のPMIDを記録する。
+    """
+    groups = duplicate_groups([article.abstract for article in articles])
+    for article, representative in zip(articles, groups):
+        if representative is not None:
+            article.duplicate_group = articles[representative].pmid
+            if article is not articles[representative]:
+                article.summary = articles[representative].summary
+                article.analysis = articles[representative].analysis
+                ARTICLES_DEDUPLICATED.inc(stage="search")
+                continue
+        if article.abstract:
+            article.summary = summarize_abstract(article.abstract)
+            article.analysis = analyze_abstract(article.abstract)
+            ARTICLES_PROCESSED.inc(stage="search")
+
 class ArticleGenerator:
     """PubMed検索結果から記事を生成するクラス"""
     def __init__(self, llm_client=None):
-        self.llm_client = llm_client or OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self._llm_client = llm_client
+
+    @property
+    def llm_client(self):
+        """LLMクライアント（未指定の場合は初回使用時に共有クライアントを取得）"""
+        if self._llm_client is None:
+            self._llm_client = get_client()
+        return self._llm_client
 
-    def generate_article(self, search_results: list[ArticleResponse]) -> Article:
+    def generate_article(self, search_results: list[ArticleLike]) -> Article:
         """検索結果から記事を生成"""
         if not search_results:
             raise ArticleGenerationError("検索結果が空です")
         
         try:
-            # 記事のメタデータを準備
-            source_articles = [result.pmid for result in search_results]
-            keywords = set()
-            for result in search_results:
-                keywords.update(result.keywords or [])
-
-            # 各論文の要約と分析を生成
-            summaries = []
-            analyses = []
-            for result in search_results:
-                if result.abstract:
-                    summary = summarize_abstract(result.abstract)
-                    analysis = analyze_abstract(result.abstract)
-                    summaries.append(summary)
-                    analyses.append(analysis)
-
-            # 記事を生成
-            article = Article(
-                title=f"Literature Review: {search_results[0].mesh_terms[0].descriptor if search_results[0].mesh_terms else 'Medical Research'}",
-                content=self._format_content(search_results, summaries, analyses),
-                summary="\n\n".join(summaries),
-                keywords=list(keywords),
-                source_articles=source_articles
-            )
+            with ARTICLE_GENERATION_SECONDS.time(mode="generate"):
+                # 各論文の要約と分析を生成
+                paper_outputs = self._generate_paper_outputs(search_results, {})
+
+                # 記事を生成
+                article = Article()
+                self._assemble_article(article, search_results, paper_outputs)
             
             return article
             
         except Exception as e:
             raise ArticleGenerationError(f"記事生成中にエラーが発生しました: {str(e)}")
 
-    def _format_content(self, results: list[ArticleResponse], summaries: list[str], analyses: list[str]) -> str:
-        """記事コンテンツをフォーマット"""
-        content_parts = ["# Literature Review\n\n"]
-        
-        for i, (result, summary, analysis) in enumerate(zip(results, summaries, analyses)):
-            content_parts.extend([
-                f"## {i+1}. {result.title}\n",
-                f"**Authors**: {', '.join([f'{a.fore_name} {a.last_name}' for a in result.authors])}\n",
-                f"**Journal**: {result.journal} ({result.publication_date.year})\n",
-                f"**PMID**: {result.pmid}\n\n",
-                "### Summary\n",
-                f"{summary}\n\n",
-                "### Analysis\n",
-                f"{analysis}\n\n"
-            ])
-        
-        return "\n".join(content_parts)
+    def regenerate_article(self, article: Article, search_results: list[ArticleLike]) -> Article:
+        """
+        新しい検索結果で既存の記事を再生成
+
+        保存済みのPMIDごとの要約・分析を再利用し、LLMは追加された論文に対してのみ呼び出す。
+        検索結果に含まれなくなった論文は記事から除外される。
+        """
+        if not search_results:
+            raise ArticleGenerationError("検索結果が空です")
+
+        try:
+            with ARTICLE_GENERATION_SECONDS.time(mode="regenerate"):
+                paper_outputs = self._generate_paper_outputs(search_results, article.paper_outputs or {})
+                self._assemble_article(article, search_results, paper_outputs)
+                article.updated_at = datetime.utcnow()
+
+            return article
+
+        except Exception as e:
+            raise ArticleGenerationError(f"記事再生成中にエラーが発生しました: {str(e)}")
+
+    def _generate_paper_outputs(
+        self,
+        search_results: list[ArticleLike],
+        existing: dict[str, dict[str, str]]
+    ) -> dict[str, dict[str, str]]:
+        """
+        PMIDごとの要約・分析を生成（既存の出力があれば再利用）
+
+        出力には抄録のハッシュ（abstract_hash）を記録し、エラータ等で抄録が変わった論文は再生成する
+        （ハッシュを持たない以前の出力は判別できないためそのまま再利用する）。
+        抄録がほぼ同一の論文はグループの代表論文の出力を共有する（duplicate_of に代表論文のPMIDを記録）。
+        """
+        paper_outputs = {}
+        groups = duplicate_groups([result.abstract for result in search_results])
+        for result, representative in zip(search_results, groups):
+            leader = search_results[representative].pmid if representative is not None else None
+            digest = abstract_hash(result.abstract)
+            stored = existing.get(result.pmid)
+            if stored is not None and stored.get("abstract_hash", digest) == digest:
+                paper_outputs[result.pmid] = stored
+            elif leader is not None and leader != result.pmid and leader in paper_outputs:
+                paper_outputs[result.pmid] = {**paper_outputs[leader], "abstract_hash": digest, "duplicate_of": leader}
+                ARTICLES_DEDUPLICATED.inc(stage="article")
+            elif result.abstract:
+                paper_outputs[result.pmid] = {
+                    "summary": summarize_abstract(result.abstract),
+                    "analysis": analyze_abstract(result.abstract),
+                    "abstract_hash": digest
+                }
+                ARTICLES_PROCESSED.inc(stage="article")
+        return paper_outputs
+
+    def _assemble_article(
+        self,
+        article: Article,
+        search_results: list[ArticleLike],
+        paper_outputs: dict[str, dict[str, str]]
+    ) -> None:
+        """PMIDごとの出力から記事のメタデータとコンテンツを組み立てる"""
+        keywords = set()
+        for result in search_results:
+            keywords.update(result.keywords or [])
+
+        summarized = [result for result in search_results if result.pmid in paper_outputs]
+        summaries = [paper_outputs[result.pmid]["summary"] for result in summarized]
+        analyses = [paper_outputs[result.pmid]["analysis"] for result in summarized]
+
+        article.title = f"Literature Review: {search_results[0].mesh_terms[0].descriptor if search_results[0].mesh_terms else 'Medical Research'}"
+        article.content = self._format_content(summarized, summaries, analyses)
+        article.summary = "\n\n".join(summaries)
+        article.keywords = list(keywords)
+        article.source_articles = [result.pmid for result in search_results]
+        article.paper_outputs = paper_outputs
+
+    def _format_content(self, results: list[ArticleLike], summaries: list[str], analyses: list[str]) -> str:
+        """記事コンテンツをフォーマット（論文数が多い場合はプロセスプールで実行）"""
+        rows = [
+            (
+                result.title,
+                ', '.join([f'{a.fore_name} {a.last_name}' for a in result.authors]),
+                result.journal,
+                result.publication_date.year,
+                result.pmid
+            )
+            for result in results
+        ]
+        if should_offload(len(rows), get_worker_settings().format_min_articles):
+            return run_in_process(format_content, rows, summaries, analyses)
+        return format_content(rows, summaries, analyses)
+
+def format_content(
+    rows: list[tuple[str, str, str | None, int | None, str]],
+    summaries: list[str],
+    analyses: list[str]
+) -> str:
+    """(タイトル, 著者, ジャーナル, 出版年, PMID) の行と要約・分析から記事コンテンツを組み立てる"""
+    content_parts = ["# Literature Review\n\n"]
+
+    for i, ((title, authors, journal, year, pmid), summary, analysis) in enumerate(zip(rows, summaries, analyses)):
+        content_parts.extend([
+            f"## {i+1}. {title}\n",
+            f"**Authors**: {authors}\n",
+            f"**Journal**: {journal} ({year})\n",
+            f"**PMID**: {pmid}\n\n",
+            "### Summary\n",
+            f"{summary}\n\n",
+            "### Analysis\n",
+            f"{analysis}\n\n"
+        ])
+
+    return "\n".join(content_parts)
@@ -0,0 +1,229 @@
+# project/typeahead.py
+
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from functools import lru_cache
+from typing import Iterable
+from pydantic_settings import BaseSettings
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from .models import Author, Paper, PaperAuthor
+from .records import ArticleLike
+from .schemas import TypeaheadField
+
+class TypeaheadSettings(BaseSettings):
+    enabled: bool = True
+    limit: int = 10
+    cached_prefix_length: int = 2     # この長さ以下の接頭辞は候補が多いため結果をキャッシュ
+    min_affiliation_length: int = 4   # これより短い所属機関の要素（国名コード等）は候補にしない
+
+    class Config:
+        env_prefix = "TYPEAHEAD_"
+
+@lru_cache()
+def get_typeahead_settings() -> TypeaheadSettings:
+    return TypeaheadSettings()
+
+_NON_ALNUM = re.compile(r"[\W_]+")
+_AFFILIATION_SEPARATORS = re.compile(r"[,;]")
+_BULK_INSERT = 64                     # 新しい値がこれ以上あれば挿入ではなく追加後に再ソート
+_MAX_CHAR = "\U0010ffff"
+
+def normalize_name(value: str) -> str:
+    """照合用の正規化（大文字小文字・アクセント記号・句読点を無視）"""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(" ", stripped.casefold()).strip()
+
+def author_name(last_name: str | None, fore_name: str | None) -> str | None:
+    """検索条件に指定する著者名（"姓 名"）"""
+    if not last_name:
+        return None
+    return f"{last_name} {fore_name}" if fore_name else last_name
+
+def affiliation_parts(affiliation: str | None, min_length: int = 4) -> list[str]:
+    """
+    所属機関を区切り（カンマ・セミコロン）ごとの要素に分割
+
+    所属機関は "Department of X, University of Y, City, Country." のような全文のため、
+    要素ごと（大学名・病院名など）に補完できるようにする。メールアドレスや番号は除く。
+    """
+    parts = []
+    for part in _AFFILIATION_SEPARATORS.split(affiliation or ""):
+        part = part.strip().rstrip(".").strip()
+        if len(part) < min_length or "@" in part or "electronic address" in part.lower():
+            continue
+        if sum(char.isdigit() for char in part) * 2 > len(part):
+            continue
+        parts.append(part)
+    return parts
+
+class PrefixIndex:
+    """
+    正規化した値のソート済み配列による前方一致検索
+
+    値ごとに出現した文書（論文）数を数え、補完候補は件数の多い順に返す。
+    """
+
+    def __init__(self, cached_prefix_length: int = 2):
+        self.cached_prefix_length = cached_prefix_length
+        self._keys: list[str] = []
+        self._counts: dict[str, int] = {}
+        self._display: dict[str, str] = {}
+        self._cache: dict[str, dict[int, list[tuple[str, int]]]] = {}   # 接頭辞 -> 件数 -> 候補
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add_documents(self, documents: Iterable[Iterable[str]]) -> None:
+        """文書ごとの値の列を追加（同じ文書内で重複する値は1回と数える）"""
+        with self._lock:
+            new_keys, changed = [], set()
+            for values in documents:
+                seen = set()
+                for value in values:
+                    key = normalize_name(value)
+                    if not key or key in seen:
+                        continue
+                    seen.add(key)
+                    changed.add(key)
+                    count = self._counts.get(key, 0)
+                    if not count:
+                        new_keys.append(key)
+                        self._display[key] = value
+                    self._counts[key] = count + 1
+
+            if len(new_keys) < _BULK_INSERT:
+                for key in new_keys:
+                    insort(self._keys, key)
+            else:
+                self._keys.extend(new_keys)
+                self._keys.sort()
+            # 件数が変わった値を候補に含みうる接頭辞のキャッシュのみ破棄
+            for key in changed:
+                for length in range(1, self.cached_prefix_length + 1):
+                    self._cache.pop(key[:length], None)
+
+    def complete(self, prefix: str, limit: int = 10) -> list[tuple[str, int]]:
+        """prefixに前方一致する値を (表記, 文書数) として件数の多い順に返す"""
+        key = normalize_name(prefix)
+        if not key or limit <= 0:
+            return []
+        with self._lock:
+            cacheable = len(key) <= self.cached_prefix_length
+            if cacheable and limit in self._cache.get(key, {}):
+                return self._cache[key][limit]
+
+            start = bisect_left(self._keys, key)
+            end = bisect_left(self._keys, key + _MAX_CHAR, start)
+            counts = self._counts
+            best = heapq.nsmallest(limit, self._keys[start:end], key=lambda candidate: (-counts[candidate], candidate))
+            result = [(self._display[candidate], counts[candidate]) for candidate in best]
+            if cacheable:
+                self._cache.setdefault(key, {})[limit] = result
+            return result
+
+class TypeaheadIndex:
+    """
+    保存済み論文の著者・ジャーナル・所属機関の入力補完用の索引
+
+    初回使用時にデータベースから構築し、以降は論文の保存（コミット）ごとに差分を追加する。
+    同じ論文を二重に数えないよう、索引に含めたPMIDを保持する。
+    """
+
+    def __init__(self, settings: TypeaheadSettings | None = None):
+        self.settings = settings or get_typeahead_settings()
+        self.fields = {field: PrefixIndex(self.settings.cached_prefix_length) for field in TypeaheadField}
+        self.loaded = False
+        self._started = False
+        self._pmids: set[str] = set()
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> None:
+        """保存済みの論文から索引を構築（構築済みであれば何もしない）"""
+        with self._lock:
+            if self.loaded:
+                return
+            # 読み込み中にコミットされた論文は add_articles で直接追加され、PMIDで重複が除かれる
+            self._started = True
+
+        # データベースの読み込み中はロックを保持しない（コミット時の追加を待たせない）
+        journals: dict[str, list[str]] = {}
+        for pmid, journal, journal_abbrev in db.execute(select(Paper.pmid, Paper.journal, Paper.journal_abbrev)):
+            journals[pmid] = [value for value in (journal, journal_abbrev) if value]
+        authors: dict[str, list[str]] = {pmid: [] for pmid in journals}
+        affiliations: dict[str, list[str]] = {pmid: [] for pmid in journals}
+        rows = db.execute(
+            select(PaperAuthor.pmid, Author.last_name, Author.fore_name, PaperAuthor.affiliation)
+            .join(Author, Author.id == PaperAuthor.author_id)
+        )
+        for pmid, last_name, fore_name, affiliation in rows:
+            if pmid not in authors:
+                continue
+            name = author_name(last_name, fore_name)
+            if name:
+                authors[pmid].append(name)
+            affiliations[pmid].extend(affiliation_parts(affiliation, self.settings.min_affiliation_length))
+
+        with self._lock:
+            if self.loaded:
+                return
+            for pmid in self._pmids.intersection(journals):
+                del journals[pmid], authors[pmid], affiliations[pmid]
+            self._add(journals, authors, affiliations)
+            self.loaded = True
+
+    def add_articles(self, articles: Iterable[ArticleLike]) -> int:
+        """新しく保存された論文を追加し、追加した件数を返す（構築前は何もしない）"""
+        with self._lock:
+            if not self._started:
+                return 0
+            journals: dict[str, list[str]] = {}
+            authors: dict[str, list[str]] = {}
+            affiliations: dict[str, list[str]] = {}
+            for article in articles:
+                if article.pmid in self._pmids or article.pmid in journals:
+                    continue
+                journals[article.pmid] = [value for value in (article.journal, article.journal_abbrev) if value]
+                authors[article.pmid] = [
+                    name for author in article.authors if (name := author_name(author.last_name, author.fore_name))
+                ]
+                affiliations[article.pmid] = [
+                    part for author in article.authors
+                    for part in affiliation_parts(author.affiliation, self.settings.min_affiliation_length)
+                ]
+            self._add(journals, authors, affiliations)
+            return len(journals)
+
+    def _add(self, journals: dict[str, list[str]], authors: dict[str, list[str]], affiliations: dict[str, list[str]]) -> None:
+        self._pmids.update(journals)
+        self.fields[TypeaheadField.JOURNALS].add_documents(journals.values())
+        self.fields[TypeaheadField.AUTHORS].add_documents(authors.values())
+        self.fields[TypeaheadField.AFFILIATIONS].add_documents(affiliations.values())
+
+    def complete(self, field: TypeaheadField, prefix: str, limit: int | None = None) -> list[tuple[str, int]]:
+        return self.fields[field].complete(prefix, limit or self.settings.limit)
+
+@lru_cache()
+def get_typeahead_index() -> TypeaheadIndex:
+    return TypeaheadIndex()
+
+_PENDING_KEY = "typeahead_pending_articles"
+
+def queue_articles(db: Session, articles: list[ArticleLike]) -> None:
+    """コミット後に索引へ追加する論文を登録（ロールバックされた場合は破棄される）"""
+    db.info.setdefault(_PENDING_KEY, []).extend(articles)
+
+@event.listens_for(Session, "after_commit")
+def _add_committed_articles(session: Session):
+    articles = session.info.pop(_PENDING_KEY, None)
+    if articles and get_typeahead_settings().enabled:
+        get_typeahead_index().add_articles(articles)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_articles(session: Session):
+    session.info.pop(_PENDING_KEY, None)
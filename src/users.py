@@ -0,0 +1,34 @@
+# project/users.py
+
+from functools import lru_cache
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .cache import TTLCache
+from .database import get_database_settings
+from .metrics import REGISTRY
+from .models import User
+
+@lru_cache()
+def get_user_id_cache() -> TTLCache[str, int]:
+    """Firebase UID -> users.id のプロセス内キャッシュ"""
+    settings = get_database_settings()
+    cache = TTLCache(maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl_seconds)
+    REGISTRY.register_cache("user_ids", cache)
+    return cache
+
+async def get_user_id(db: AsyncSession, firebase_uid: str) -> int | None:
+    """Firebase UIDに対応するユーザーIDを取得（キャッシュにない場合のみDBを参照）"""
+    cache = get_user_id_cache()
+    user_id = cache.get(firebase_uid)
+    if user_id is not None:
+        return user_id
+
+    result = await db.exec(select(User.id).where(User.firebase_uid == firebase_uid))
+    user_id = result.first()
+    if user_id is not None:
+        cache.set(firebase_uid, user_id)
+    return user_id
+
+def invalidate_user_id(firebase_uid: str) -> None:
+    """ユーザーの削除・再作成時にキャッシュを無効化"""
+    get_user_id_cache().pop(firebase_uid)
@@ -0,0 +1,162 @@
+# project/watches.py
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Callable
+from pydantic_settings import BaseSettings
+from sqlmodel import Session, select
+from .models import SavedSearch, SavedSearchPmid
+from .papers import upsert_papers
+from .pubmed import PubMedAdvancedSearch
+from .schemas import SearchCriteria
+from .records import ArticleLike
+from .services import enrich_articles
+from .scheduler import Priority, tenant_scope
+
+logger = logging.getLogger(__name__)
+
+Notifier = Callable[[SavedSearch, list[ArticleLike]], None]
+
+class WatchSettings(BaseSettings):
+    enabled: bool = False
+    interval_hours: float = 24       # 各保存済み検索の再実行間隔
+    poll_seconds: float = 600        # スケジューラが期限到来を確認する間隔
+    overlap_days: int = 1            # Entrez Dateは日単位のため、前回実行日と重複させて取りこぼしを防ぐ
+
+    class Config:
+        env_prefix = "WATCH_"
+
+@lru_cache()
+def get_watch_settings() -> WatchSettings:
+    return WatchSettings()
+
+def log_notifier(saved_search: SavedSearch, articles: list[ArticleLike]) -> None:
+    """新着論文をログに出力するデフォルトの通知"""
+    logger.info(
+        "Saved search %s (%s): %d new articles: %s",
+        saved_search.id, saved_search.name, len(articles), ", ".join(a.pmid for a in articles)
+    )
+
+class SavedSearchWatcher:
+    """
+    保存済み検索の差分更新
+
+    前回確認日以降にPubMedへ登録された論文のみを esearch（datetype=edat）で取得し、
+    既に確認済みのPMIDを除いた新着論文だけを efetch・要約・通知する。
+    """
+    def __init__(
+        self,
+        searcher: PubMedAdvancedSearch | None = None,
+        notifier: Notifier = log_notifier,
+        enrich: bool = True
+    ):
+        self.searcher = searcher or PubMedAdvancedSearch()
+        self.notifier = notifier
+        self.enrich = enrich
+
+    def refresh(self, db: Session, saved_search: SavedSearch, now: datetime | None = None) -> list[ArticleLike]:
+        """
+        保存済み検索を再実行し、新着論文を返す
+
+        初回実行時は現在の検索結果を確認済みとして記録するのみで、論文の取得・通知は行わない。
+        """
+        now = now or datetime.utcnow()
+        settings = get_watch_settings()
+        criteria = SearchCriteria.model_validate_json(saved_search.criteria)
+
+        if saved_search.last_checked_at is None:
+            new_pmids = self.searcher.search_pmids(criteria)
+            articles: list[ArticleLike] = []
+        else:
+            since = saved_search.last_checked_at - timedelta(days=settings.overlap_days)
+            pmids = self.searcher.search_pmids(criteria, since=since)
+            new_pmids = self._unseen_pmids(db, saved_search.id, pmids)
+            articles = self.searcher.fetch_articles(new_pmids, criteria.min_citations) if new_pmids else []
+
+        if articles:
+            if self.enrich:
+                enrich_articles(articles)
+            self.notifier(saved_search, articles)
+            upsert_papers(db, articles, now)
+
+        db.add_all(SavedSearchPmid(saved_search_id=saved_search.id, pmid=pmid, first_seen_at=now) for pmid in new_pmids)
+        saved_search.last_checked_at = now
+        db.add(saved_search)
+        db.commit()
+
+        return articles
+
+    def refresh_due(self, db: Session, now: datetime | None = None) -> int:
+        """再実行期限が到来した保存済み検索をすべて更新し、更新件数を返す"""
+        now = now or datetime.utcnow()
+        threshold = now - timedelta(hours=get_watch_settings().interval_hours)
+        due = db.exec(
+            select(SavedSearch).where(
+                (SavedSearch.last_checked_at == None) | (SavedSearch.last_checked_at <= threshold)  # noqa: E711
+            )
+        ).all()
+
+        refreshed = 0
+        for saved_search in due:
+            try:
+                # 定期実行は保存した利用者のバッチとして、対話的なリクエストより低い優先度で実行
+                with tenant_scope(self._tenant_id(saved_search), Priority.BATCH):
+                    self.refresh(db, saved_search, now)
+                refreshed += 1
+            except Exception:
+                db.rollback()
+                logger.exception("Failed to refresh saved search %s", saved_search.id)
+        return refreshed
+
+    @staticmethod
+    def _tenant_id(saved_search: SavedSearch) -> str:
+        user = saved_search.user
+        return user.firebase_uid if user else f"saved-search:{saved_search.id}"
+
+    @staticmethod
+    def _unseen_pmids(db: Session, saved_search_id: int, pmids: list[str]) -> list[str]:
+        if not pmids:
+            return []
+        seen = set(db.exec(
+            select(SavedSearchPmid.pmid).where(
+                SavedSearchPmid.saved_search_id == saved_search_id,
+                SavedSearchPmid.pmid.in_(pmids)
+            )
+        ).all())
+        return [pmid for pmid in pmids if pmid not in seen]
+
+class WatchScheduler:
+    """保存済み検索を定期的に再実行するバックグラウンドタスク"""
+    def __init__(self, engine, watcher: SavedSearchWatcher | None = None):
+        self.engine = engine
+        self.watcher = watcher or SavedSearchWatcher()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def run_once(self) -> int:
+        with Session(self.engine) as db:
+            return self.watcher.refresh_due(db)
+
+    async def _run(self):
+        poll_seconds = get_watch_settings().poll_seconds
+        while True:
+            try:
+                # 同期I/O（NCBI・DB）のためスレッドで実行
+                await asyncio.to_thread(self.run_once)
+            except Exception:
+                logger.exception("Saved search scheduler iteration failed")
+            await asyncio.sleep(poll_seconds)
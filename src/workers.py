@@ -0,0 +1,63 @@
+# project/workers.py
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Callable, TypeVar
+from pydantic_settings import BaseSettings
+
+T = TypeVar("T")
+
+class WorkerSettings(BaseSettings):
+    enabled: bool = True
+    processes: int | None = None              # 未設定の場合はCPUコア数
+    parse_min_bytes: int = 256 * 1024         # これ未満のefetchレスポンスはプロセス間通信の方が高くつくためその場でパース
+    format_min_articles: int = 300            # これ未満の記事はその場でフォーマット
+
+    class Config:
+        env_prefix = "WORKERS_"
+
+@lru_cache()
+def get_worker_settings() -> WorkerSettings:
+    return WorkerSettings()
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    CPU負荷の高い処理（XMLのパース等）用の共有プロセスプール（初回使用時に生成）
+
+    ワーカーはスレッドを含む親プロセスをforkしないよう spawn で起動する。
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                settings = get_worker_settings()
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.processes or os.cpu_count() or 1,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+def shutdown_process_pool() -> None:
+    """プロセスプールを終了（アプリ終了時に呼び出す）"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+def should_offload(size: int, threshold: int) -> bool:
+    return get_worker_settings().enabled and size >= threshold
+
+def submit(func: Callable[..., T], *args) -> Future:
+    """プロセスプールで実行（funcと引数・戻り値はpickle可能であること）"""
+    return get_process_pool().submit(func, *args)
+
+def run_in_process(func: Callable[..., T], *args) -> T:
+    """プロセスプールで実行して結果を待つ"""
+    return submit(func, *args).result()
@@ -1,11 +1,14 @@
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import Session, SQLModel, create_engine
-from sqlmodel.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.app import app
-from src.database import get_db
+from src.database import get_db, get_async_db
 from src.models import User, Article
+from src.users import get_user_id_cache
 
 @pytest.fixture
 def client():
@@ -13,27 +16,41 @@ def client():
     return TestClient(app)
 
 @pytest.fixture
-def test_db():
-    """テスト用のインメモリデータベース"""
+def test_db_path(tmp_path):
+    """テスト用のデータベースファイル（同期・非同期のセッションで共有）"""
+    return tmp_path / "test.db"
+
+@pytest.fixture
+def test_db(test_db_path):
+    """テスト用のデータベース"""
     engine = create_engine(
-        "sqlite://",
+        f"sqlite:///{test_db_path}",
         connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
     )
     SQLModel.metadata.create_all(engine)
     
     with Session(engine) as session:
         yield session
+    engine.dispose()
 
 @pytest.fixture
-def override_get_db(test_db):
+def override_get_db(test_db, test_db_path):
     """データベースの依存性を上書き"""
     def _override_get_db():
         yield test_db
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{test_db_path}", poolclass=NullPool)
+
+    async def _override_get_async_db():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
     
     app.dependency_overrides[get_db] = _override_get_db
+    app.dependency_overrides[get_async_db] = _override_get_async_db
+    get_user_id_cache().clear()
     yield
     app.dependency_overrides.clear()
+    get_user_id_cache().clear()
 
 @pytest.fixture
 def test_user(test_db):
@@ -50,7 +67,7 @@ def mock_firebase_auth(monkeypatch):
     def mock_verify_token(*args, **kwargs):
         return {"uid": "test123"}
     
-    monkeypatch.setattr("firebase_admin.auth.verify_id_token", mock_verify_token)
+    monkeypatch.setattr("src.auth.FirebaseTokenVerifier.verify", mock_verify_token)
 
 @pytest.fixture
 def sample_article_response():
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from sqlmodel import text
+from src.article_search import search_articles, ensure_article_fts
+from src.models import Article
+
+def _add_articles(test_db, user, count: int) -> list[Article]:
+    base = datetime(2024, 1, 1)
+    articles = [
+        Article(
+            title=f"Review {i}",
+            summary="COVID-19の治療に関するレビュー" if i % 2 else "糖尿病の薬物療法",
+            content=f"本文 {i}",
+            created_at=base + timedelta(minutes=i // 2),   # 同じ作成日時の記事を含める
+            user_id=user.id
+        )
+        for i in range(count)
+    ]
+    test_db.add_all(articles)
+    test_db.commit()
+    return articles
+
+def test_keyset_pagination(test_db, test_user):
+    """作成日時・IDによるキーセットページングのテスト"""
+    articles = _add_articles(test_db, test_user, 25)
+    expected = sorted(articles, key=lambda a: (a.created_at, a.id), reverse=True)
+
+    seen, after = [], None
+    while True:
+        page, has_more = search_articles(test_db, test_user.id, limit=10, after=after)
+        seen.extend(page)
+        if not has_more:
+            break
+        after = (page[-1].created_at, page[-1].id)
+    assert [a.id for a in seen] == [a.id for a in expected]
+    assert search_articles(test_db, test_user.id + 1)[0] == []
+
+def test_full_text_search(test_db, test_user):
+    """全文検索とインデックスの同期テスト"""
+    _add_articles(test_db, test_user, 10)
+
+    page, _ = search_articles(test_db, test_user.id, "COVID-19 治療に関する")
+    assert len(page) == 5
+    assert len(search_articles(test_db, test_user.id, "糖尿病")[0]) == 5
+    # 3文字未満の語は部分一致で絞り込む
+    assert len(search_articles(test_db, test_user.id, "Review 治療")[0]) == 5
+    assert search_articles(test_db, test_user.id, 'unknown "term')[0] == []
+
+    # 更新・削除がインデックスに反映される
+    article = search_articles(test_db, test_user.id, "本文 3")[0][0]
+    article.summary = "アルツハイマー病の新しい治療"
+    test_db.add(article)
+    test_db.commit()
+    assert [a.id for a in search_articles(test_db, test_user.id, "アルツハイマー")[0]] == [article.id]
+    assert len(search_articles(test_db, test_user.id, "COVID-19")[0]) == 4
+
+    test_db.delete(article)
+    test_db.commit()
+    assert search_articles(test_db, test_user.id, "アルツハイマー")[0] == []
+
+def test_ensure_article_fts_rebuilds(test_db, test_user):
+    """既存DBへのインデックス作成時の再構築テスト"""
+    _add_articles(test_db, test_user, 4)
+    connection = test_db.connection()
+    connection.execute(text("DROP TABLE articles_fts"))
+    for trigger in ("ai", "ad", "au"):
+        connection.execute(text(f"DROP TRIGGER articles_fts_{trigger}"))
+    ensure_article_fts(connection)
+    test_db.commit()
+    assert len(search_articles(test_db, test_user.id, "糖尿病")[0]) == 2
+
+def test_list_articles_endpoint(client, mock_firebase_auth, override_get_db, test_db, test_user):
+    """記事一覧・検索エンドポイントのテスト"""
+    _add_articles(test_db, test_user, 5)
+    headers = {"Authorization": "Bearer valid_token"}
+
+    response = client.get("/api/articles", headers=headers, params={"q": "COVID-19", "limit": 1})
+    assert response.status_code == 200
+    body = response.json()
+    assert [a["title"] for a in body["articles"]] == ["Review 3"]
+
+    response = client.get("/api/articles", headers=headers, params={"q": "COVID-19", "cursor": body["next_cursor"]})
+    assert [a["title"] for a in response.json()["articles"]] == ["Review 1"]
+    assert response.json()["next_cursor"] is None
+
+    response = client.get("/api/articles", headers=headers, params={"cursor": "invalid"})
+    assert response.status_code == 400
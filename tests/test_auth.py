@@ -1,6 +1,12 @@
+import time
+import jwt
 import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
 from fastapi import HTTPException
-from src.auth import verify_firebase_token, get_current_user
+from src.auth import (
+    FirebaseTokenVerifier, PublicKeyCache, TokenVerificationError, verify_firebase_token, get_current_user
+)
 
 def test_verify_firebase_token(client, mock_firebase_auth):
     """Firebase認証トークンの検証テスト"""
@@ -63,4 +69,52 @@ def test_user_association(client, mock_firebase_auth, override_get_db, test_user
     
     assert response.status_code == 200
     data = response.json()
-    assert data["user_id"] == test_user.id  # 生成された記事が正しいユーザーに関連付けられている 
\ No newline at end of file
+    assert data["user_id"] == test_user.id  # 生成された記事が正しいユーザーに関連付けられている 
+
+@pytest.fixture
+def signing_key():
+    """テスト用のRSA鍵ペア"""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    return private_key, public_pem
+
+def _sign(private_key, kid="key1", project_id="test-project", **overrides):
+    now = int(time.time())
+    claims = {
+        "iss": f"https://securetoken.google.com/{project_id}",
+        "aud": project_id,
+        "sub": "user-1",
+        "iat": now,
+        "exp": now + 3600,
+        **overrides,
+    }
+    return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": kid})
+
+def test_local_token_verification(signing_key):
+    """ローカル署名トークンの検証と、公開鍵・検証結果のキャッシュのテスト"""
+    private_key, public_pem = signing_key
+    fetches = []
+    def fetch():
+        fetches.append(1)
+        return {"key1": public_pem}, 3600
+
+    verifier = FirebaseTokenVerifier("test-project", PublicKeyCache(fetch))
+    token = _sign(private_key)
+
+    assert verifier.cached(token) is None
+    claims = verifier.verify(token)
+    assert claims["uid"] == "user-1"
+    assert verifier.cached(token) == claims
+    assert verifier.verify(token) is claims
+    assert len(fetches) == 1
+
+    # 対象プロジェクト違い・期限切れ・未知の鍵
+    with pytest.raises(TokenVerificationError):
+        verifier.verify(_sign(private_key, aud="other-project"))
+    with pytest.raises(TokenVerificationError):
+        verifier.verify(_sign(private_key, exp=1))
+    with pytest.raises(TokenVerificationError):
+        verifier.verify(_sign(private_key, kid="unknown"))
+    assert len(fetches) == 1  # 未知の鍵による再取得は間隔を空けて行う
@@ -0,0 +1,21 @@
+import json
+from pathlib import Path
+from benchmarks.run import BENCHMARKS, BenchmarkResult, compare
+
+BASELINE = Path(__file__).parent.parent / "benchmarks" / "baseline.json"
+
+def _result(name: str, median_seconds: float) -> BenchmarkResult:
+    return BenchmarkResult(name, repeats=1, items_per_op=1, median_seconds=median_seconds, p95_seconds=median_seconds, min_seconds=median_seconds)
+
+def test_committed_baseline_covers_benchmarks():
+    """リポジトリの基準値がすべてのベンチマークを含むことの確認"""
+    baseline = json.loads(BASELINE.read_text(encoding="utf-8"))
+    assert set(baseline["results"]) == set(BENCHMARKS)
+    assert all(result["median_seconds"] > 0 for result in baseline["results"].values())
+
+def test_compare_with_baseline():
+    """中央値が閾値を超えて悪化したベンチマークのみ検出することの確認"""
+    baseline = {"results": {"fast": {"median_seconds": 1.0}, "slow": {"median_seconds": 1.0}}}
+    results = [_result("fast", 1.1), _result("slow", 1.5), _result("new", 9.0)]
+    assert compare(results, baseline, max_regression=0.2) == ["slow: median 1.000000s -> 1.500000s (+50%)"]
+    assert compare(results, baseline, max_regression=0.5) == []
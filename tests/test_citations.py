@@ -0,0 +1,173 @@
+import numpy as np
+import pytest
+from benchmarks.fakes import FakeEutilsServer, FIRST_PMID
+from src import citations
+from src.citations import CitationGraph, CitationGraphError, get_citation_graph, get_citation_settings
+from src.pubmed import PubMedAdvancedSearch
+from src.schemas import SearchCriteria, SortBy
+
+def _graph() -> CitationGraph:
+    graph = CitationGraph()
+    graph.add_links(references={"3": ["1", "2"], "4": ["1", "2"], "5": ["1"]}, cited_by={"1": ["3", "4", "5"]})
+    return graph
+
+def _dense_pagerank(graph: CitationGraph, damping: float = 0.85) -> np.ndarray:
+    src, dst = graph.edges()
+    size = len(graph)
+    out_degree = np.bincount(src, minlength=size)
+    matrix = np.zeros((size, size))
+    matrix[dst, src] = 1 / out_degree[src]
+    matrix[:, out_degree == 0] = 1 / size
+    rank = np.full(size, 1 / size)
+    for _ in range(500):
+        rank = (1 - damping) / size + damping * matrix @ rank
+    return rank
+
+@pytest.fixture
+def shared_graph(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_citation_settings(), "graph_dir", str(tmp_path / "graph"))
+    citations.reset_citation_graph()
+    yield get_citation_graph()
+    citations.reset_citation_graph()
+
+def test_links_counts_and_related():
+    """引用関係の追加・被引用数・共引用/書誌結合のテスト"""
+    graph = _graph()
+    assert (len(graph), graph.edge_count) == (5, 5)
+    # 既存の辺・自己引用は追加しない
+    assert graph.add_links(references={"3": ["1", "3"]}, cited_by={}) == 0
+
+    assert sorted(graph.cited_by("1")) == ["3", "4", "5"]
+    assert graph.references("4") == ["1", "2"]
+    assert graph.cited_by("99") == []
+    # 被引用を取得していない論文（2）・未知の論文はNone
+    assert graph.citation_counts(["1", "2", "3", "99"]) == [3, None, 0, None]
+    assert graph.stale(["1", "2", "3", "99"]) == ["2", "99"]
+
+    assert [(p.pmid, p.co_citations, p.shared_references) for p in graph.related("1")] == [("2", 2, 0)]
+    assert [(p.pmid, p.co_citations, p.shared_references) for p in graph.related("3")] == [("4", 0, 2), ("5", 0, 1)]
+    assert graph.related("99") == []
+
+def test_pagerank():
+    """PageRankを密行列での計算と比較"""
+    graph = _graph()
+    graph.add_links(references={"2": ["1"], "6": ["3", "4"]}, cited_by={})
+    ranks = graph.pagerank()
+    assert ranks.sum() == pytest.approx(1.0)
+    assert np.allclose(ranks, _dense_pagerank(graph), atol=1e-8)
+    assert graph.pagerank_of(["1", "99"])[0] == ranks.max()
+    assert graph.pagerank_of(["99"]) == [0.0]
+
+def test_save_load_and_incremental_update(tmp_path):
+    """CSRの保存・メモリマップでの読み込みと、読み込み後の差分更新テスト"""
+    graph = _graph()
+    graph.save(tmp_path / "graph")
+    loaded = CitationGraph.load(tmp_path / "graph")
+    assert isinstance(loaded.columns["ref_indices"], np.memmap)
+    assert loaded.citation_counts(["1", "3"]) == [3, 0]
+    assert loaded.pending_edges == 0
+
+    # 差分は保存済みのCSRと合わせて参照される
+    assert loaded.add_links(references={"7": ["1", "3"], "3": ["2"]}, cited_by={"2": ["7"]}) == 3
+    assert loaded.pending_edges == 3
+    assert sorted(loaded.cited_by("1")) == ["3", "4", "5", "7"]
+    assert loaded.citation_counts(["1", "2", "3"]) == [4, 3, 1]
+    assert [p.pmid for p in loaded.related("1")] == ["2", "3"]
+    before = loaded.pagerank().copy()
+
+    loaded.save(tmp_path / "graph")
+    reloaded = CitationGraph.load(tmp_path / "graph")
+    assert (len(reloaded), reloaded.edge_count, reloaded.pending_edges) == (6, 8, 0)
+    assert reloaded.citation_counts(["1", "2", "3"]) == [4, 3, 1]
+    assert np.allclose(reloaded.pagerank(), before)
+
+    # 古いスナップショットは削除し、CURRENTの指すものだけを残す
+    assert [path.name for path in (tmp_path / "graph").glob("graph-*")] == [reloaded.snapshot]
+    (tmp_path / "graph" / reloaded.snapshot / "meta.json").write_text('{"version": 0}')
+    with pytest.raises(CitationGraphError):
+        CitationGraph.load(tmp_path / "graph")
+
+def test_save_merges_concurrent_snapshots(tmp_path):
+    """他のプロセスが先に保存した辺を失わずに保存し、読み込み中のメモリマップは書き換えないことの確認"""
+    _graph().save(tmp_path / "graph")
+    first = CitationGraph.load(tmp_path / "graph")
+    second = CitationGraph.load(tmp_path / "graph")
+    mapped = first.columns["ref_indices"]
+    expected = np.array(mapped)
+
+    first.add_links(references={"6": ["1"]}, cited_by={})
+    first.save(tmp_path / "graph")
+    second.add_links(references={"7": ["2"], "5": ["2"]}, cited_by={})
+    second.save(tmp_path / "graph")
+    # 保存前にメモリマップしたファイルは書き換えない（古いスナップショットの削除後も参照できる）
+    assert np.array_equal(mapped, expected)
+
+    merged = CitationGraph.load(tmp_path / "graph")
+    assert (len(merged), merged.edge_count) == (7, 8)
+    assert sorted(merged.cited_by("1")) == ["3", "4", "5", "6"]
+    assert sorted(merged.cited_by("2")) == ["3", "4", "5", "7"]
+    assert merged.stale(["5", "6", "7"]) == []
+    assert not list((tmp_path / "graph").glob(".tmp-*"))
+
+def test_most_cited_ranking_uses_cached_pagerank(monkeypatch):
+    """被引用数の同順位がなければPageRankを計算せず、同順位の解消では検索を待たせないことの確認"""
+    from src.records import ArticleRecord
+    graph = _graph()
+    searcher = PubMedAdvancedSearch(api_key="test")
+    monkeypatch.setattr(searcher, "update_citation_graph", lambda pmids: graph)
+    computed = []
+    pagerank = CitationGraph.pagerank
+    monkeypatch.setattr(CitationGraph, "pagerank", lambda self: computed.append(1) or pagerank(self))
+
+    def ranked(*pmids):
+        articles = [ArticleRecord(pmid=pmid, title="", abstract="") for pmid in pmids]
+        return [article.pmid for article in searcher.rank_by_citations(articles)]
+
+    assert ranked("3", "1") == ["1", "3"]
+    assert computed == []
+
+    # 計算済みの値がなければ同順位は元の順で返し、計算はバックグラウンドで行う
+    assert ranked("3", "2", "1") == ["1", "3", "2"]
+    graph._pagerank_thread.join()
+    assert computed == [1]
+    assert ranked("3", "2", "1") == ["1", "2", "3"]
+    assert computed == [1]
+
+def test_search_uses_bulk_elink(shared_graph, monkeypatch):
+    """被引用数によるフィルタ・並べ替えがelinkの一括取得とローカルのグラフで行われることの確認"""
+    monkeypatch.setattr(get_citation_settings(), "elink_batch_size", 20)
+    with FakeEutilsServer(total_count=50, citations_per_article=5) as eutils:
+        searcher = PubMedAdvancedSearch(api_key="test", base_url=eutils.url)
+        results = searcher.search_papers(SearchCriteria(keywords="x", max_results=50, min_citations=4))
+        # 50件をバッチ20件ずつ、引用先・引用元の2種類で取得（論文ごとには取得しない）
+        assert eutils.request_counts["elink"] == 6
+        expected = [pmid for pmid in range(FIRST_PMID, FIRST_PMID + 50) if len(eutils.cited_by(pmid)) >= 4]
+        assert [int(article.pmid) for article in results] == expected
+        assert [article.citation_count for article in results] == [len(eutils.cited_by(pmid)) for pmid in expected]
+
+        # 取得済みの論文はelinkを呼ばずにローカルで並べ替える
+        results = searcher.search_papers(SearchCriteria(keywords="x", max_results=50, sort_by=SortBy.MOST_CITED))
+        assert eutils.request_counts["elink"] == 6
+        counts = [article.citation_count for article in results]
+        assert counts == sorted(counts, reverse=True) and counts[0] == 5
+
+def test_related_papers_endpoint(client, shared_graph, monkeypatch):
+    """関連論文エンドポイントのテスト"""
+    with FakeEutilsServer(total_count=100, citations_per_article=5) as eutils:
+        monkeypatch.setattr("src.pubmed.get_pubmed_settings", lambda: _settings_with(eutils.url))
+        pmid = FIRST_PMID + 5   # 後続の5件に引用される
+        response = client.get(f"/api/papers/{pmid}/related", params={"limit": 3})
+        assert response.status_code == 200
+        related = response.json()
+        assert len(related) == 3
+        assert related == sorted(related, key=lambda paper: -paper["score"])
+        assert all(paper["score"] == paper["co_citations"] + paper["shared_references"] for paper in related)
+        # 引用元の論文と一緒に引用されている論文（共引用）が含まれる
+        co_cited = {str(cited) for citer in eutils.cited_by(pmid) for cited in eutils.references(citer)} - {str(pmid)}
+        assert {paper["pmid"] for paper in related if paper["co_citations"]} <= co_cited
+
+    assert client.get("/api/papers/abc/related").status_code == 422
+
+def _settings_with(base_url: str):
+    from src.pubmed import PubMedSettings
+    return PubMedSettings(base_url=base_url, retry_max_wait_seconds=0.01)
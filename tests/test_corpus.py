@@ -0,0 +1,83 @@
+import pytest
+from src.corpus import ColumnarCorpus, CorpusError, compile_criteria
+from src.papers import build_corpus, upsert_papers
+from src.schemas import ArticleResponse, SearchCriteria, PublicationType, Language
+
+def _article(pmid, year, journal, pub_types, languages, mesh):
+    return ArticleResponse(
+        pmid=pmid,
+        title=f"Article {pmid}",
+        abstract="abstract",
+        journal=journal,
+        journal_abbrev=journal[:3] + ".",
+        publication_types=pub_types,
+        languages=languages,
+        mesh_terms=[{"descriptor": d, "ui": ui} for d, ui in mesh],
+        publication_date={"year": year},
+    )
+
+@pytest.fixture
+def corpus():
+    return ColumnarCorpus.from_articles([
+        _article("1", 2020, "Lancet", ["Meta-Analysis"], ["eng"], [("Humans", "D006801"), ("COVID-19", "D000086382")]),
+        _article("2", 2018, "JAMA", ["Review"], ["jpn"], [("Mice", "D051379")]),
+        _article("3", 2023, "BMJ", ["Randomized Controlled Trial", "Journal Article"], ["eng"], [("Humans", "D006801")]),
+        _article("4", None, "Lancet", ["Meta-Analysis"], ["eng", "ger"], []),
+    ])
+
+def test_compile_and_evaluate(corpus):
+    """検索条件のコンパイルとマスク評価のテスト"""
+    criteria = SearchCriteria(
+        keywords="covid",
+        publication_types=[PublicationType.META_ANALYSIS, PublicationType.RANDOMIZED_CONTROLLED_TRIAL],
+        languages=[Language.ENGLISH],
+        start_year=2019,
+    )
+    predicate = compile_criteria(criteria)
+    assert predicate.residual_fields == ("keywords",)
+    assert corpus.pmids[predicate.evaluate(corpus)].tolist() == [1, 3]
+
+    # ジャーナル名（略称も含む、大文字小文字無視）とヒト研究
+    criteria = SearchCriteria(keywords="", journals=["lancet", "BMJ"], humans_only=True)
+    assert corpus.search(criteria).tolist() == [1, 3]
+
+    # MeSHは記述子名・UIのどちらでも指定可能
+    criteria = SearchCriteria(keywords="", mesh_terms=["D051379", "covid-19"])
+    assert corpus.search(criteria).tolist() == [1, 2]
+
+def test_append_skips_existing(corpus):
+    """既存PMIDの重複追加テスト"""
+    updated = corpus.append([
+        _article("1", 2020, "Lancet", [], [], []),
+        _article("5", 2024, "Nat Med", ["Review"], ["fre"], [("Humans", "D006801")]),
+    ])
+    assert len(corpus) == 4
+    assert updated.pmids.tolist() == [1, 2, 3, 4, 5]
+    assert updated.search(SearchCriteria(keywords="", humans_only=True)).tolist() == [1, 3, 5]
+
+def test_save_and_load(corpus, tmp_path):
+    """メモリマップでの保存・読み込みテスト"""
+    corpus.save(tmp_path / "corpus")
+    loaded = ColumnarCorpus.load(tmp_path / "corpus")
+
+    criteria = SearchCriteria(keywords="", languages=[Language.GERMAN], max_results=10)
+    assert loaded.search(criteria).tolist() == [4]
+    assert loaded.append([_article("9", 2021, "JAMA", [], [], [])]).pmids.tolist()[-1] == 9
+
+    with pytest.raises(CorpusError):
+        ColumnarCorpus.load(tmp_path / "missing")
+
+def test_build_from_papers(test_db):
+    """保存済みの論文テーブルからのコーパス構築テスト（バッチの境界をまたぐ）"""
+    upsert_papers(test_db, [
+        _article("3", 2023, "BMJ", ["Randomized Controlled Trial"], ["eng"], [("Humans", "D006801")]),
+        _article("1", 2020, "Lancet", ["Meta-Analysis"], ["eng"], [("Humans", "D006801"), ("COVID-19", "D000086382")]),
+        _article("2", 2018, "JAMA", ["Review"], ["jpn"], [("Mice", "D051379")]),
+    ])
+    test_db.commit()
+
+    corpus = build_corpus(test_db, batch_size=2)
+    assert corpus.pmids.tolist() == [1, 2, 3]
+    assert corpus.search(SearchCriteria(keywords="", humans_only=True, start_year=2021)).tolist() == [3]
+    assert corpus.search(SearchCriteria(keywords="", mesh_terms=["D000086382"])).tolist() == [1]
+    assert corpus.search(SearchCriteria(keywords="", journals=["jam."], languages=[Language.JAPANESE])).tolist() == [2]
@@ -0,0 +1,57 @@
+from benchmarks.fakes import efetch_xml, FIRST_PMID
+from src.dedup import duplicate_groups, get_dedup_settings
+from src.pubmed import _parse_efetch_xml
+from src.records import ArticleRecord
+from src.services import ArticleGenerator, abstract_hash, enrich_articles
+
+def _articles(count: int) -> list[ArticleRecord]:
+    return _parse_efetch_xml(efetch_xml(list(range(FIRST_PMID, FIRST_PMID + count))))[0]
+
+def _near_duplicate(article: ArticleRecord, pmid: str) -> ArticleRecord:
+    words = article.abstract.split()
+    words[10] = "erratum"
+    return ArticleRecord(pmid=pmid, title=f"Duplicate of {article.pmid}", abstract=" ".join(words) + " Copyright 2024.")
+
+def test_duplicate_groups():
+    """ほぼ同一の抄録のグループ化テスト"""
+    articles = _articles(200)
+    texts = [article.abstract for article in articles]
+    texts += [_near_duplicate(articles[3], "1").abstract, texts[7], None, "too short"]
+
+    groups = duplicate_groups(texts)
+    assert {i: group for i, group in enumerate(groups) if group is not None} == {3: 3, 7: 7, 200: 3, 201: 7}
+
+def test_duplicate_groups_disabled(monkeypatch):
+    texts = [article.abstract for article in _articles(2)] * 2
+    assert duplicate_groups(texts) == [0, 1, 0, 1]
+    monkeypatch.setattr(get_dedup_settings(), "enabled", False)
+    assert duplicate_groups(texts) == [None] * 4
+
+def test_enrich_reuses_outputs_for_duplicates(monkeypatch):
+    """重複する論文の要約・分析はLLMを呼ばずに共有することの確認"""
+    calls = []
+    monkeypatch.setattr("src.services.summarize_abstract", lambda text: calls.append(text) or f"summary {len(calls)}")
+    monkeypatch.setattr("src.services.analyze_abstract", lambda text: "analysis")
+    articles = _articles(3)
+    articles.insert(1, _near_duplicate(articles[0], "1"))
+
+    enrich_articles(articles)
+    assert len(calls) == 3
+    assert [a.duplicate_group for a in articles] == [articles[0].pmid, articles[0].pmid, None, None]
+    assert articles[1].summary == articles[0].summary == "summary 1"
+    assert articles[1].to_dict()["duplicate_group"] == articles[0].pmid
+
+def test_generator_reuses_outputs_for_duplicates(monkeypatch):
+    calls = []
+    monkeypatch.setattr("src.services.summarize_abstract", lambda text: calls.append(text) or "summary")
+    monkeypatch.setattr("src.services.analyze_abstract", lambda text: "analysis")
+    articles = _articles(2)
+    articles.append(_near_duplicate(articles[1], "1"))
+
+    article = ArticleGenerator(llm_client=object()).generate_article(articles)
+    assert len(calls) == 2
+    assert article.paper_outputs["1"] == {
+        "summary": "summary", "analysis": "analysis", "abstract_hash": abstract_hash(articles[2].abstract),
+        "duplicate_of": articles[1].pmid
+    }
+    assert "**PMID**: 1" in article.content
@@ -0,0 +1,87 @@
+import csv
+import gzip
+import json
+import pytest
+from src.exporters import export_articles, detect_format, ExportError
+from src.pubmed import PubMedAdvancedSearch
+from src.responses import FastJSONResponse
+from src.schemas import ArticleResponse
+
+@pytest.fixture
+def articles(sample_article_response):
+    return [
+        ArticleResponse(**{**sample_article_response, "pmid": str(pmid), "abstract": "行1\n行2", "doi": "10.1/x"})
+        for pmid in range(1, 4)
+    ]
+
+def test_detect_format(tmp_path):
+    """拡張子からの形式判定テスト"""
+    assert detect_format(tmp_path / "a.jsonl.gz") == ("jsonl", True)
+    assert detect_format(tmp_path / "a.v2.RIS") == ("ris", False)
+    with pytest.raises(ExportError):
+        detect_format(tmp_path / "a.xml")
+
+def test_export_json_and_jsonl(tmp_path, articles):
+    """JSON・JSON Lines（gzip）形式のテスト"""
+    expected = [article.model_dump(mode="json") for article in articles]
+
+    assert PubMedAdvancedSearch().save_results(articles, tmp_path / "results.json") == 3
+    assert json.loads((tmp_path / "results.json").read_text(encoding="utf-8")) == expected
+
+    # ジェネレータも逐次書き出せる
+    assert export_articles((article for article in articles), tmp_path / "results.jsonl.gz") == 3
+    with gzip.open(tmp_path / "results.jsonl.gz", "rt", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == expected
+
+    assert export_articles(iter([]), tmp_path / "empty.json") == 0
+    assert json.loads((tmp_path / "empty.json").read_text(encoding="utf-8")) == []
+    assert PubMedAdvancedSearch().save_results([], tmp_path / "none.json") == 0
+    assert not (tmp_path / "none.json").exists()
+
+def test_explicit_format_and_json_fallback(tmp_path, articles):
+    """形式を指定した場合は拡張子で判定せず、判定できない拡張子はsave_resultsでJSONとして保存することの確認"""
+    expected = [article.model_dump(mode="json") for article in articles]
+    searcher = PubMedAdvancedSearch()
+
+    assert searcher.save_results(articles, tmp_path / "results", format="json") == 3
+    assert json.loads((tmp_path / "results").read_text(encoding="utf-8")) == expected
+    assert searcher.save_results(articles, tmp_path / "out.dat", "jsonl") == 3
+    assert [json.loads(line) for line in (tmp_path / "out.dat").read_text(encoding="utf-8").splitlines()] == expected
+    # 形式を指定しても末尾の .gz で圧縮する
+    assert export_articles(articles, tmp_path / "out.dat.gz", format="csv") == 3
+    with gzip.open(tmp_path / "out.dat.gz", "rt", encoding="utf-8", newline="") as f:
+        assert [row["pmid"] for row in csv.DictReader(f)] == ["1", "2", "3"]
+
+    assert searcher.save_results(articles, tmp_path / "results.txt") == 3
+    assert json.loads((tmp_path / "results.txt").read_text(encoding="utf-8")) == expected
+    # export_articles は形式を判定できなければエラー
+    with pytest.raises(ExportError):
+        export_articles(articles, tmp_path / "results.txt")
+
+def test_export_ris_and_csv(tmp_path, articles):
+    """RIS・CSV形式のテスト"""
+    export_articles(articles, tmp_path / "results.ris")
+    records = (tmp_path / "results.ris").read_text(encoding="utf-8").strip().split("\n\n")
+    assert len(records) == 3
+    lines = records[0].splitlines()
+    assert lines[0] == "TY  - JOUR"
+    assert "AU  - Smith, John" in lines
+    assert "AB  - 行1 行2" in lines
+    assert "DO  - 10.1/x" in lines
+    assert "AN  - 1" in lines
+    assert lines[-1] == "ER  - "
+
+    export_articles(articles, tmp_path / "results.csv.gz")
+    with gzip.open(tmp_path / "results.csv.gz", "rt", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["pmid"] for row in rows] == ["1", "2", "3"]
+    assert rows[0]["authors"] == "Smith John"
+    assert rows[0]["keywords"] == "test; research"
+    assert rows[0]["abstract"] == "行1\n行2"
+
+def test_fast_json_response(articles):
+    """モデルを直接エンコードするレスポンスのテスト"""
+    response = FastJSONResponse(articles, headers={"X-Test": "1"})
+    assert json.loads(response.body) == [article.model_dump(mode="json") for article in articles]
+    assert response.headers["x-test"] == "1"
+    assert response.media_type == "application/json"
@@ -0,0 +1,52 @@
+import pytest
+from benchmarks.fakes import FakeEutilsServer, FakeChatCompletionsServer, FIRST_PMID
+from openai import OpenAI
+from src import llm
+from src.metrics import EFETCH_BATCH_SIZE
+from src.pubmed import PubMedAdvancedSearch, PubMedSearchError, get_efetch_batch_sizer, get_pubmed_settings
+from src.schemas import SearchCriteria
+
+@pytest.fixture
+def eutils():
+    get_efetch_batch_sizer.cache_clear()
+    with FakeEutilsServer(total_count=2000) as server:
+        yield server
+    get_efetch_batch_sizer.cache_clear()
+
+def test_search_papers_against_fake_eutils(eutils):
+    """ローカルのE-utilities代替サーバーに対するエンドツーエンド検索テスト"""
+    searcher = PubMedAdvancedSearch(api_key="test", base_url=eutils.url)
+    results = searcher.search_papers(SearchCriteria(keywords="COVID-19", max_results=150))
+
+    assert [a.pmid for a in results[:2]] == [str(FIRST_PMID), str(FIRST_PMID + 1)]
+    assert len(results) == 150
+    assert results[0].abstract.startswith("BACKGROUND:")
+    assert results[0].mesh_terms and results[0].mesh_terms[0].ui
+    assert eutils.request_counts == {"esearch": 1, "efetch": 1}
+
+def test_large_search_uses_adaptive_post_batches(eutils):
+    """大きな検索ではバッチを観測値に応じて拡大し、PMIDをPOSTで送ることの確認"""
+    gets, posts = EFETCH_BATCH_SIZE.count(method="GET"), EFETCH_BATCH_SIZE.count(method="POST")
+    searcher = PubMedAdvancedSearch(api_key="test", base_url=eutils.url)
+    results = searcher.search_papers(SearchCriteria(keywords="COVID-19", max_results=1500))
+
+    assert [a.pmid for a in results] == [str(pmid) for pmid in range(FIRST_PMID, FIRST_PMID + 1500)]
+    # 初回は既定値（200件）以下の188件をGETで、以降は観測値から残り1312件を1回のPOSTで取得
+    assert eutils.request_counts == {"esearch": 1, "efetch": 2}
+    assert EFETCH_BATCH_SIZE.count(method="GET") == gets + 1
+    assert EFETCH_BATCH_SIZE.count(method="POST") == posts + 1
+
+def test_fake_eutils_error_injection(monkeypatch):
+    """429エラー注入のテスト"""
+    monkeypatch.setattr(get_pubmed_settings(), "retry_max_wait_seconds", 0.01)
+    with FakeEutilsServer(error_rate=1.0) as server:
+        searcher = PubMedAdvancedSearch(api_key="test", base_url=server.url)
+        with pytest.raises(PubMedSearchError):
+            searcher.search_papers(SearchCriteria(keywords="COVID-19", max_results=5))
+
+def test_summarize_against_fake_chat(monkeypatch):
+    """Chat Completions代替サーバーに対する要約テスト"""
+    with FakeChatCompletionsServer() as server:
+        monkeypatch.setattr(llm, "client", OpenAI(api_key="test", base_url=server.base_url))
+        assert llm.summarize_abstract("Test abstract").startswith("Fake completion")
+        assert server.request_counts == {"chat.completions": 1}
@@ -0,0 +1,55 @@
+import json
+import pytest
+from benchmarks.loadtest import LoadTestReport, Sample, _summarize, main, parse_mix, percentile
+
+def test_percentile_interpolation():
+    """パーセンタイルの線形補間テスト"""
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4.0
+    assert percentile(values, 90) == pytest.approx(3.7)
+    assert percentile([5.0], 99) == 5.0
+    assert percentile([], 50) == 0.0
+
+def test_summarize_error_rate_and_throughput():
+    """エラー率・スループット・種類別の集計テスト"""
+    samples = [
+        Sample("search", 0.1, True),
+        Sample("search", 0.3, False),
+        Sample("generate", 0.2, True),
+        Sample("search", 0.2, True),
+    ]
+    stats = _summarize(samples, duration=2.0)
+    assert (stats["requests"], stats["throughput_rps"], stats["error_rate"]) == (4, 2.0, 0.25)
+    assert stats["p50_ms"] == pytest.approx(200.0)
+    assert _summarize([], duration=0.0) == {
+        "requests": 0, "throughput_rps": 0.0, "error_rate": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0,
+    }
+
+    summary = LoadTestReport(duration=2.0, samples=samples, loop_lags=[0.001, 0.003]).summary()
+    assert summary["by_kind"]["search"]["error_rate"] == pytest.approx(1 / 3)
+    assert summary["by_kind"]["generate"]["throughput_rps"] == 0.5
+    assert summary["event_loop_lag"]["max_ms"] == pytest.approx(3.0)
+
+def test_parse_mix():
+    """リクエスト比率のパーステスト"""
+    assert parse_mix("search=3,generate=1") == {"search": 3.0, "generate": 1.0}
+    assert parse_mix("search") == {"search": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("delete=1")
+
+def test_in_process_smoke_run(tmp_path):
+    """代替サーバーに対する短時間・低並行数のプロセス内実行"""
+    output = tmp_path / "loadtest.json"
+    exit_code = main([
+        "--concurrency", "2", "--duration", "0.5", "--max-results", "5",
+        "--eutils-latency", "0", "--llm-latency", "0", "--max-loop-lag-ms", "10000",
+        "--output", str(output),
+    ])
+    summary = json.loads(output.read_text(encoding="utf-8"))
+    assert exit_code == 0
+    assert summary["overall"]["requests"] > 0
+    assert summary["overall"]["error_rate"] == 0.0
+    assert set(summary["by_kind"]) <= {"search", "generate"}
+    assert "event_loop_lag" in summary
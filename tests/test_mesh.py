@@ -0,0 +1,165 @@
+import pytest
+from src.mesh import MeshIndex, MeshIndexError, get_mesh_index, get_mesh_settings
+from src.pubmed import PubMedAdvancedSearch
+from src.schemas import SearchCriteria
+
+DESCRIPTORS = [
+    ("D009369", "Neoplasms", ["C04"], ["Neoplasms", "Tumors", "Cancer"]),
+    ("D008175", "Lung Neoplasms", ["C04.588.894.797.520", "C08.381.540"], ["Lung Neoplasms", "Cancer of Lung", "Pulmonary Neoplasms"]),
+    ("D002289", "Carcinoma, Non-Small-Cell Lung", ["C04.588.894.797.520.109.220", "C08.381.540.140.500"], ["Carcinoma, Non-Small-Cell Lung", "NSCLC"]),
+    ("D001943", "Breast Neoplasms", ["C04.588.180"], ["Breast Neoplasms", "Breast Cancer"]),
+    ("D008168", "Lung", ["A04.411"], ["Lung", "Lungs"]),
+]
+
+def _xml(descriptors) -> str:
+    records = []
+    for ui, name, trees, terms in descriptors:
+        tree_xml = "".join(f"<TreeNumber>{tree}</TreeNumber>" for tree in trees)
+        term_xml = "".join(f"<Term><TermUI>T{i}</TermUI><String>{term}</String></Term>" for i, term in enumerate(terms))
+        records.append(
+            "<DescriptorRecord>"
+            f"<DescriptorUI>{ui}</DescriptorUI><DescriptorName><String>{name}</String></DescriptorName>"
+            # 他の記述子を参照する要素は記述子自身の名前・用語として扱わない
+            "<PharmacologicalActionList><PharmacologicalAction><DescriptorReferredTo>"
+            "<DescriptorUI>D000970</DescriptorUI><DescriptorName><String>Antineoplastic Agents</String></DescriptorName>"
+            "</DescriptorReferredTo></PharmacologicalAction></PharmacologicalActionList>"
+            f"<TreeNumberList>{tree_xml}</TreeNumberList>"
+            f"<ConceptList><Concept><TermList>{term_xml}</TermList></Concept></ConceptList>"
+            "</DescriptorRecord>"
+        )
+    return f'<?xml version="1.0"?><DescriptorRecordSet LanguageCode="eng">{"".join(records)}</DescriptorRecordSet>'
+
+@pytest.fixture
+def mesh_xml(tmp_path):
+    path = tmp_path / "desc.xml"
+    path.write_text(_xml(DESCRIPTORS), encoding="utf-8")
+    return path
+
+@pytest.fixture
+def configured_index(mesh_xml, tmp_path, monkeypatch):
+    """設定経由で構築される共有インデックス"""
+    settings = get_mesh_settings()
+    monkeypatch.setattr(settings, "descriptor_xml", str(mesh_xml))
+    monkeypatch.setattr(settings, "index_dir", str(tmp_path / "index"))
+    get_mesh_index.cache_clear()
+    yield get_mesh_index()
+    get_mesh_index.cache_clear()
+
+def test_build_save_and_load(mesh_xml, tmp_path):
+    """XMLからの構築と保存・メモリマップでの読み込みのテスト"""
+    index = MeshIndex.from_xml(mesh_xml)
+    index.save(tmp_path / "index")
+    loaded = MeshIndex.load(tmp_path / "index")
+    assert len(loaded) == len(DESCRIPTORS)
+    assert loaded.source == index.source
+
+    descriptor = loaded.descriptor(loaded.lookup("cancer of   LUNG"))
+    assert (descriptor.ui, descriptor.name) == ("D008175", "Lung Neoplasms")
+    assert descriptor.tree_numbers == ("C04.588.894.797.520", "C08.381.540")
+    assert loaded.name(loaded.lookup("d002289")) == "Carcinoma, Non-Small-Cell Lung"
+    assert loaded.lookup("Antineoplastic Agents") is None
+    assert loaded.lookup("lung neo") is None
+
+    (tmp_path / "index" / "meta.json").write_text('{"version": 0}')
+    with pytest.raises(MeshIndexError):
+        MeshIndex.load(tmp_path / "index")
+
+def test_autocomplete(mesh_xml):
+    """前方一致の候補と順位付けのテスト"""
+    index = MeshIndex.from_xml(mesh_xml)
+    suggestions = [(match.descriptor.name, match.term) for match in index.autocomplete("lung")]
+    # 完全一致・記述子名での一致が先、記述子ごとに1件
+    assert suggestions == [("Lung", "Lung"), ("Lung Neoplasms", "Lung Neoplasms")]
+    assert [match.term for match in index.autocomplete("CANC")] == ["Cancer", "Cancer of Lung"]
+    assert [match.term for match in index.autocomplete("breast c")] == ["Breast Cancer"]
+    assert len(index.autocomplete("c", limit=1)) == 1
+    assert index.autocomplete("xyz") == []
+    assert index.autocomplete("  ") == []
+
+def test_subtree(mesh_xml):
+    """ツリー番号による下位記述子の展開テスト"""
+    index = MeshIndex.from_xml(mesh_xml)
+    names = lambda term: [index.name(d) for d in index.subtree(index.lookup(term))]
+    assert names("Neoplasms") == ["Neoplasms", "Lung Neoplasms", "Carcinoma, Non-Small-Cell Lung", "Breast Neoplasms"]
+    # 複数のツリーに属する記述子は重複なく列挙
+    assert names("Lung Neoplasms") == ["Lung Neoplasms", "Carcinoma, Non-Small-Cell Lung"]
+    assert names("Lung") == ["Lung"]
+
+@pytest.mark.parametrize("with_index", [True, False])
+def test_search_query_expansion(mesh_xml, tmp_path, monkeypatch, with_index):
+    """include_mesh_subheadings の意味がインデックスの有無によらず同じであることの確認"""
+    if with_index:
+        settings = get_mesh_settings()
+        monkeypatch.setattr(settings, "descriptor_xml", str(mesh_xml))
+        monkeypatch.setattr(settings, "index_dir", str(tmp_path / "index"))
+        get_mesh_index.cache_clear()
+    else:
+        monkeypatch.setattr("src.pubmed.get_mesh_index", lambda: None)
+    searcher = PubMedAdvancedSearch()
+    query = lambda term, noexp: searcher._build_search_query(
+        SearchCriteria(keywords="therapy", mesh_terms=[term], include_mesh_subheadings=noexp)
+    ).removeprefix("(therapy) AND ").split(" AND ")[0]
+
+    try:
+        # True: 指定した記述子のみ
+        assert query("Lung Neoplasms", True) == '("Lung Neoplasms"[MeSH Terms:noexp])'
+        # False: 下位記述子を含む（インデックスがあればローカルで列挙、なければNCBI側で展開）
+        if with_index:
+            assert query("Pulmonary Neoplasms", True) == '("Lung Neoplasms"[MeSH Terms:noexp])'
+            assert query("Lung Neoplasms", False) == (
+                '("Lung Neoplasms"[MeSH Terms:noexp] OR "Carcinoma, Non-Small-Cell Lung"[MeSH Terms:noexp])'
+            )
+            # 上限を超える場合はNCBI側の展開に任せる
+            monkeypatch.setattr(get_mesh_settings(), "max_expansion", 1)
+            assert query("cancer of lung", False) == '("Lung Neoplasms"[MeSH Terms])'
+        else:
+            assert query("Lung Neoplasms", False) == '("Lung Neoplasms"[MeSH Terms])'
+        assert query("Unknown Term", False) == '("Unknown Term"[MeSH Terms])'
+        assert query("Unknown Term", True) == '("Unknown Term"[MeSH Terms:noexp])'
+    finally:
+        get_mesh_index.cache_clear()
+
+def test_index_is_rebuilt_when_source_changes(configured_index, mesh_xml):
+    """構築元のXMLが更新された場合の再構築テスト"""
+    assert configured_index.lookup("Tumors") is not None
+    mesh_xml.write_text(_xml(DESCRIPTORS[1:]), encoding="utf-8")
+    get_mesh_index.cache_clear()
+    index = get_mesh_index()
+    assert len(index) == len(DESCRIPTORS) - 1
+    assert index.lookup("Tumors") is None
+
+def test_autocomplete_endpoint(client, configured_index, monkeypatch):
+    """オートコンプリートエンドポイントのテスト"""
+    response = client.get("/api/mesh/autocomplete", params={"q": "pulm"})
+    assert response.status_code == 200
+    assert response.json() == [{
+        "ui": "D008175",
+        "name": "Lung Neoplasms",
+        "term": "Pulmonary Neoplasms",
+        "tree_numbers": ["C04.588.894.797.520", "C08.381.540"],
+    }]
+    assert len(client.get("/api/mesh/autocomplete", params={"q": "c", "limit": 2}).json()) == 2
+
+    monkeypatch.setattr("src.routers.mesh.get_mesh_index", lambda: None)
+    assert client.get("/api/mesh/autocomplete", params={"q": "lung"}).status_code == 503
+
+def test_index_is_loaded_at_startup(mesh_xml, tmp_path, monkeypatch):
+    """インデックスの構築がアプリ起動時に行われ、検索リクエストでは構築しないことの確認"""
+    from fastapi.testclient import TestClient
+    from src.app import app
+    settings = get_mesh_settings()
+    monkeypatch.setattr(settings, "descriptor_xml", str(mesh_xml))
+    monkeypatch.setattr(settings, "index_dir", str(tmp_path / "index"))
+    monkeypatch.setattr("src.app.init_db", lambda: None)
+    monkeypatch.setattr("src.app.save_citation_graph", lambda force=False: None)
+    get_mesh_index.cache_clear()
+    try:
+        with TestClient(app):
+            assert get_mesh_index.cache_info().currsize == 1
+            monkeypatch.setattr(MeshIndex, "from_xml", lambda path: pytest.fail("index built on the request path"))
+            query = PubMedAdvancedSearch()._build_search_query(
+                SearchCriteria(keywords="therapy", mesh_terms=["Tumors"], include_mesh_subheadings=True)
+            )
+            assert '"Neoplasms"[MeSH Terms:noexp]' in query
+    finally:
+        get_mesh_index.cache_clear()
@@ -0,0 +1,60 @@
+import pytest
+from src.metrics import MetricsRegistry, PUBMED_ARTICLES_PARSED
+from src.cache import TTLCache
+from src.pubmed import PubMedAdvancedSearch
+
+SAMPLE_EFETCH = b"""<?xml version="1.0"?>
+<PubmedArticleSet>
+  <PubmedArticle>
+    <MedlineCitation>
+      <PMID>12345</PMID>
+      <Article>
+        <Journal><Title>Test Journal</Title></Journal>
+        <ArticleTitle>Test Article</ArticleTitle>
+      </Article>
+    </MedlineCitation>
+  </PubmedArticle>
+</PubmedArticleSet>"""
+
+def test_registry_render():
+    """Prometheusテキスト形式の出力テスト"""
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests.", ("endpoint",))
+    histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    cache = TTLCache(maxsize=10, ttl=60)
+    registry.register_cache("test", cache)
+
+    counter.inc(endpoint="efetch")
+    counter.inc(2, endpoint="efetch")
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{endpoint="efetch"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+    assert 'cache_hits_total{cache="test"} 1' in text
+    assert 'cache_misses_total{cache="test"} 1' in text
+
+    with pytest.raises(ValueError):
+        counter.inc(unknown="label")
+
+def test_parse_metrics_and_endpoint(client):
+    """パース処理の計測と /metrics エンドポイントのテスト"""
+    before = PUBMED_ARTICLES_PARSED.value()
+    articles = PubMedAdvancedSearch()._parse_articles(SAMPLE_EFETCH)
+    assert [a.pmid for a in articles] == ["12345"]
+    assert PUBMED_ARTICLES_PARSED.value() == before + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "pubmed_parse_duration_seconds_count" in response.text
+    assert "eutils_request_duration_seconds" in response.text
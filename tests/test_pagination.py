@@ -0,0 +1,66 @@
+import pytest
+from src.pagination import encode_cursor, decode_cursor, InvalidCursorError
+from src.pubmed import PubMedAdvancedSearch, SearchHistory
+from src.schemas import ArticleResponse
+
+def test_cursor_roundtrip():
+    """カーソルのエンコード・デコードテスト"""
+    state = {"webenv": "MCID_abc", "query_key": "1", "offset": 20}
+    cursor = encode_cursor(state)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, required=("webenv", "offset")) == state
+
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not a cursor!")
+    # 署名のない・改ざんされたカーソルは受け付けない
+    payload, signature = cursor.split(".")
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(payload)
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(f"{encode_cursor({**state, 'offset': 0}).split('.')[0]}.{signature}")
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, required=("total",))
+
+def test_search_pages(client, monkeypatch):
+    """ページ単位検索のテスト（各ページで取得するのはそのページの論文のみ）"""
+    def make(pmid):
+        return ArticleResponse(pmid=pmid, title=f"Article {pmid}", abstract="")
+
+    fetched_pages = []
+    monkeypatch.setattr(
+        PubMedAdvancedSearch, "search_history",
+        lambda self, criteria, retmax: SearchHistory(count=1000, webenv="WE", query_key="1", pmids=["1", "2"])
+    )
+    monkeypatch.setattr(
+        PubMedAdvancedSearch, "fetch_articles",
+        lambda self, pmids, min_citations=None, progress_callback=None: [make(pmid) for pmid in pmids]
+    )
+    def fetch_page(self, webenv, query_key, retstart, retmax, min_citations=None):
+        fetched_pages.append((webenv, query_key, retstart, retmax))
+        return [make(str(retstart + i + 1)) for i in range(retmax)]
+    monkeypatch.setattr(PubMedAdvancedSearch, "fetch_page", fetch_page)
+    monkeypatch.setattr("src.routers.pubmed_search.enrich_articles", lambda articles: None)
+
+    response = client.post("/api/pubmed-search/pages", json={"criteria": {"keywords": "test", "max_results": 5}, "page_size": 2})
+    assert response.status_code == 200
+    page = response.json()
+    assert [a["pmid"] for a in page["articles"]] == ["1", "2"]
+    assert page["total"] == 5
+
+    pmids = []
+    cursor = page["next_cursor"]
+    while cursor:
+        page = client.get("/api/pubmed-search/pages", params={"cursor": cursor}).json()
+        pmids.extend(a["pmid"] for a in page["articles"])
+        cursor = page["next_cursor"]
+    assert pmids == ["3", "4", "5"]
+    assert fetched_pages == [("WE", "1", 2, 2), ("WE", "1", 4, 1)]
+
+    assert client.get("/api/pubmed-search/pages", params={"cursor": "broken"}).status_code == 400
+
+    # 署名が正しくても型が不正な値は400、ページサイズは上限に切り詰める
+    bad = encode_cursor({"webenv": "WE", "query_key": "1", "page_size": "2", "total": 5, "offset": 2})
+    assert client.get("/api/pubmed-search/pages", params={"cursor": bad}).status_code == 400
+    large = encode_cursor({"webenv": "WE", "query_key": "1", "page_size": 10000, "total": 10000, "offset": 0})
+    assert client.get("/api/pubmed-search/pages", params={"cursor": large}).status_code == 200
+    assert fetched_pages[-1] == ("WE", "1", 0, 200)
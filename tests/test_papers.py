@@ -0,0 +1,85 @@
+import pytest
+from sqlmodel import select
+from src.models import Article, Author, Keyword, MeshHeading, Paper
+from src.papers import upsert_papers, load_papers, link_article_papers, find_citing_articles
+from src.schemas import ArticleResponse
+
+def _paper(sample_article_response, pmid: str, **overrides) -> ArticleResponse:
+    return ArticleResponse(**{**sample_article_response, "pmid": pmid, **overrides})
+
+@pytest.mark.parametrize("native_upsert", [True, False])
+def test_upsert_and_load_papers(test_db, sample_article_response, monkeypatch, native_upsert):
+    """論文の一括保存・再利用テスト（ON CONFLICT を使えない方言での検索してから追加・更新する経路を含む）"""
+    monkeypatch.setattr("src.papers._supports_upsert", lambda db: native_upsert)
+    papers = [_paper(sample_article_response, str(pmid)) for pmid in range(1, 1201)]
+    assert upsert_papers(test_db, papers) == 1200
+    test_db.commit()
+
+    # 著者・MeSH・キーワードは重複せず1行ずつ
+    assert len(test_db.exec(select(Author)).all()) == 1
+    assert len(test_db.exec(select(MeshHeading)).all()) == 1
+    assert len(test_db.exec(select(Keyword)).all()) == 2
+
+    loaded = load_papers(test_db, ["3", "missing", "1"])
+    assert [paper.pmid for paper in loaded] == ["3", "1"]
+    assert loaded[1].model_dump() == papers[0].model_dump()
+
+    # 再保存時は内容と対応を置き換える
+    updated = _paper(
+        sample_article_response, "1",
+        title="Updated",
+        keywords=["research"],
+        mesh_terms=[{"descriptor": "Test Term", "qualifiers": [], "ui": "D000001"}],
+    )
+    upsert_papers(test_db, [updated])
+    test_db.commit()
+
+    assert test_db.get(Paper, "1").title == "Updated"
+    reloaded = load_papers(test_db, ["1"])[0]
+    assert reloaded.keywords == ["research"]
+    assert reloaded.mesh_terms[0].ui == "D000001"
+    assert load_papers(test_db, ["2"])[0].keywords == ["test", "research"]
+
+def test_find_citing_articles(test_db, test_user, sample_article_response):
+    """PMIDを引用している記事の検索テスト"""
+    upsert_papers(test_db, [_paper(sample_article_response, pmid) for pmid in ("1", "2")])
+    first = Article(title="First", user_id=test_user.id)
+    second = Article(title="Second", user_id=test_user.id)
+    test_db.add_all([first, second])
+    test_db.flush()
+    link_article_papers(test_db, first.id, ["1", "2"])
+    link_article_papers(test_db, second.id, ["2"])
+    test_db.commit()
+
+    assert [article.title for article in find_citing_articles(test_db, "1")] == ["First"]
+    assert {article.title for article in find_citing_articles(test_db, "2")} == {"First", "Second"}
+    assert find_citing_articles(test_db, "2", user_id=test_user.id + 1) == []
+
+    link_article_papers(test_db, first.id, ["1"])
+    test_db.commit()
+    assert [article.title for article in find_citing_articles(test_db, "2")] == ["Second"]
+
+def test_generate_article_links_papers(client, monkeypatch, mock_firebase_auth, override_get_db, test_user, sample_article_response):
+    """記事生成時の引用元論文の保存と、期限切れハンドルからの再構成テスト"""
+    monkeypatch.setattr("src.services.summarize_abstract", lambda text: "summary")
+    monkeypatch.setattr("src.services.analyze_abstract", lambda text: "analysis")
+    headers = {"Authorization": "Bearer valid_token"}
+
+    response = client.post(
+        "/api/generate-article",
+        headers=headers,
+        json=[_paper(sample_article_response, pmid).model_dump() for pmid in ("11", "12")]
+    )
+    assert response.status_code == 200
+
+    response = client.get("/api/papers/12/articles", headers=headers)
+    assert response.status_code == 200
+    assert [article["source_articles"] for article in response.json()] == [["11", "12"]]
+
+    # 結果セットが期限切れでも保存済みの論文から生成できる
+    response = client.post("/api/generate-article", headers=headers, json={"handle": "expired", "pmids": ["12"]})
+    assert response.status_code == 200
+    assert response.json()["source_articles"] == ["12"]
+
+    response = client.post("/api/generate-article", headers=headers, json={"handle": "expired", "pmids": ["99"]})
+    assert response.status_code == 404
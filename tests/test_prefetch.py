@@ -0,0 +1,148 @@
+from datetime import date, datetime, timedelta
+import pytest
+from src.models import QueryLogEntry
+from src.prefetch import (
+    QueryLog, QueryPrefetcher, SearchResultCache, canonical_query, get_prefetch_settings, get_query_log,
+    get_search_cache, popular_queries
+)
+from src.pubmed import PubMedAdvancedSearch
+from src.records import ArticleRecord
+from src.schemas import SearchCriteria
+
+class FakeSearcher:
+    def __init__(self):
+        self.searched = []
+
+    def search_papers(self, criteria, progress_callback=None):
+        self.searched.append(criteria.keywords)
+        return [ArticleRecord(pmid=str(len(self.searched)), title=criteria.keywords, abstract="")]
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+def _log_queries(db, log: QueryLog, counts: dict[str, int], day: date) -> dict[str, str]:
+    keys = {}
+    for keywords, hits in counts.items():
+        key, canonical = canonical_query(SearchCriteria(keywords=keywords))
+        keys[keywords] = key
+        for _ in range(hits):
+            log.record(key, canonical)
+    log.flush(db, day)
+    return keys
+
+@pytest.fixture
+def prefetch_enabled(monkeypatch):
+    monkeypatch.setattr(get_prefetch_settings(), "enabled", True)
+    get_query_log.cache_clear()
+    get_search_cache.cache_clear()
+    yield
+    get_query_log.cache_clear()
+    get_search_cache.cache_clear()
+
+def test_canonical_query():
+    """結果が同じになる検索条件が同じキーにまとまることの確認"""
+    key, canonical = canonical_query(SearchCriteria(
+        keywords="  lung   cancer ", authors=["Smith J", " Doe  A", "Smith J"], languages=["jpn", "eng"]
+    ))
+    assert (canonical.keywords, canonical.authors, [language.value for language in canonical.languages]) == (
+        "lung cancer", ["Doe A", "Smith J"], ["eng", "jpn"]
+    )
+    assert canonical_query(SearchCriteria(keywords="lung cancer", authors=["Doe A", "Smith J"], languages=["eng", "jpn"]))[0] == key
+    assert canonical_query(SearchCriteria(keywords="lung cancer", authors=[], exclude_keywords=[" "]))[1].authors is None
+    # キーワードの大文字小文字（演算子）・件数は区別する
+    assert canonical_query(SearchCriteria(keywords="lung OR cancer"))[0] != canonical_query(SearchCriteria(keywords="lung or cancer"))[0]
+    assert canonical_query(SearchCriteria(keywords="lung cancer", max_results=20))[0] != canonical_query(SearchCriteria(keywords="lung cancer"))[0]
+
+def test_query_log_ranking(test_db):
+    """日別の記録の集計と、期間・最小回数・保持期間のテスト"""
+    log = QueryLog()
+    today = date(2024, 3, 10)
+    keys = _log_queries(test_db, log, {"asthma": 3, "sepsis": 1, "stroke": 2}, today - timedelta(days=1))
+    _log_queries(test_db, log, {"sepsis": 4, "stroke": 1}, today)
+    assert test_db.get(QueryLogEntry, (keys["sepsis"], today)).hits == 4
+
+    ranked = popular_queries(test_db, limit=10, since=today - timedelta(days=7))
+    assert [criteria.keywords for _, criteria in ranked] == ["sepsis", "asthma", "stroke"]
+    assert [key for key, _ in ranked][0] == keys["sepsis"]
+    assert [c.keywords for _, c in popular_queries(test_db, limit=2, since=today - timedelta(days=7))] == ["sepsis", "asthma"]
+    assert [c.keywords for _, c in popular_queries(test_db, limit=10, since=today)] == ["sepsis", "stroke"]
+    assert [c.keywords for _, c in popular_queries(test_db, limit=10, since=today, min_hits=2)] == ["sepsis"]
+
+    # 保持期間を過ぎた行は書き出し時に削除
+    log.flush(test_db, today + timedelta(days=get_prefetch_settings().retention_days))
+    assert [c.keywords for _, c in popular_queries(test_db, limit=10, since=date.min)] == ["sepsis", "stroke"]
+
+def test_prefetch_window_idle_and_resume(test_db, monkeypatch):
+    """オフピークかつ検索が途絶えている間のみ人気順に事前取得し、中断後は残りから続けることの確認"""
+    settings = get_prefetch_settings()
+    monkeypatch.setattr(settings, "min_hits", 1)
+    now = datetime(2024, 3, 10, 12, 0)
+    idle = FakeClock(1000.0)
+    log = QueryLog(clock=idle)
+    keys = _log_queries(test_db, log, {"asthma": 3, "sepsis": 2, "stroke": 1}, now.date())
+
+    searcher = FakeSearcher()
+    cache = SearchResultCache(maxsize=10, ttl=3600)
+    sleeps = []
+    prefetcher = QueryPrefetcher(searcher, enrich=False, log=log, cache=cache, clock=lambda: now, sleep=sleeps.append)
+    # 日中は実行しない
+    assert prefetcher.run(test_db) == 0
+
+    now = datetime(2024, 3, 11, settings.window_start_hour, 30)
+    # 直近に検索があれば実行しない
+    assert prefetcher.run(test_db) == 0
+    idle.now += settings.idle_seconds
+
+    # 2件目の前に検索が再開されたら中断する
+    def search_resumes(seconds):
+        sleeps.append(seconds)
+        log.record(*canonical_query(SearchCriteria(keywords="asthma")))
+    prefetcher.sleep = search_resumes
+    assert prefetcher.run(test_db) == 1
+    assert searcher.searched == ["asthma"]
+    assert [article.title for article in cache.get(keys["asthma"])] == ["asthma"]
+    assert cache.get(keys["sepsis"]) is None
+
+    idle.now += settings.idle_seconds
+    prefetcher.sleep = sleeps.append
+    assert prefetcher.run(test_db) == 2
+    assert searcher.searched == ["asthma", "sepsis", "stroke"]
+    assert sleeps == [settings.query_interval_seconds] * 2
+    # 同じ日には再取得しない
+    assert prefetcher.run(test_db) == 0
+
+def test_search_endpoint_serves_prefetched_results(client, override_get_db, prefetch_enabled, monkeypatch):
+    """事前取得した検索結果がNCBI・LLMを呼ばずに返されることの確認"""
+    searcher = FakeSearcher()
+    monkeypatch.setattr(PubMedAdvancedSearch, "search_papers", lambda self, criteria, progress_callback=None: searcher.search_papers(criteria))
+    monkeypatch.setattr("src.routers.pubmed_search.enrich_articles", lambda articles: None)
+
+    clock = FakeClock()
+    monkeypatch.setattr(get_search_cache().cache, "_timer", clock)
+
+    key, _ = canonical_query(SearchCriteria(keywords="asthma"))
+    get_search_cache().put(key, [ArticleRecord(pmid="42", title="prefetched", abstract="", summary="summary")])
+    response = client.post("/api/pubmed-search", json={"keywords": " asthma "})
+    assert response.status_code == 200
+    assert [(a["pmid"], a["summary"]) for a in response.json()] == [("42", "summary")]
+    assert searcher.searched == []
+
+    # キャッシュにない検索は実行して結果を短い期間だけ保持する
+    for _ in range(2):
+        assert client.post("/api/pubmed-search", json={"keywords": "sepsis"}).status_code == 200
+    assert searcher.searched == ["sepsis"]
+    # 期限が過ぎたら再検索するが、事前取得した結果は残る
+    clock.now += get_prefetch_settings().live_cache_ttl_seconds
+    for keywords in ("sepsis", "asthma"):
+        assert client.post("/api/pubmed-search", json={"keywords": keywords}).status_code == 200
+    assert searcher.searched == ["sepsis", "sepsis"]
+    # 件数の多い検索はキャッシュしない
+    for _ in range(2):
+        client.post("/api/pubmed-search", json={"keywords": "sepsis", "max_results": 1000})
+    assert searcher.searched == ["sepsis", "sepsis", "sepsis", "sepsis"]
+
+    assert get_query_log().idle_seconds() < 60
@@ -0,0 +1,37 @@
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.profiling import ProfilingMiddleware, get_profiling_settings, get_profile_store
+from src.routers import profiling
+
+def _busy_handler():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    return {"ok": True}
+
+def test_profiling_middleware(monkeypatch):
+    """トークン指定時のみプロファイルを採取するテスト"""
+    monkeypatch.setattr(get_profiling_settings(), "token", "secret")
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+    app.include_router(profiling.router, prefix="/api")
+    app.get("/busy")(_busy_handler)
+    client = TestClient(app)
+
+    # トークンなし・不一致では計測しない
+    assert "x-profile-id" not in client.get("/busy").headers
+    assert "x-profile-id" not in client.get("/busy", headers={"X-Profile-Token": "wrong"}).headers
+
+    response = client.get("/busy", params={"profile_token": "secret"})
+    profile_id = response.headers["x-profile-id"]
+    assert response.json() == {"ok": True}
+
+    profile = client.get(f"/api/profiles/{profile_id}", headers={"X-Profile-Token": "secret"})
+    assert profile.status_code == 200
+    assert "_busy_handler" in profile.text
+    stack, count = profile.text.splitlines()[0].rsplit(" ", 1)
+    assert ";" in stack and int(count) > 0
+
+    assert client.get(f"/api/profiles/{profile_id}").status_code == 404
+    get_profile_store().clear()
@@ -1,5 +1,7 @@
 import pytest
-from src.pubmed import PubMedAdvancedSearch, PubMedSearchError
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from src.pubmed import PubMedAdvancedSearch, PubMedSearchError, PubMedSettings, EfetchBatchSizer
 from src.schemas import SearchCriteria, PublicationType, Language, SearchField, SortBy
 
 def test_search_criteria_validation():
@@ -69,4 +71,43 @@ def test_progress_callback():
     searcher.search_papers(criteria, progress_callback=progress_callback)
     assert len(progress_calls) > 0
     for current, total in progress_calls:
-        assert current <= total 
\ No newline at end of file
+        assert current <= total 
+
+def test_efetch_batch_sizer():
+    """efetchのバッチサイズ調整のテスト"""
+    sizer = EfetchBatchSizer(PubMedSettings(
+        efetch_initial_batch=200, efetch_min_batch=20, efetch_max_batch=10000,
+        efetch_target_bytes=10_000_000, efetch_target_seconds=10.0
+    ), smoothing=0.5)
+
+    # 観測値がない間は既定値で、残りを均等なバッチに分割
+    assert sizer.next_batch(150) == 150
+    assert sizer.next_batch(450) == 150
+    assert sizer.next_batch(401) == 134
+
+    # 1件あたり5KB・1msなら、目標サイズ（10MB）で2000件
+    sizer.observe(200, 1_000_000, 0.2)
+    assert sizer.batch_size() == 2000
+    # 応答が遅くなると目標時間（10秒）に収まるよう縮小
+    sizer.observe(2000, 10_000_000, 38.0)
+    assert sizer.batch_size() == 1000
+
+    # 上限・下限
+    fast = EfetchBatchSizer(sizer.settings)
+    fast.observe(1000, 1_000, 0.001)
+    assert fast.batch_size() == 10000
+    slow = EfetchBatchSizer(sizer.settings)
+    slow.observe(10, 10_000_000, 100.0)
+    assert slow.batch_size() == 20
+
+def test_search_pmids_since_uses_utc(monkeypatch):
+    """差分検索の日付範囲がUTCの日付で指定されることの確認"""
+    params = {}
+    def esearch(self, criteria, retmax, extra_params):
+        params.update(extra_params)
+        return ET.fromstring("<eSearchResult><Count>0</Count></eSearchResult>")
+    monkeypatch.setattr(PubMedAdvancedSearch, "_esearch", esearch)
+
+    PubMedAdvancedSearch().search_pmids(SearchCriteria(keywords="test"), since=datetime(2024, 1, 1, 23, 0))
+    assert params["mindate"] == "2024/01/01"
+    assert params["maxdate"] == datetime.utcnow().strftime("%Y/%m/%d")
@@ -0,0 +1,39 @@
+import json
+from benchmarks.fakes import efetch_xml, FIRST_PMID
+from src.pubmed import PubMedAdvancedSearch
+from src.records import ArticleRecord, publication_date
+from src.responses import FastJSONResponse
+from src.schemas import ArticleResponse
+
+def _parse(count: int = 3) -> list[ArticleRecord]:
+    return PubMedAdvancedSearch()._parse_articles(efetch_xml(list(range(FIRST_PMID, FIRST_PMID + count))))
+
+def test_record_matches_api_model():
+    """内部表現とAPIモデルの変換テスト"""
+    for record in _parse():
+        validated = ArticleResponse(**record.to_dict())
+        assert validated.model_dump() == record.to_dict()
+        assert record.to_response().model_dump() == record.to_dict()
+        assert ArticleRecord.from_response(validated) == record
+        assert validated.url == record.url == f"https://pubmed.ncbi.nlm.nih.gov/{record.pmid}/"
+
+def test_record_shares_repeated_strings():
+    """ジャーナル名・MeSH用語・出版日の共有テスト"""
+    records = _parse(50)
+    by_journal = {}
+    for record in records:
+        assert by_journal.setdefault(record.journal, record.journal) is record.journal
+    descriptors = {}
+    for record in records:
+        for term in record.mesh_terms:
+            assert descriptors.setdefault(term.descriptor, term.descriptor) is term.descriptor
+    assert all(record.publication_date is publication_date(*record.publication_date) for record in records)
+    assert not hasattr(records[0], "__dict__")
+
+def test_record_json_encoding():
+    """ArticleRecordを直接JSONにエンコードするテスト"""
+    records = _parse()
+    records[0].summary = "summary"
+    body = json.loads(FastJSONResponse({"articles": records, "total": 3}).body)
+    assert body["articles"] == [record.to_dict() for record in records]
+    assert body["articles"][0]["summary"] == "summary"
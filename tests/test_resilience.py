@@ -0,0 +1,135 @@
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+import pytest
+import requests
+from benchmarks.fakes import FakeEutilsServer, FIRST_PMID
+from src.metrics import EUTILS_RETRIES
+from src.pubmed import PubMedAdvancedSearch, PubMedSearchError, get_circuit_breaker, get_efetch_batch_sizer, get_pubmed_settings
+from src.resilience import CircuitBreaker, CircuitOpenError, LatencyWindow, hedged, is_retryable, retry_after_seconds
+from src.schemas import SearchCriteria
+
+def _response(status: int, headers: dict | None = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return response
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    settings = get_pubmed_settings()
+    monkeypatch.setattr(settings, "retry_backoff_seconds", 0.001)
+    monkeypatch.setattr(settings, "retry_max_wait_seconds", 0.01)
+    get_circuit_breaker.cache_clear()
+    yield settings
+    get_circuit_breaker.cache_clear()
+
+def test_retry_after_seconds():
+    """Retry-Afterヘッダーのパーステスト"""
+    assert retry_after_seconds(_response(429, {"Retry-After": "3"})) == 3.0
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < retry_after_seconds(_response(503, {"Retry-After": format_datetime(retry_at, usegmt=True)})) <= 30
+    assert retry_after_seconds(_response(429, {"Retry-After": "soon"})) is None
+    assert retry_after_seconds(_response(429)) is None
+    assert retry_after_seconds(None) is None
+
+def test_is_retryable():
+    """再試行対象のエラー判定テスト"""
+    assert is_retryable(requests.HTTPError(response=_response(429)))
+    assert is_retryable(requests.HTTPError(response=_response(503)))
+    assert not is_retryable(requests.HTTPError(response=_response(400)))
+    assert is_retryable(requests.ConnectTimeout())
+    assert is_retryable(requests.ConnectionError())
+    assert not is_retryable(ValueError())
+
+def test_circuit_breaker():
+    """サーキットブレーカーの状態遷移テスト"""
+    now = [0.0]
+    breaker = CircuitBreaker("efetch", failure_threshold=2, reset_seconds=10, clock=lambda: now[0])
+
+    breaker.before_call()
+    assert not breaker.record_failure()
+    breaker.before_call()
+    assert breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # 経過後は1件だけ試行を許可し、失敗すれば再び開く
+    now[0] = 10.0
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # 試行が成功すれば閉じる
+    now[0] = 20.0
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+    breaker.before_call()
+
+def test_latency_window():
+    window = LatencyWindow(size=100)
+    assert window.quantile(0.95) is None
+    for i in range(100):
+        window.add(i / 100)
+    assert window.quantile(0.95) == 0.95
+    assert window.quantile(0.95, min_samples=200) is None
+
+def test_hedged_request():
+    """遅い呼び出しに対するヘッジのテスト"""
+    calls = []
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            calls.append(len(calls))
+            first = len(calls) == 1
+        if first:
+            time.sleep(1.0)
+            return "primary"
+        return "hedge"
+
+    start = time.perf_counter()
+    assert hedged(call, delay=0.05) == ("hedge", "hedge")
+    assert time.perf_counter() - start < 0.5
+    assert hedged(lambda: "fast", delay=1.0) == ("fast", None)
+
+def test_search_retries_transient_errors(fast_retries):
+    """429が混在しても再試行で検索が完了することの確認"""
+    retries = EUTILS_RETRIES.value(endpoint="efetch", reason="429") + EUTILS_RETRIES.value(endpoint="esearch", reason="429")
+    with FakeEutilsServer(total_count=100, error_rate=0.4, seed=1) as server:
+        searcher = PubMedAdvancedSearch(api_key="test", base_url=server.url)
+        for _ in range(3):
+            results = searcher.search_papers(SearchCriteria(keywords="COVID-19", max_results=50))
+            assert [a.pmid for a in results] == [str(pmid) for pmid in range(FIRST_PMID, FIRST_PMID + 50)]
+    assert EUTILS_RETRIES.value(endpoint="efetch", reason="429") + EUTILS_RETRIES.value(endpoint="esearch", reason="429") > retries
+
+def test_circuit_opens_for_unreachable_endpoint(fast_retries, monkeypatch):
+    """接続できないエンドポイントへの呼び出しがサーキットブレーカーで止まることの確認"""
+    monkeypatch.setattr(fast_retries, "max_attempts", 2)
+    monkeypatch.setattr(fast_retries, "breaker_failure_threshold", 2)
+    monkeypatch.setattr(fast_retries, "connect_timeout", 0.5)
+    searcher = PubMedAdvancedSearch(api_key="test", base_url="http://127.0.0.1:9")
+    criteria = SearchCriteria(keywords="COVID-19", max_results=5)
+
+    with pytest.raises(PubMedSearchError):
+        searcher.search_pmids(criteria)
+    with pytest.raises(PubMedSearchError, match="open"):
+        searcher.search_pmids(criteria)
+    assert get_circuit_breaker("http://127.0.0.1:9", "esearch").state == "open"
+
+def test_batch_sizer_ignores_waits(fast_retries, monkeypatch):
+    """efetchのバッチサイズの推定に再試行・レート制限の待ち時間が含まれないことの確認"""
+    observed = []
+    sizer = get_efetch_batch_sizer()
+    monkeypatch.setattr(sizer, "observe", lambda articles, response_bytes, seconds: observed.append(seconds))
+    monkeypatch.setattr(PubMedAdvancedSearch, "_wait_for_rate_limit", lambda self: time.sleep(0.2))
+    with FakeEutilsServer(total_count=100) as server:
+        PubMedAdvancedSearch(api_key="test", base_url=server.url).fetch_articles([str(FIRST_PMID)])
+    assert len(observed) == 1 and observed[0] < 0.2
+
@@ -0,0 +1,106 @@
+import pytest
+from src.pubmed import PubMedAdvancedSearch
+from src.result_sets import ResultSetStore, ResultSetError, get_result_set_store
+from src.schemas import ArticleResponse
+
+def test_result_set_store(sample_article_response):
+    """検索結果セットの保存・取得テスト"""
+    store = ResultSetStore(ttl_seconds=60, max_entries=2)
+    articles = [ArticleResponse(**{**sample_article_response, "pmid": pmid}) for pmid in ("1", "2", "3")]
+
+    result_set = store.put(articles)
+    assert store.get(result_set.handle) == articles
+    assert [a.pmid for a in store.get(result_set.handle, ["3", "1"])] == ["3", "1"]
+
+    with pytest.raises(ResultSetError):
+        store.get(result_set.handle, ["4"])
+    with pytest.raises(ResultSetError):
+        store.get("unknown")
+
+    # 上限を超えると古い結果セットから破棄される
+    store.put(articles)
+    store.put(articles)
+    with pytest.raises(ResultSetError):
+        store.get(result_set.handle)
+
+def test_result_set_article_limits(sample_article_response):
+    """保持する論文数の合計・1件あたりの上限のテスト"""
+    store = ResultSetStore(ttl_seconds=60, max_entries=10, max_articles=5, max_set_articles=3)
+    articles = [ArticleResponse(**{**sample_article_response, "pmid": str(pmid)}) for pmid in range(4)]
+
+    # 上限を超える検索結果は保持しない
+    assert store.put(articles) is None
+    assert len(store.cache) == 0
+
+    first = store.put(articles[:2])
+    second = store.put(articles[:3])
+    assert store.cache.weight == 5
+    # 合計が上限を超えると古い結果セットから破棄される
+    third = store.put(articles[:1])
+    with pytest.raises(ResultSetError):
+        store.get(first.handle)
+    assert [len(store.get(r.handle)) for r in (second, third)] == [3, 1]
+    assert store.cache.weight == 4
+    store.cache.pop(second.handle)
+    assert store.cache.weight == 1
+
+def test_search_without_handle_when_too_large(client, monkeypatch, override_get_db, sample_article_response):
+    """保持できない件数の検索結果はハンドルなしで返すことの確認"""
+    articles = [ArticleResponse(**{**sample_article_response, "pmid": str(pmid)}) for pmid in range(3)]
+    monkeypatch.setattr(PubMedAdvancedSearch, "search_papers", lambda self, criteria, progress_callback=None: list(articles))
+    monkeypatch.setattr("src.routers.pubmed_search.enrich_articles", lambda articles: None)
+    monkeypatch.setattr(get_result_set_store(), "max_set_articles", 2)
+
+    response = client.post("/api/pubmed-search", json={"keywords": "test"})
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+    assert "X-Result-Set-Handle" not in response.headers
+
+def test_result_set_expiry(sample_article_response):
+    """期限切れの結果セットのテスト"""
+    store = ResultSetStore(ttl_seconds=0, max_entries=10)
+    result_set = store.put([ArticleResponse(**sample_article_response)])
+    with pytest.raises(ResultSetError):
+        store.get(result_set.handle)
+
+def test_generate_article_from_handle(client, monkeypatch, mock_firebase_auth, override_get_db, test_user, sample_article_response):
+    """ハンドル指定での記事生成テスト"""
+    monkeypatch.setattr("src.services.summarize_abstract", lambda text: "summary")
+    monkeypatch.setattr("src.services.analyze_abstract", lambda text: "analysis")
+    articles = [ArticleResponse(**{**sample_article_response, "pmid": pmid}) for pmid in ("1", "2")]
+    result_set = get_result_set_store().put(articles)
+
+    response = client.post(
+        "/api/generate-article",
+        headers={"Authorization": "Bearer valid_token"},
+        json={"handle": result_set.handle, "pmids": ["2"]}
+    )
+    assert response.status_code == 200
+    assert response.json()["source_articles"] == ["2"]
+
+    response = client.post(
+        "/api/generate-article",
+        headers={"Authorization": "Bearer valid_token"},
+        json={"handle": "expired"}
+    )
+    assert response.status_code == 404
+
+def test_generate_article_from_expired_search(client, monkeypatch, mock_firebase_auth, override_get_db, test_user, sample_article_response):
+    """検索結果の論文が保存され、結果セットの期限切れ後もPMIDから記事を生成できることの確認"""
+    monkeypatch.setattr("src.services.summarize_abstract", lambda text: "summary")
+    monkeypatch.setattr("src.services.analyze_abstract", lambda text: "analysis")
+    articles = [ArticleResponse(**{**sample_article_response, "pmid": pmid}) for pmid in ("1", "2")]
+    monkeypatch.setattr(PubMedAdvancedSearch, "search_papers", lambda self, criteria, progress_callback=None: list(articles))
+    monkeypatch.setattr("src.routers.pubmed_search.enrich_articles", lambda articles: None)
+
+    response = client.post("/api/pubmed-search", json={"keywords": "test"})
+    assert response.status_code == 200
+    get_result_set_store().cache.pop(response.headers["X-Result-Set-Handle"])
+
+    response = client.post(
+        "/api/generate-article",
+        headers={"Authorization": "Bearer valid_token"},
+        json={"handle": response.headers["X-Result-Set-Handle"], "pmids": ["2", "1"]}
+    )
+    assert response.status_code == 200
+    assert response.json()["source_articles"] == ["2", "1"]
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+import pytest
+from src.models import SavedSearch
+from src.pubmed import PubMedAdvancedSearch
+from src.schemas import SearchCriteria
+from src.watches import SavedSearchWatcher
+from src.scheduler import (
+    FairScheduler, Priority, SchedulerTimeoutError, current_tenant, tenant_scope
+)
+
+def _wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+def _run_queued(scheduler: FairScheduler, calls: list[tuple[str, Priority]]) -> list[str]:
+    """実行枠を塞いだ状態で calls を順に待ち行列に入れ、枠を空けた後の実行順を返す"""
+    order: list[str] = []
+    lock = threading.Lock()
+
+    def call(tenant_id: str, priority: Priority):
+        with tenant_scope(tenant_id, priority), scheduler.slot():
+            with lock:
+                order.append(tenant_id)
+
+    threads = []
+    with tenant_scope("holder"), scheduler.slot():
+        for i, (tenant_id, priority) in enumerate(calls):
+            thread = threading.Thread(target=call, args=(tenant_id, priority))
+            thread.start()
+            threads.append(thread)
+            _wait_until(lambda: scheduler.waiting == i + 1)
+    for thread in threads:
+        thread.join(5)
+    return order
+
+def test_fair_share_between_tenants():
+    """大量の呼び出しを待たせている利用者がいても、後から来た利用者がすぐに実行されることの確認"""
+    scheduler = FairScheduler("test", concurrency=1, per_tenant_concurrency=1)
+    order = _run_queued(scheduler, [("heavy", Priority.INTERACTIVE)] * 10 + [("light", Priority.INTERACTIVE)])
+    assert len(order) == 11
+    assert order.index("light") <= 1
+
+def test_interactive_priority_over_batch():
+    """対話的な呼び出しがバッチより重みに応じて優先されることの確認"""
+    scheduler = FairScheduler("test", concurrency=1, per_tenant_concurrency=1)
+    order = _run_queued(scheduler, [("batch", Priority.BATCH)] * 5 + [("interactive", Priority.INTERACTIVE)] * 5)
+    assert order[:5].count("interactive") >= 4
+    assert sorted(order) == sorted(["batch"] * 5 + ["interactive"] * 5)
+
+def test_per_tenant_concurrency_cap():
+    """利用者ごとの同時実行数の上限テスト"""
+    scheduler = FairScheduler("test", concurrency=4, per_tenant_concurrency=2)
+    active = []
+    peak = [0]
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def call():
+        with tenant_scope("user"), scheduler.slot():
+            with lock:
+                active.append(1)
+                peak[0] = max(peak[0], len(active))
+            release.wait(5)
+            with lock:
+                active.pop()
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    _wait_until(lambda: scheduler.active == 2 and scheduler.waiting == 2)
+
+    # 他の利用者は空いている枠ですぐに実行できる
+    with tenant_scope("other"), scheduler.slot(timeout=1):
+        assert scheduler.active == 3
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert peak[0] == 2
+
+def test_queue_timeout():
+    """待ち行列での待機の上限テスト"""
+    scheduler = FairScheduler("test", concurrency=1, per_tenant_concurrency=1)
+    with tenant_scope("holder"), scheduler.slot():
+        with tenant_scope("waiter"), pytest.raises(SchedulerTimeoutError):
+            with scheduler.slot(timeout=0.05):
+                pass
+    assert scheduler.waiting == 0
+    with scheduler.slot(timeout=0.05):
+        assert scheduler.active == 1
+
+def test_search_runs_as_request_tenant(client, monkeypatch, mock_firebase_auth, override_get_db):
+    """検索の上流呼び出しがリクエストの利用者・優先度で実行されることの確認"""
+    tenants = []
+    def search_papers(self, criteria, progress_callback=None):
+        tenants.append(current_tenant())
+        return []
+    monkeypatch.setattr(PubMedAdvancedSearch, "search_papers", search_papers)
+    monkeypatch.setattr("src.routers.pubmed_search.enrich_articles", lambda articles: None)
+
+    assert client.post("/api/pubmed-search", json={"keywords": "test", "max_results": 10}).status_code == 200
+    assert client.post(
+        "/api/pubmed-search",
+        json={"keywords": "test", "max_results": 5000},
+        headers={"Authorization": "Bearer token"}
+    ).status_code == 200
+
+    assert [(t.id, t.priority) for t in tenants] == [
+        ("anon:testclient", Priority.INTERACTIVE),
+        ("test123", Priority.BATCH),
+    ]
+
+def test_saved_search_refresh_runs_in_threadpool(client, monkeypatch, mock_firebase_auth, override_get_db, test_db, test_user):
+    """保存済み検索の即時再実行がイベントループ外で、リクエストの利用者として実行されることの確認"""
+    calls = []
+    def refresh(self, db, saved_search, now=None):
+        try:
+            asyncio.get_running_loop()
+            on_event_loop = True
+        except RuntimeError:
+            on_event_loop = False
+        calls.append((on_event_loop, current_tenant().id))
+        return []
+    monkeypatch.setattr(SavedSearchWatcher, "refresh", refresh)
+    saved_search = SavedSearch(name="covid", criteria=SearchCriteria(keywords="COVID-19").model_dump_json(), user_id=test_user.id)
+    test_db.add(saved_search)
+    test_db.commit()
+
+    response = client.post(f"/api/saved-searches/{saved_search.id}/refresh", headers={"Authorization": "Bearer token"})
+    assert response.status_code == 200
+    assert calls == [(False, "test123")]
@@ -77,4 +77,45 @@ def test_content_formatting():
     assert "## 1. Test Article" in generated.content
     assert "**Authors**: John Smith" in generated.content
     assert "**Journal**: Test Journal (2024)" in generated.content
-    assert "**PMID**: 12345" in generated.content 
\ No newline at end of file
+    assert "**PMID**: 12345" in generated.content
+
+def test_article_regeneration(monkeypatch, sample_article_response):
+    """追加された論文のみLLMを呼び出す再生成のテスト"""
+    calls = []
+    monkeypatch.setattr("src.services.summarize_abstract", lambda text: calls.append(text) or f"summary of {text}")
+    monkeypatch.setattr("src.services.analyze_abstract", lambda text: f"analysis of {text}")
+
+    def make(pmid):
+        return ArticleResponse(**{**sample_article_response, "pmid": pmid, "abstract": f"abstract {pmid}"})
+
+    generator = ArticleGenerator(llm_client=object())
+    article = generator.generate_article([make("1"), make("2")])
+    assert calls == ["abstract 1", "abstract 2"]
+    assert set(article.paper_outputs) == {"1", "2"}
+
+    # 論文2を除外し、論文3を追加
+    calls.clear()
+    regenerated = generator.regenerate_article(article, [make("1"), make("3")])
+    assert calls == ["abstract 3"]
+    assert regenerated.source_articles == ["1", "3"]
+    assert set(regenerated.paper_outputs) == {"1", "3"}
+    assert regenerated.summary == "summary of abstract 1\n\nsummary of abstract 3"
+    assert "**PMID**: 2" not in regenerated.content
+    assert "**PMID**: 3" in regenerated.content
+
+def test_regeneration_refreshes_changed_abstracts(monkeypatch, sample_article_response):
+    """抄録が変わった論文は保存済みの出力を使わずに再生成することの確認"""
+    monkeypatch.setattr("src.services.summarize_abstract", lambda text: f"summary of {text}")
+    monkeypatch.setattr("src.services.analyze_abstract", lambda text: f"analysis of {text}")
+
+    def make(pmid, abstract):
+        return ArticleResponse(**{**sample_article_response, "pmid": pmid, "abstract": abstract})
+
+    generator = ArticleGenerator(llm_client=object())
+    article = generator.generate_article([make("1", "original"), make("2", "unchanged")])
+    # ハッシュを持たない以前の形式の出力は再利用する
+    article.paper_outputs = {**article.paper_outputs, "2": {"summary": "legacy", "analysis": "legacy"}}
+
+    regenerated = generator.regenerate_article(article, [make("1", "corrected"), make("2", "unchanged")])
+    assert regenerated.paper_outputs["1"]["summary"] == "summary of corrected"
+    assert regenerated.paper_outputs["2"]["summary"] == "legacy"
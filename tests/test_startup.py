@@ -0,0 +1,27 @@
+from benchmarks.startup import DEFERRED_MODULES, import_profile, parse_importtime, time_to_first_request
+from src import llm
+
+def test_parse_importtime():
+    """`-X importtime` 出力のパーステスト"""
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   json.decoder\n"
+        "import time:      2000 |       2120 | json\n"
+    )
+    assert parse_importtime(stderr) == {"json.decoder": (0.00012, 0.00012), "json": (0.002, 0.00212)}
+
+def test_heavy_modules_are_deferred():
+    """アプリのインポート時に重いモジュールを読み込まないことの確認（起動時間ベンチマーク）"""
+    profile = import_profile("src.app")
+    assert profile.total_seconds > 0
+    assert [name for name in DEFERRED_MODULES if name in profile.modules] == []
+
+    imported, first_request = time_to_first_request()
+    assert 0 < imported <= first_request
+
+def test_llm_client_is_created_on_first_use(monkeypatch):
+    """OpenAIクライアントの遅延生成テスト"""
+    monkeypatch.setattr(llm, "client", None)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    client = llm.get_client()
+    assert client is llm.get_client() is llm.client
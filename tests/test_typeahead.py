@@ -0,0 +1,87 @@
+import pytest
+from src.papers import upsert_papers
+from src.schemas import ArticleResponse, TypeaheadField
+from src.typeahead import PrefixIndex, affiliation_parts, get_typeahead_index, normalize_name
+
+def _paper(pmid: str, journal: str, authors: list[tuple[str, str, str | None]]) -> ArticleResponse:
+    return ArticleResponse(
+        pmid=pmid,
+        title=f"Paper {pmid}",
+        abstract="",
+        journal=journal,
+        authors=[{"last_name": last, "fore_name": fore, "affiliation": affiliation} for last, fore, affiliation in authors],
+    )
+
+@pytest.fixture
+def typeahead_index():
+    get_typeahead_index.cache_clear()
+    yield get_typeahead_index()
+    get_typeahead_index.cache_clear()
+
+def test_normalize_and_affiliation_parts():
+    assert normalize_name("  Müller-Lüdenscheidt,  K.") == "muller ludenscheidt k"
+    assert affiliation_parts(
+        "Department of Medicine, Harvard Medical School, Boston, MA 02115, USA. jdoe@example.org"
+    ) == ["Department of Medicine", "Harvard Medical School", "Boston"]
+
+def test_prefix_index_ranks_by_frequency():
+    """出現論文数による順位付けと増分追加のテスト"""
+    index = PrefixIndex()
+    index.add_documents([["Smith John", "Smyth Anna"], ["Smith John", "smith  john"], ["Smithers Carl"]])
+    assert index.complete("smi") == [("Smith John", 2), ("Smithers Carl", 1)]
+    assert index.complete("SM", limit=1) == [("Smith John", 2)]
+
+    # キャッシュされた短い接頭辞も追加後は更新される
+    index.add_documents([["Smyth Anna"]] * 3)
+    assert index.complete("sm", limit=1) == [("Smyth Anna", 4)]
+    # 一括追加（再ソート）
+    index.add_documents([[f"Author {i:03d}"] for i in range(100)])
+    assert len(index) == 103
+    assert index.complete("author 05") == [(f"Author {i:03d}", 1) for i in range(50, 60)]
+    assert index.complete("zz") == []
+
+def test_index_is_built_and_updated_on_commit(test_db, typeahead_index):
+    """保存済み論文からの構築と、コミットされた論文の追加テスト"""
+    upsert_papers(test_db, [
+        _paper("1", "The Lancet", [("Smith", "John", "Harvard Medical School, Boston, USA"), ("Doe", "Jane", None)]),
+        _paper("2", "The Lancet", [("Smith", "John", "Harvard Medical School, Boston, USA")]),
+    ])
+    test_db.commit()
+    # 構築前のコミットは索引に影響しない（構築時にデータベースから読み込む）
+    assert typeahead_index.complete(TypeaheadField.AUTHORS, "smith") == []
+
+    typeahead_index.load(test_db)
+    assert typeahead_index.complete(TypeaheadField.AUTHORS, "smith") == [("Smith John", 2)]
+    assert typeahead_index.complete(TypeaheadField.JOURNALS, "the l") == [("The Lancet", 2)]
+    assert typeahead_index.complete(TypeaheadField.AFFILIATIONS, "harv") == [("Harvard Medical School", 2)]
+
+    # 新しい論文はコミット後に追加され、既に索引にある論文は二重に数えない
+    upsert_papers(test_db, [
+        _paper("2", "The Lancet", [("Smith", "John", None)]),
+        _paper("3", "JAMA", [("Smith", "Joan", "Harvard University")]),
+    ])
+    assert typeahead_index.complete(TypeaheadField.AUTHORS, "smith jo") == [("Smith John", 2)]
+    test_db.commit()
+    assert typeahead_index.complete(TypeaheadField.AUTHORS, "smith jo") == [("Smith John", 2), ("Smith Joan", 1)]
+    assert typeahead_index.complete(TypeaheadField.AFFILIATIONS, "harv") == [
+        ("Harvard Medical School", 2), ("Harvard University", 1)
+    ]
+
+    # ロールバックされた論文は追加しない
+    upsert_papers(test_db, [_paper("4", "Nature", [("Nakamura", "Ken", None)])])
+    test_db.rollback()
+    test_db.commit()
+    assert typeahead_index.complete(TypeaheadField.AUTHORS, "naka") == []
+
+def test_typeahead_endpoint(client, override_get_db, test_db, typeahead_index):
+    """入力補完エンドポイントのテスト"""
+    upsert_papers(test_db, [_paper("1", "BMJ", [("Tanaka", "Yuki", "Kyoto University, Kyoto, Japan")])])
+    test_db.commit()
+
+    response = client.get("/api/typeahead/authors", params={"q": "tana"})
+    assert response.status_code == 200
+    assert response.json() == [{"value": "Tanaka Yuki", "count": 1}]
+    assert client.get("/api/typeahead/affiliations", params={"q": "kyoto"}).json() == [
+        {"value": "Kyoto", "count": 1}, {"value": "Kyoto University", "count": 1}
+    ]
+    assert client.get("/api/typeahead/keywords", params={"q": "a"}).status_code == 422
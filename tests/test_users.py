@@ -0,0 +1,45 @@
+import asyncio
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.database import DatabaseSettings, to_async_url, _configure_sqlite
+from src.users import get_user_id, get_user_id_cache, invalidate_user_id
+
+def test_to_async_url():
+    """同期URLから非同期ドライバのURLへの変換テスト"""
+    assert to_async_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    assert to_async_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert to_async_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+
+def test_get_user_id_is_cached(test_db, test_db_path, test_user):
+    """ユーザーIDのキャッシュテスト"""
+    get_user_id_cache().clear()
+    url = f"sqlite+aiosqlite:///{test_db_path}"
+    engine = create_async_engine(url, poolclass=NullPool)
+    _configure_sqlite(engine.sync_engine, url, DatabaseSettings())
+
+    async def scenario():
+        async with AsyncSession(engine) as db:
+            journal_mode = (await db.exec(text("PRAGMA journal_mode"))).first()
+            first = await get_user_id(db, "test123")
+            missing = await get_user_id(db, "unknown")
+
+        # DBから削除してもキャッシュから返る
+        test_db.delete(test_user)
+        test_db.commit()
+        async with AsyncSession(engine) as db:
+            cached = await get_user_id(db, "test123")
+            invalidate_user_id("test123")
+            after_invalidate = await get_user_id(db, "test123")
+        await engine.dispose()
+        return journal_mode, first, missing, cached, after_invalidate
+
+    journal_mode, first, missing, cached, after_invalidate = asyncio.run(scenario())
+    assert journal_mode[0] == "wal"
+    assert first == test_user.id
+    assert missing is None
+    assert cached == first
+    assert after_invalidate is None
+    assert "unknown" not in get_user_id_cache()
+    get_user_id_cache().clear()
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+from sqlmodel import select
+from src.models import SavedSearch, SavedSearchPmid
+from src.schemas import SearchCriteria, ArticleResponse
+from src.watches import SavedSearchWatcher
+
+class FakeSearcher:
+    """esearch/efetchの呼び出しを記録するテスト用の検索クラス"""
+    def __init__(self, pmids):
+        self.pmids = pmids
+        self.search_calls = []
+        self.fetched = []
+
+    def search_pmids(self, criteria, since=None):
+        self.search_calls.append(since)
+        return list(self.pmids)
+
+    def fetch_articles(self, pmids, min_citations=None, progress_callback=None):
+        self.fetched.append(list(pmids))
+        return [ArticleResponse(pmid=pmid, title=f"Article {pmid}", abstract="") for pmid in pmids]
+
+def test_saved_search_refresh(test_db, test_user):
+    """保存済み検索の差分更新テスト"""
+    saved_search = SavedSearch(
+        name="covid",
+        criteria=SearchCriteria(keywords="COVID-19", max_results=50).model_dump_json(),
+        user_id=test_user.id
+    )
+    test_db.add(saved_search)
+    test_db.commit()
+
+    notified = []
+    searcher = FakeSearcher(["1", "2"])
+    watcher = SavedSearchWatcher(searcher, notifier=lambda s, articles: notified.append(articles), enrich=False)
+
+    # 初回は既存の結果を確認済みとして記録するのみ
+    first_run = datetime(2024, 1, 1)
+    assert watcher.refresh(test_db, saved_search, now=first_run) == []
+    assert searcher.search_calls == [None]
+    assert searcher.fetched == []
+    assert saved_search.last_checked_at == first_run
+
+    # 2回目以降は前回確認日以降の新着のみを取得
+    searcher.pmids = ["3", "2"]
+    articles = watcher.refresh(test_db, saved_search, now=first_run + timedelta(days=1))
+    assert [article.pmid for article in articles] == ["3"]
+    assert searcher.search_calls[-1] == first_run - timedelta(days=1)
+    assert searcher.fetched == [["3"]]
+    assert len(notified) == 1
+
+    # 新着がなければefetchも通知も行わない
+    assert watcher.refresh(test_db, saved_search, now=first_run + timedelta(days=2)) == []
+    assert searcher.fetched == [["3"]]
+    assert len(notified) == 1
+
+    seen = test_db.exec(select(SavedSearchPmid.pmid).where(SavedSearchPmid.saved_search_id == saved_search.id)).all()
+    assert sorted(seen) == ["1", "2", "3"]
+
+def test_refresh_due(test_db, test_user):
+    """期限到来した保存済み検索のみ更新されるテスト"""
+    now = datetime(2024, 1, 10)
+    test_db.add_all([
+        SavedSearch(name="new", criteria=SearchCriteria(keywords="a").model_dump_json(), user_id=test_user.id),
+        SavedSearch(name="due", criteria=SearchCriteria(keywords="b").model_dump_json(), user_id=test_user.id,
+                    last_checked_at=now - timedelta(days=2)),
+        SavedSearch(name="fresh", criteria=SearchCriteria(keywords="c").model_dump_json(), user_id=test_user.id,
+                    last_checked_at=now - timedelta(hours=1)),
+    ])
+    test_db.commit()
+
+    watcher = SavedSearchWatcher(FakeSearcher([]), enrich=False)
+    assert watcher.refresh_due(test_db, now=now) == 2
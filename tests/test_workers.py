@@ -0,0 +1,44 @@
+import pickle
+import pytest
+from benchmarks.fakes import efetch_xml, FIRST_PMID
+from src.pubmed import PubMedAdvancedSearch
+from src.records import ArticleRecord, publication_date
+from src.services import ArticleGenerator
+from src.workers import get_worker_settings, shutdown_process_pool
+
+PMIDS = list(range(FIRST_PMID, FIRST_PMID + 20))
+
+@pytest.fixture(scope="module", autouse=True)
+def process_pool():
+    yield
+    shutdown_process_pool()
+
+def test_record_pickle_round_trip():
+    """プロセス間で受け渡した論文の等価性と文字列共有のテスト"""
+    records = PubMedAdvancedSearch()._parse_articles(efetch_xml(PMIDS))
+    restored = pickle.loads(pickle.dumps(records))
+    assert restored == records
+    assert all(isinstance(record, ArticleRecord) for record in restored)
+    assert all(a.journal is b.journal for a, b in zip(records, restored))
+    assert all(record.publication_date is publication_date(*record.publication_date) for record in restored)
+
+def test_parse_offload(monkeypatch):
+    """プロセスプールでのパース結果がその場でのパースと一致することの確認"""
+    content = efetch_xml(PMIDS)
+    inline = PubMedAdvancedSearch()._parse_articles(content)
+
+    monkeypatch.setattr(get_worker_settings(), "parse_min_bytes", 0)
+    offloaded = PubMedAdvancedSearch()._parse_articles(content)
+    assert offloaded == inline
+    assert [record.pmid for record in offloaded] == [str(pmid) for pmid in PMIDS]
+
+def test_format_offload(monkeypatch):
+    """プロセスプールでの記事コンテンツのフォーマットがその場でのフォーマットと一致することの確認"""
+    records = PubMedAdvancedSearch()._parse_articles(efetch_xml(PMIDS))
+    summaries = [f"summary {record.pmid}" for record in records]
+    analyses = [f"analysis {record.pmid}" for record in records]
+    generator = ArticleGenerator(llm_client=object())
+    inline = generator._format_content(records, summaries, analyses)
+
+    monkeypatch.setattr(get_worker_settings(), "format_min_articles", 1)
+    assert generator._format_content(records, summaries, analyses) == inline